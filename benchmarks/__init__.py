@@ -0,0 +1 @@
+# Benchmarks for Atom Game（python -m benchmarks.<name> 运行）
@@ -0,0 +1,82 @@
+"""
+批量放黑基准：空格子上 batch_place_on_cell 放 k 个黑原子的耗时，
+对比「每个候选现算并集的空邻位」的旧贪心与按得分分桶增量更新的新实现。
+
+运行：python -m benchmarks.bench_batch
+"""
+import random
+import time
+from typing import List
+
+from src.game import turn
+from src.game.state import GameState, PHASE_PLACE
+from src.grid.cell import ATOM_BLACK
+
+SIZES = (10, 50, 100, 200, 400)
+LEGACY_MAX = 200  # 旧实现更大批量要数十秒，默认不跑
+
+
+def _legacy_batch_place(state: GameState, cell_index: int, n: int) -> None:
+    """改写前的选位方式（省去校验与失败回滚）：每步对每个候选重算全部黑原子的空邻位。"""
+    cell = state.player_cells(state.current_player)[cell_index]
+    pool = state.pool(state.current_player)
+    occupied = set(cell.all_atoms().keys())
+    black_points = set(cell.black_points())
+    valid = cell.grid.point_set
+    empty = {p for p in valid if p not in occupied}
+
+    def empty_neighbors_of(pts: set) -> List:
+        out = set()
+        for (r, c) in pts:
+            for q in cell.grid.neighbors_of(r, c):
+                if q in valid and q not in occupied:
+                    out.add(q)
+        return [p for p in out if p in empty]
+
+    pt = (cell.grid.center_r, cell.grid.center_c)
+    for k in range(n):
+        if k:
+            candidates = empty_neighbors_of(black_points)
+            pt = max(candidates, key=lambda p: len(empty_neighbors_of(black_points | {p})))
+        cell.place(pt[0], pt[1], ATOM_BLACK)
+        pool[ATOM_BLACK] -= 1
+        state.turn_placed_count += 1
+        occupied.add(pt)
+        black_points.add(pt)
+        empty.discard(pt)
+
+
+def _fresh_state(n: int) -> GameState:
+    state = GameState()
+    state.phase = PHASE_PLACE
+    state.turn_place_limit = n
+    state.pool(0)[ATOM_BLACK] = n
+    return state
+
+
+def _time(place, n: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        state = _fresh_state(n)
+        t0 = time.perf_counter()
+        place(state, 0, n)
+        best = min(best, time.perf_counter() - t0)
+        assert len(state.cells[0][0].all_atoms()) == n
+    return best
+
+
+def main(repeat: int = 3) -> None:
+    random.seed(0)
+    print("空格批量放黑（k 个）")
+    print(f"  {'k':>5} {'旧贪心':>12} {'分桶增量':>12} {'加速比':>8}")
+    for n in SIZES:
+        t_new = _time(turn.batch_place_on_cell, n, repeat)
+        if n <= LEGACY_MAX:
+            t_old = _time(_legacy_batch_place, n, 1)
+            print(f"  {n:>5} {t_old * 1e3:9.1f} ms {t_new * 1e3:9.2f} ms {t_old / t_new:7.0f}x")
+        else:
+            print(f"  {n:>5} {'-':>12} {t_new * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+整局复制基准：中盘局面（每格 60 个原子）下 GameState.clone() 每秒可复制的次数与每份副本的内存，
+对比立即复制全部格子缓冲区的做法（旧 Cell.copy 的行为）；另测复制后改动一格（推演一步）的情形。
+
+运行：python -m benchmarks.bench_clone
+"""
+import timeit
+import tracemalloc
+from typing import Callable
+
+from benchmarks.bench_frame import mid_game_state
+from src.game.state import GameState
+
+
+def eager_clone(state: GameState) -> GameState:
+    """复制后立即让每个格子复制自己的缓冲区。"""
+    other = state.clone()
+    for cells in other.cells:
+        for cell in cells:
+            cell._own()
+    return other
+
+
+def clone_and_move(state: GameState) -> GameState:
+    """复制后在对方一格移除一个原子：只有这一格付出复制代价。"""
+    other = state.clone()
+    cell = other.cells[1][0]
+    cell.remove_at(cell.atom_ids()[0])
+    return other
+
+
+def bytes_per_clone(state: GameState, clone: Callable[[GameState], GameState], n: int = 200) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clones = [clone(state) for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del clones
+    return (after - before) / n
+
+
+def main(number: int = 2000) -> None:
+    state = mid_game_state()
+    print("中盘整局复制（6 格，每格 60 原子）")
+    print(f"  {'方式':<14} {'次/秒':>10} {'每份内存':>14}")
+    for name, clone in (
+        ("立即复制", eager_clone),
+        ("写时复制", GameState.clone),
+        ("写时复制+改一格", clone_and_move),
+    ):
+        t = min(timeit.repeat(lambda: clone(state), number=number, repeat=5)) / number
+        print(f"  {name:<14} {1 / t:10,.0f} {bytes_per_clone(state, clone):10,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+局面编码基准：GameState 二进制编码的体积与编码/解码吞吐，并与 JSON 存档（saves）对照，
+局面为每格随机长出 15（常见中盘）与 60 个原子。
+
+运行：python -m benchmarks.bench_codec
+"""
+import json
+import timeit
+
+from benchmarks.bench_frame import mid_game_state
+from src.game.codec import encode_state, decode_state
+from src.game.saves import state_to_json, state_from_json
+
+
+def _rate(fn, number: int) -> float:
+    return number / min(timeit.repeat(fn, number=number, repeat=5))
+
+
+def main(number: int = 200) -> None:
+    print("局面编码（6 格）：二进制 / JSON")
+    print(
+        f"  {'每格原子':>8} {'字节':>6} {'JSON 字节':>10} {'编码 次/秒':>12} {'JSON 编码':>10}"
+        f" {'解码 次/秒':>12} {'JSON 解码':>10}"
+    )
+    for atoms in (15, 60):
+        state = mid_game_state(atoms_per_cell=atoms)
+        data = encode_state(state)
+        text = json.dumps(state_to_json(state))
+        enc = _rate(lambda: encode_state(state), number)
+        dec = _rate(lambda: decode_state(data), number // 4)
+        json_enc = _rate(lambda: json.dumps(state_to_json(state)), number)
+        json_dec = _rate(lambda: state_from_json(json.loads(text)), number // 4)
+        print(
+            f"  {atoms:>8} {len(data):>6} {len(text):>10} {enc:12,.0f} {json_enc:10,.0f}"
+            f" {dec:12,.0f} {json_dec:10,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+抽原子基准：每回合抽 10 个原子并计入原子池。
+对比旧做法（random.choices 每次重建累积权重、得到颜色名列表后逐个写池）与别名表直接给出各色个数；
+另测 NumPy 多项分布一次抽出 10,000 局的耗时（需安装 numpy）。
+
+运行：python -m benchmarks.bench_draw
+"""
+import random
+import timeit
+
+from src.atoms.draw import atom_sampler
+from src.game.game_config import default_config
+from src.game.pool import AtomPool
+from src.grid.colors import COLORS
+
+COUNT = 10
+GAMES = 10_000
+
+
+def legacy_turn(pool: AtomPool, weights, rng: random.Random) -> None:
+    for color in rng.choices(COLORS[:len(weights)], weights=weights, k=COUNT):
+        pool[color] = pool.get(color, 0) + 1
+
+
+def sampler_turn(pool: AtomPool, weights, rng: random.Random) -> None:
+    for code, n in enumerate(atom_sampler(tuple(weights)).counts(COUNT, rng)):
+        if n:
+            pool.add_at(code, n)
+
+
+def main(number: int = 20000) -> None:
+    weights = default_config().draw_weights
+    rng = random.Random(0)
+    pool = AtomPool()
+    print(f"每回合抽 {COUNT} 个并计入原子池")
+    for name, fn in (("random.choices", legacy_turn), ("别名表计数", sampler_turn)):
+        t = min(timeit.repeat(lambda: fn(pool, weights, rng), number=number, repeat=5)) / number
+        print(f"  {name:<16} {t * 1e6:8.2f} us")
+    try:
+        import numpy as np
+    except ImportError:
+        print("  （未安装 numpy，跳过批量）")
+        return
+    sampler = atom_sampler(tuple(weights))
+    gen = np.random.default_rng(0)
+    counts = np.full(GAMES, COUNT)
+    t = min(timeit.repeat(lambda: sampler.counts_batch(counts, gen), number=20, repeat=5)) / 20
+    t_loop = min(timeit.repeat(lambda: [sampler.counts(COUNT, rng) for _ in range(GAMES)], number=1, repeat=3))
+    print(f"{GAMES:,} 局各抽 {COUNT} 个")
+    print(f"  逐局别名表       {t_loop * 1e3:8.2f} ms")
+    print(f"  NumPy 多项分布   {t * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+每帧分配基准：draw_board 每帧对 6 个格子做的模型侧读取
+（格点集合、原子视图、ATK/DEF、红蓝绿 y 值）所产生的临时分配。
+
+对比「每次复制」（旧接口：all_atoms() 复制 dict、all_points() 复制 list 再建 set）
+与「只读视图」（all_atoms() 快照、point_set 共享）。
+
+运行：python -m benchmarks.bench_frame
+"""
+import random
+import timeit
+import tracemalloc
+
+from src.game import combat
+from src.game.state import GameState
+from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
+
+
+def mid_game_state(seed: int = 1, atoms_per_cell: int = 60) -> GameState:
+    """每格随机长出 atoms_per_cell 个连通原子的局面。"""
+    rng = random.Random(seed)
+    state = GameState()
+    colors = [ATOM_BLACK] * 3 + [ATOM_RED, ATOM_BLUE, ATOM_GREEN]
+    for row in state.cells:
+        for cell in row:
+            cell.place(cell.grid.center_r, cell.grid.center_c, ATOM_BLACK)
+            while len(cell.all_atoms()) < atoms_per_cell:
+                r, c = cell.random_empty_neighbor(rng)
+                cell.place(r, c, rng.choice(colors))
+    return state
+
+
+def frame_views(state: GameState) -> None:
+    for row in state.cells:
+        for cell in row:
+            valid_points = cell.grid.point_set
+            atoms = cell.all_atoms()
+            combat.attack_power(cell)
+            combat.defense_power(cell)
+            (cell.red_y_sum, cell.blue_y_sum, cell.green_y_sum)
+            len(valid_points), len(atoms)
+
+
+def frame_copies(state: GameState) -> None:
+    """旧接口的读取方式：每次调用都复制。"""
+    for row in state.cells:
+        for cell in row:
+            valid_points = set(list(cell.grid.all_points()))
+            atoms = dict(cell.all_atoms())
+            combat.attack_power(cell)
+            combat.defense_power(cell)
+            (cell.red_y_sum, cell.blue_y_sum, cell.green_y_sum)
+            len(valid_points), len(atoms)
+
+
+def peak_bytes(frame, state: GameState) -> int:
+    """一帧内相对帧开始时的峰值临时分配（字节）。"""
+    frame(state)  # 预热快照
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    frame(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - base
+
+
+def main(number: int = 500) -> None:
+    state = mid_game_state()
+    print("每帧模型侧读取（6 格，每格 60 原子）")
+    for name, frame in (("每次复制", frame_copies), ("只读视图", frame_views)):
+        t = min(timeit.repeat(lambda: frame(state), number=number, repeat=5)) / number
+        print(f"  {name}: 峰值临时分配 {peak_bytes(frame, state):8,d} bytes  耗时 {t * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+网格邻接基准：满格（HEX_RADIUS=15）时连通性检查的耗时，
+对比「每次查询现算邻居」与「构造时预建邻接表」；
+以及半满格上随机取落点：增量维护的有序边界集合直接抽样，对比每次由位棋盘现算边界。
+
+运行：python -m benchmarks.bench_grid
+"""
+import random
+import timeit
+from collections import deque
+
+from src.config import DEFAULT_GRID_ROWS, DEFAULT_GRID_COLS, GRID_CENTER_R, GRID_CENTER_C, HEX_RADIUS
+from src.grid.cell import Cell, ATOM_BLACK
+from src.grid.triangle import TriangleGrid, neighbors, distance_between, hex_distance, in_hexagon, _DIST_ONE_TOL
+
+
+def _legacy_in_bounds(grid: TriangleGrid, r: int, c: int) -> bool:
+    if r < 0 or r >= grid.rows or c < 0 or c >= grid.cols:
+        return False
+    if grid.hex_radius is None:
+        return True
+    return in_hexagon(r, c, grid.center_r, grid.center_c, grid.hex_radius)
+
+
+def _legacy_neighbors_of(grid: TriangleGrid, r: int, c: int):
+    """预建邻接表之前的 neighbors_of：每次对 6 个候选做越界与距离判断。"""
+    out = []
+    here = (r, c)
+    for nr, nc in neighbors(r, c):
+        if _legacy_in_bounds(grid, nr, nc):
+            if abs(distance_between(here, (nr, nc)) - 1.0) < _DIST_ONE_TOL:
+                out.append((nr, nc))
+    return out
+
+
+def _bfs_connected(cell: Cell, neighbors_of) -> bool:
+    """与 Cell.is_connected 相同的 BFS，邻居查询方式由 neighbors_of 决定。"""
+    points = set(cell.all_atoms().keys())
+    if not points:
+        return True
+    start = next(iter(points))
+    visited = {start}
+    q = deque([start])
+    while q:
+        r, c = q.popleft()
+        for p in neighbors_of(r, c):
+            if p in points and p not in visited:
+                visited.add(p)
+                q.append(p)
+    return len(visited) == len(points)
+
+
+def full_cell() -> Cell:
+    cell = Cell(
+        DEFAULT_GRID_ROWS,
+        DEFAULT_GRID_COLS,
+        center_r=GRID_CENTER_R,
+        center_c=GRID_CENTER_C,
+        hex_radius=HEX_RADIUS,
+    )
+    for r, c in cell.grid.all_points():
+        cell.place(r, c, ATOM_BLACK)
+    return cell
+
+
+def half_cell() -> Cell:
+    """中心六边形（半径约为格子的 1/√2）放满黑原子，约占一半格点。"""
+    cell = Cell(
+        DEFAULT_GRID_ROWS,
+        DEFAULT_GRID_COLS,
+        center_r=GRID_CENTER_R,
+        center_c=GRID_CENTER_C,
+        hex_radius=HEX_RADIUS,
+    )
+    for r, c in cell.grid.all_points():
+        if hex_distance(r, c, GRID_CENTER_R, GRID_CENTER_C) <= round(HEX_RADIUS / 2 ** 0.5):
+            cell.place(r, c, ATOM_BLACK)
+    return cell
+
+
+def main(repeat: int = 20) -> None:
+    cell = full_cell()
+    n = len(cell.all_atoms())
+    grid = cell.grid
+
+    def legacy():
+        return _bfs_connected(cell, lambda r, c: _legacy_neighbors_of(grid, r, c))
+
+    def table():
+        return _bfs_connected(cell, grid.neighbors_of)
+
+    assert legacy() and table()
+    t_legacy = min(timeit.repeat(legacy, number=1, repeat=repeat))
+    t_table = min(timeit.repeat(table, number=1, repeat=repeat))
+    print(f"满格连通性检查（{n} 个原子，HEX_RADIUS={HEX_RADIUS}）")
+    print(f"  现算邻居: {t_legacy * 1e3:8.3f} ms")
+    print(f"  邻接表  : {t_table * 1e3:8.3f} ms")
+    print(f"  加速比  : {t_legacy / t_table:8.1f}x")
+
+    # 中心一块约占一半格点时的边界抽样
+    cell = half_cell()
+    geom = cell.grid.geometry
+    rng = random.Random(0)
+
+    def rebuild():
+        occ = cell.occupied_mask()
+        ids = geom.ids_of(geom.dilate(occ) & ~occ)
+        return ids[int(rng.random() * len(ids))]
+
+    number = 2000
+    t_rebuild = min(timeit.repeat(rebuild, number=number, repeat=5)) / number
+    t_sample = min(timeit.repeat(lambda: cell.random_frontier_id(rng), number=number, repeat=5)) / number
+    print(f"边界抽样（{len(cell.all_atoms())} 个原子，边界 {len(cell.frontier_ids())} 个空位）")
+    print(f"  位棋盘现算: {t_rebuild * 1e6:8.2f} us")
+    print(f"  有序集合  : {t_sample * 1e6:8.2f} us")
+    print(f"  加速比    : {t_rebuild / t_sample:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
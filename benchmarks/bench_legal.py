@@ -0,0 +1,52 @@
+"""
+合法动作基准：中盘排布阶段（每格 60 个原子、池中五色各有）列出全部合法放置。
+
+对比逐格点逐颜色调用 validate_place 试探、legal_actions 惰性生成全部动作、
+count_legal_actions 只计数，以及只取改变攻防的放置（changes_power 过滤）。
+
+运行：python -m benchmarks.bench_legal
+"""
+import timeit
+from dataclasses import replace
+
+from src.grid.colors import COLORS
+from src.game.engine import GameEngine
+from src.game.legal import legal_actions, count_legal_actions, changes_power
+from src.game.state import PHASE_PLACE
+from src.game.turn import validate_place
+from benchmarks.bench_frame import mid_game_state
+
+
+def probe_all(engine: GameEngine) -> int:
+    state = engine.state
+    n = 0
+    for ci, cell in enumerate(state.cells[state.current_player]):
+        for r, c in cell.grid.geometry.points:
+            for color in COLORS:
+                n += validate_place(state, ci, r, c, color)[0]
+    return n + 1
+
+
+def main(number: int = 20) -> None:
+    state = mid_game_state()
+    state.config = replace(state.config, random_place_black_on_neighbor=False)
+    state.phase = PHASE_PLACE
+    state.turn_place_limit = 10
+    for color in COLORS[:5]:
+        state.pool(0)[color] = 5
+    engine = GameEngine(state=state)
+    n = count_legal_actions(engine)
+    assert n == len(list(legal_actions(engine))) == probe_all(engine)
+    print(f"中盘排布阶段：{n} 个合法动作，其中改变攻防的放置 {len(list(legal_actions(engine, changes_power))) - 1} 个")
+    for name, fn in (
+        ("逐点试探", lambda: probe_all(engine)),
+        ("legal_actions", lambda: list(legal_actions(engine))),
+        ("changes_power 过滤", lambda: list(legal_actions(engine, changes_power))),
+        ("count_legal_actions", lambda: count_legal_actions(engine)),
+    ):
+        t = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print(f"  {name:<20} {t * 1e3:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+开局构造基准：GameState() 的耗时与内存，区分几何缓存冷/热两种情况；
+另测开局与中盘（每格 60 个原子）两种局面的每局内存。
+
+运行：python -m benchmarks.bench_state
+"""
+import timeit
+import tracemalloc
+from typing import Callable
+
+from benchmarks.bench_frame import mid_game_state
+from src.game.state import GameState
+from src.grid.triangle import _build_geometry
+
+
+def _cold() -> GameState:
+    _build_geometry.cache_clear()
+    return GameState()
+
+
+def bytes_per_game(n: int = 200, make: Callable[[], GameState] = GameState) -> float:
+    """连续创建 n 局并保持存活，返回平均每局占用的字节数（tracemalloc 统计）。"""
+    make()  # 预热几何缓存，不计入
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [make() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return (after - before) / n
+
+
+def main(number: int = 200) -> None:
+    t_cold = min(timeit.repeat(_cold, number=1, repeat=5))
+    GameState()
+    t_warm = min(timeit.repeat(GameState, number=number, repeat=5)) / number
+    print("GameState() 构造耗时")
+    print(f"  几何缓存冷: {t_cold * 1e3:9.3f} ms")
+    print(f"  几何缓存热: {t_warm * 1e6:9.1f} us")
+    print("每局内存")
+    print(f"  开局: {bytes_per_game():9,.0f} bytes")
+    print(f"  中盘: {bytes_per_game(50, mid_game_state):9,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
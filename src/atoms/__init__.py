@@ -1,3 +1,3 @@
-from src.atoms.draw import draw_atoms
+from src.atoms.draw import AtomSampler, atom_sampler, draw_atoms
 
-__all__ = ["draw_atoms"]
+__all__ = ["AtomSampler", "atom_sampler", "draw_atoms"]
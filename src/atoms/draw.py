@@ -1,17 +1,93 @@
 """
-按权重抽原子：默认黑 3 : 红 1 : 蓝 1 : 绿 1，可传入自定义权重。
+按权重抽原子：权重为按颜色编码顺序（黑、红、蓝、绿、黄……，见 src.grid.colors）的整数列表，可短于颜色表（其余颜色为 0）；
+默认黑 3 : 红 1 : 蓝 1 : 绿 1。
+AtomSampler 按一组权重建一次别名表（Walker/Vose），此后每个原子 O(1)，直接给出各颜色的个数；
+counts_batch 用 NumPy 的多项分布一次抽出成千上万局的结果（需安装 numpy）。
 """
 import random
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
 
-BLACK, RED, BLUE, GREEN = "black", "red", "blue", "green"
-WEIGHTS = [BLACK, RED, BLUE, GREEN]
+from src.grid.colors import Color, COLORS
+
+WEIGHTS = list(COLORS)  # 可抽到的颜色，权重按此顺序
 DEFAULT_WEIGHTS = [3, 1, 1, 1]  # 黑/红/蓝/绿 整数权重
 
 
-def draw_atoms(count: int, weights: Optional[List[int]] = None) -> List[str]:
-    """随机抽取 count 个原子，返回颜色列表。weights 为 [黑,红,蓝,绿] 整数权重，默认 [3,1,1,1]。"""
-    w = weights if weights is not None else DEFAULT_WEIGHTS
-    if len(w) != 4 or sum(w) == 0:
-        w = DEFAULT_WEIGHTS
-    return random.choices(WEIGHTS, weights=w, k=count)
+class AtomSampler:
+    """一组权重的抽取器：别名表与各色概率只在构造时算一次。"""
+
+    __slots__ = ("weights", "probs", "_prob", "_alias")
+
+    def __init__(self, weights: Sequence[int]):
+        if len(weights) > len(COLORS) or any(w < 0 for w in weights) or sum(weights) <= 0:
+            raise ValueError(f"抽取权重无效：{list(weights)!r}")
+        self.weights: Tuple[int, ...] = tuple(weights)
+        n = len(weights)
+        total = sum(weights)
+        self.probs: Tuple[float, ...] = tuple(w / total for w in weights)
+        # 别名表：第 i 列以 _prob[i] 的概率取 i，否则取 _alias[i]
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        self._prob = prob
+        self._alias = alias
+
+    def _one(self, rand) -> int:
+        u = rand() * len(self._prob)
+        i = int(u)
+        return i if u - i < self._prob[i] else self._alias[i]
+
+    def counts(self, count: int, rng: Optional[random.Random] = None) -> List[int]:
+        """抽 count 个原子，返回按颜色编码顺序的各色个数（长度同权重）。"""
+        rand = (rng or random).random
+        prob, alias = self._prob, self._alias
+        n = len(prob)
+        out = [0] * n
+        for _ in range(count):
+            u = rand() * n
+            i = int(u)
+            out[i if u - i < prob[i] else alias[i]] += 1
+        return out
+
+    def draw(self, count: int, rng: Optional[random.Random] = None) -> List[Color]:
+        """抽 count 个原子，按抽到的顺序返回颜色列表。"""
+        rand = (rng or random).random
+        return [COLORS[self._one(rand)] for _ in range(count)]
+
+    def counts_batch(self, counts: Sequence[int], rng=None):
+        """
+        一次抽多局：counts[k] 为第 k 局要抽的个数，返回形状 (len(counts), 颜色数) 的 NumPy 整数数组。
+        rng 为 numpy.random.Generator 或其种子（None 时另取熵）。需安装 numpy。
+        """
+        import numpy as np
+
+        gen = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+        return gen.multinomial(np.asarray(counts, dtype=np.int64), self.probs)
+
+
+@lru_cache(maxsize=64)
+def atom_sampler(weights: Tuple[int, ...]) -> AtomSampler:
+    """该组权重的抽取器（按权重缓存，同一配置只建一次）；权重全为 0 时用默认权重。"""
+    if not any(weights):
+        weights = tuple(DEFAULT_WEIGHTS)
+    return AtomSampler(weights)
+
+
+PROBS = atom_sampler(tuple(DEFAULT_WEIGHTS)).probs
+
+
+def draw_atoms(count: int, weights: Optional[List[int]] = None, rng: Optional[random.Random] = None) -> List[Color]:
+    """
+    随机抽取 count 个原子，返回颜色列表。weights 见模块说明，默认 [3,1,1,1]。
+    rng 为随机源（对局中传 GameState.rng），默认为 random 模块。
+    """
+    return atom_sampler(tuple(weights or DEFAULT_WEIGHTS)).draw(count, rng)
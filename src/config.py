@@ -1,8 +1,12 @@
 """
 全局配置：窗口、颜色、网格常数、字体（中文支持）
+pygame 只在取字体时才导入，规则与网格模块因此可以在无 pygame 的环境中使用。
 """
 import math
-import pygame
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pygame
 
 # 版本（发布时在此更新）
 VERSION = "1.17.0"
@@ -29,6 +33,10 @@ COLORS = {
     "atom_red": (200, 70, 70),
     "atom_blue": (70, 120, 200),
     "atom_green": (70, 160, 100),
+    "atom_yellow": (200, 168, 50),
+    "atom_purple": (124, 58, 237),
+    "atom_white": (232, 232, 232),
+    "atom_gray": (107, 114, 128),
     "ui_text": (220, 220, 220),
     "ui_accent": (120, 180, 220),
 }
@@ -65,8 +73,10 @@ FONT_NAMES_CJK = [
 ]
 
 
-def get_font(size: int, bold: bool = False) -> pygame.font.Font:
+def get_font(size: int, bold: bool = False) -> "pygame.font.Font":
     """返回支持中文的字体。"""
+    import pygame
+
     for name in FONT_NAMES_CJK:
         try:
             f = pygame.font.SysFont(name, size, bold=bold)
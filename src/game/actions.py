@@ -0,0 +1,81 @@
+"""
+引擎动作：玩家在一局中可做的每一步，均为不可变的小对象，交给 GameEngine.apply() 执行。
+格子下标 0..2；(r, c) 为格点。Pick / ChooseComponent 作用于被攻击方的格子。
+"""
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from src.grid.colors import Color
+
+
+@dataclass(frozen=True)
+class Place:
+    """排布阶段：从池中取一个 color 原子放到己方 cell_index 格的 (r, c)。"""
+    cell_index: int
+    r: int
+    c: int
+    color: Color
+
+
+@dataclass(frozen=True)
+class BatchPlace:
+    """排布阶段：从池中取最多 n 个黑原子批量放到己方 cell_index 格。"""
+    cell_index: int
+    n: int
+
+
+@dataclass(frozen=True)
+class UndoPlace:
+    """排布阶段：撤回本回合最近一次单个放置。"""
+
+
+@dataclass(frozen=True)
+class EndPlace:
+    """结束排布，进入动作阶段。"""
+
+
+@dataclass(frozen=True)
+class Attack:
+    """以己方 cell_index 格进攻对方 target_cell 格；target_cell 为 None 表示直接攻击玩家（仅对方三格皆空时）。"""
+    cell_index: int
+    target_cell: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Effect:
+    """发动己方 cell_index 格 (r, c) 上红/蓝/绿原子的效果；红效果须给出作用的对方格子 target_cell。"""
+    cell_index: int
+    r: int
+    c: int
+    target_cell: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Pick:
+    """结算中点选被攻击方的一个原子：要破坏的黑原子、额外破坏的原子或红效果的破坏目标。"""
+    cell_index: int
+    r: int
+    c: int
+
+
+@dataclass(frozen=True)
+class ChooseComponent:
+    """被攻击方选择要保留的连通区域（或黑原子连通子集），以其中任一格点表示。"""
+    cell_index: int
+    r: int
+    c: int
+
+
+@dataclass(frozen=True)
+class Cancel:
+    """放弃当前未完成的结算步骤（已执行的破坏不回退）。"""
+
+
+@dataclass(frozen=True)
+class EndTurn:
+    """结束回合：结算绿持续效果，轮到对方。"""
+
+
+Action = Union[
+    Place, BatchPlace, UndoPlace, EndPlace, Attack, Effect, Pick, ChooseComponent, Cancel, EndTurn
+]
@@ -0,0 +1,445 @@
+"""
+GameState 的紧凑二进制编码，供回放、数据集与联机同步大量存取局面。
+
+格式（版本 4，整数均为 LEB128 变长，可为负者先做 zigzag）：
+  版本号 1 字节
+  标志 1 字节：当前玩家(1 位) | 阶段(2 位) | 先手首回合(1 位) | 阶段 0 选项(2 位，0 为未选)
+              | 基础数值与配置不同(1 位) | 有蓝保护(1 位)
+  随机源：附加位 1 字节（1 位：含梅森旋转状态，2 位：含正态分布缓存，4 位：含种子且为 64 位无符号数，
+          8 位：含其他种子）；种子依次为 8 字节小端整数或 zigzag 变长整数，有状态时为 625 个 32 位小端整数，
+          有缓存时为 8 字节小端浮点数。种子与配置的种子相同或调用方不要时不写，解码时按配置取种子；
+          不含状态时解码出的局面从种子重新开始抽取
+  回合号、本回合抽取数/放置上限/进攻上限/已放置/已进攻
+  双方生命（zigzag）
+  双方原子池：各为非零颜色的位图，随后按颜色编码写各非零数量
+  [基础数值与配置不同时] 基础抽取数、基础放置上限、抽取权重个数 + 各项
+  [有蓝保护时] 双方各：截止回合号（zigzag），3 格受保护格点数 + 各格点编号
+  位流（低位在前，至字节末尾），每格：
+    1 位是否有原子；有则写首行（相对网格首行，定长）与行数的 Elias gamma 码，
+    逐行写本行最左、最右原子的列号：首行为列号（相对网格最左列，定长）与宽度的 gamma 码，
+    其余各行为与上一行之差（zigzag 后 + 1 的 gamma 码；空行记为最左列不变、最右列为其左一列），
+    随后是两端之间各格点是否有原子（两端必有，不写）；
+    最后按编号升序写颜色：每个原子 1 位（0 为黑），再把非黑原子的（颜色编码 - 1）
+    按二进制位拆成 3 个位平面，每个平面各非黑原子 1 位。
+成团的排布每行只多几位行端差值，位数约为「原子数 + 行数 × 常数」加上颜色，远少于逐个写编号。
+编码与解码都不逐个原子处理：各行的原子位直接截取颜色编码串（Cell.color_codes）的一段，颜色位平面由
+bytes.translate 整串映射；位流以 b"0"/b"1" 分段收集，最后一次转成整数。
+解码时由各行拼出按编号的颜色编码串，一次装入格子（Cell.load_codes）。
+局面所用的配置（网格形状等）不写入，解码时由调用方给出。
+"""
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+from src.grid.cell import ATOM_BLACK, EMPTY
+from src.grid.colors import NUM_COLORS
+from src.grid.triangle import GridGeometry, iter_bits
+from src.game.game_config import GameConfig
+from src.game.pool import AtomPool
+from src.game.state import GameState, CHOICE_EXTRA_DRAW, CHOICE_EXTRA_PLACE, CHOICE_EXTRA_ATTACK
+
+FORMAT_VERSION = 4
+
+# 非黑原子的颜色位数（编码 1..NUM_COLORS-1 减 1 后写入）
+_COLOR_BITS = (NUM_COLORS - 2).bit_length()
+
+_CHOICES = (None, CHOICE_EXTRA_DRAW, CHOICE_EXTRA_PLACE, CHOICE_EXTRA_ATTACK)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# 颜色编码串（每项一个字节，空位 0xff）-> 位流字符的映射表
+_EMPTY = bytes((EMPTY & 0xFF,))
+_BLACK = bytes((ATOM_BLACK,))
+_OCCUPIED = bytes.maketrans(bytes(range(256)), b"1" * 255 + b"0")
+_NONBLACK = bytes.maketrans(bytes(range(256)), b"0" + b"1" * 255)
+_PLANES = tuple(
+    bytes.maketrans(
+        bytes(range(256)),
+        bytes(b"01"[(code - 1) >> k & 1] if 0 < code < NUM_COLORS else 48 for code in range(256)),
+    )
+    for k in range(_COLOR_BITS)
+)
+# 解码：颜色编码 c 先记作字符 chr(97 + c)，空位为 "0"，整串再映射回字节
+_DIGIT_CODES = str.maketrans("0123456789abcdef"[:1 << _COLOR_BITS], "".join(chr(98 + d) for d in range(1 << _COLOR_BITS)))
+_TO_CODES = bytes.maketrans(
+    b"0" + bytes(range(97, 98 + (1 << _COLOR_BITS))), _EMPTY + bytes(range(1 + (1 << _COLOR_BITS)))
+)
+
+
+def _zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _bits(v: int, n: int) -> bytes:
+    """v 的低 n 位，低位在前的 b"0"/b"1" 串。"""
+    return format(v & ((1 << n) - 1) | 1 << n, "b")[:0:-1].encode()
+
+
+def _gamma(v: int) -> bytes:
+    """正整数 v 的 Elias gamma 码：n 个 0、一个 1，再写 v 的低 n 位（n = v 的位数 - 1）。"""
+    n = v.bit_length() - 1
+    return b"0" * n + b"1" + _bits(v, n)
+
+
+class _Layout:
+    """一种网格几何的逐行布局与行端码表（按几何缓存）。"""
+
+    __slots__ = ("rows", "row_of", "row_bits", "col_min", "col_bits", "gamma", "deltas", "gamma_of", "delta_of")
+
+    def __init__(self, geom: GridGeometry):
+        # 各行：(首个编号, 末个编号 + 1, 列号 - 编号)；格点按行优先编号，同一行的编号连续
+        rows = {}
+        for i, (r, c) in enumerate(geom.points):
+            if r in rows:
+                rows[r][1] = i + 1
+            else:
+                rows[r] = [i, i + 1, c - i]
+        first = min(rows)
+        self.rows: Tuple[Tuple[int, int, int], ...] = tuple(tuple(rows[r]) for r in sorted(rows))
+        self.row_of: Tuple[int, ...] = tuple(r - first for r, _ in geom.points)
+        self.row_bits = (len(self.rows) - 1).bit_length()
+        cols = [c for _, c in geom.points]
+        self.col_min = min(cols)
+        span = max(cols) - self.col_min
+        self.col_bits = span.bit_length()
+        # 行端差值在 ±(span + 1) 之内；deltas[d] 为差值 d 的码（负数从表尾取）
+        self.gamma: Tuple[bytes, ...] = (b"",) + tuple(
+            _gamma(v) for v in range(1, max(len(self.rows), 2 * span + 3) + 1)
+        )
+        self.deltas: Tuple[bytes, ...] = tuple(
+            self.gamma[_zigzag(d) + 1] for d in list(range(span + 2)) + list(range(-span - 1, 0))
+        )
+        # 解码：码 -> 值
+        self.gamma_of: Dict[str, int] = {code.decode(): v for v, code in enumerate(self.gamma) if v}
+        self.delta_of: Dict[str, int] = {self.gamma[_zigzag(d) + 1].decode(): d for d in range(-span - 1, span + 2)}
+
+
+@lru_cache(maxsize=None)
+def _layout(geom: GridGeometry) -> _Layout:
+    return _Layout(geom)
+
+
+class _Reader:
+    """在只读缓冲区上顺序读取，不复制数据。"""
+
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf: memoryview):
+        self.buf = buf
+        self.pos = 0
+
+    def byte(self) -> int:
+        if self.pos >= len(self.buf):
+            raise ValueError("编码数据不完整")
+        b = self.buf[self.pos]
+        self.pos += 1
+        return b
+
+    def chunk(self, n: int) -> memoryview:
+        if self.pos + n > len(self.buf):
+            raise ValueError("编码数据不完整")
+        self.pos += n
+        return self.buf[self.pos - n:self.pos]
+
+    def varint(self) -> int:
+        n = shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+
+def _encode_cell(cell, out: List[bytes]) -> None:
+    """把一格的排布以 b"0"/b"1" 分段追加进位流 out（低位在前）。"""
+    codes = cell.color_codes()
+    occupied = codes.translate(_OCCUPIED)
+    first = occupied.find(b"1")
+    if first < 0:
+        out.append(b"0")
+        return
+    layout = _layout(cell.grid.geometry)
+    row_of = layout.row_of
+    y0 = row_of[first]
+    y1 = row_of[occupied.rfind(b"1")]
+    out.append(b"1" + _bits(y0, layout.row_bits) + layout.gamma[y1 - y0 + 1])
+    deltas = layout.deltas
+    rows = iter(layout.rows[y0:y1 + 1])
+    start, end, off = next(rows)
+    a = occupied.find(b"1", start, end)
+    b = occupied.rfind(b"1", start, end)
+    out.append(_bits(a + off - layout.col_min, layout.col_bits) + layout.gamma[b - a + 1])
+    out.append(occupied[a + 1:b])
+    lo, hi = a + off, b + off
+    for start, end, off in rows:
+        a = occupied.find(b"1", start, end)
+        if a < 0:
+            out.append(deltas[0] + deltas[lo - 1 - hi])
+            hi = lo - 1
+            continue
+        b = occupied.rfind(b"1", start, end)
+        out.append(deltas[a + off - lo] + deltas[b + off - hi])
+        out.append(occupied[a + 1:b])
+        lo, hi = a + off, b + off
+    atoms = codes.translate(None, _EMPTY)
+    out.append(atoms.translate(_NONBLACK))
+    nonblack = atoms.translate(None, _BLACK)
+    for table in _PLANES:
+        out.append(nonblack.translate(table))
+
+
+def _custom_base(state: GameState) -> bool:
+    cfg = state.config
+    return (
+        state.base_draw_count != cfg.base_draw_count
+        or state.base_place_limit != cfg.base_place_limit
+        or state.draw_weights != list(cfg.draw_weights)
+    )
+
+
+def _has_blue(state: GameState) -> bool:
+    return state.blue_protection_until_turn != [-1, -1] or any(map(any, state.blue_protected))
+
+
+def _put_rng(out: bytearray, state: GameState, with_rng: bool, with_seed: bool) -> None:
+    extras = 0
+    if with_seed and state.seed != state.config.seed:
+        extras = 4 if 0 <= state.seed < 1 << 64 else 8
+    if with_rng:
+        version, words, gauss = state.rng.getstate()
+        extras |= 1 | (gauss is not None) << 1
+    out.append(extras)
+    if extras & 4:
+        out += struct.pack("<Q", state.seed)
+    elif extras & 8:
+        _put_varint(out, _zigzag(state.seed))
+    if not with_rng:
+        return
+    words = array("I", words)
+    if sys.byteorder == "big":
+        words.byteswap()
+    out += words.tobytes()
+    if gauss is not None:
+        out += struct.pack("<d", gauss)
+
+
+def _read_rng(rd: "_Reader", config: Optional[GameConfig]) -> GameState:
+    """读出随机源并据此建新局面。"""
+    extras = rd.byte()
+    seed = None
+    if extras & 4:
+        (seed,) = struct.unpack("<Q", rd.chunk(8))
+    elif extras & 8:
+        seed = _unzigzag(rd.varint())
+    state = GameState(config, seed=seed)
+    if not extras & 1:
+        return state
+    words = array("I")
+    words.frombytes(rd.chunk(625 * 4))
+    if sys.byteorder == "big":
+        words.byteswap()
+    gauss = struct.unpack("<d", rd.chunk(8))[0] if extras & 2 else None
+    try:
+        state.rng.setstate((3, tuple(words), gauss))
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError("随机源状态无效") from None
+    return state
+
+
+def encode_state(state: GameState, with_rng: bool = False, with_seed: bool = True) -> bytes:
+    """
+    把局面编码为 bytes。随机源默认只记种子（与配置的种子相同时不记）；with_rng 为 True 时另记完整状态（约 2.5 KB），
+    解码后从同一位置继续抽取。with_seed 为 False 时不记种子（只关心局面本身的数据集可省 8 字节），
+    解码出的局面按配置取种子。
+    """
+    custom, blue = _custom_base(state), _has_blue(state)
+    out = bytearray((FORMAT_VERSION,))
+    out.append(
+        state.current_player
+        | state.phase << 1
+        | int(state.is_first_turn) << 3
+        | _CHOICES.index(state.phase_0_choice) << 4
+        | int(custom) << 6
+        | int(blue) << 7
+    )
+    _put_rng(out, state, with_rng, with_seed)
+    for n in (
+        state.turn_number, state.turn_draw_count, state.turn_place_limit,
+        state.turn_attack_limit, state.turn_placed_count, state.turn_attack_used,
+    ):
+        _put_varint(out, n)
+    for hp in state.hp:
+        _put_varint(out, _zigzag(hp))
+    for pool in state.pools:
+        counts = pool.counts()
+        _put_varint(out, sum(1 << k for k, n in enumerate(counts) if n))
+        for n in counts:
+            if n:
+                _put_varint(out, n)
+    if custom:
+        _put_varint(out, state.base_draw_count)
+        _put_varint(out, state.base_place_limit)
+        _put_varint(out, len(state.draw_weights))
+        for w in state.draw_weights:
+            _put_varint(out, w)
+    if blue:
+        for p in (0, 1):
+            _put_varint(out, _zigzag(state.blue_protection_until_turn[p]))
+            for cell, m in zip(state.cells[p], state.blue_protected[p]):
+                ids = cell.grid.geometry.ids_of(m)
+                _put_varint(out, len(ids))
+                for i in ids:
+                    _put_varint(out, i)
+    parts: List[bytes] = []
+    for cells in state.cells:
+        for cell in cells:
+            _encode_cell(cell, parts)
+    bits = b"".join(parts)
+    bits += b"0" * (-len(bits) % 8)
+    out += int(bits[::-1], 2).to_bytes(len(bits) // 8, "little")
+    return bytes(out)
+
+
+def _read_code(bits: str, pos: int, table: Dict[str, int]) -> Tuple[int, int]:
+    """读 pos 起的一个 gamma 码，按码表 table 取值，返回 (值, 新的 pos)；码不完整或不在表中时抛 ValueError。"""
+    end = 2 * bits.find("1", pos) - pos + 1
+    v = table.get(bits[pos:end])
+    if v is None or end <= pos:
+        raise ValueError("编码数据无效或不完整")
+    return v, end
+
+
+def _decode_cell(cell, bits: str, pos: int, end: int) -> int:
+    """
+    从位流 bits（低位在前的 "0"/"1" 字符串，共 end 位）的第 pos 位起读出一格的排布并装入 cell，返回新的 pos。
+    """
+    if pos >= end:
+        raise ValueError("编码数据不完整")
+    if bits[pos] == "0":
+        return pos + 1
+    geom = cell.grid.geometry
+    layout = _layout(geom)
+    k = pos + 1 + layout.row_bits
+    y0 = int("0" + bits[pos + 1:k][::-1], 2)
+    h, pos = _read_code(bits, k, layout.gamma_of)
+    rows = layout.rows[y0:y0 + h]
+    if len(rows) != h:
+        raise ValueError("格点行越界")
+    k = pos + layout.col_bits
+    lo = int("0" + bits[pos:k][::-1], 2) + layout.col_min
+    width, pos = _read_code(bits, k, layout.gamma_of)
+    hi = lo + width - 1
+    delta_of = layout.delta_of
+    parts = []
+    done = 0
+    for y, (start, row_end, off) in enumerate(rows):
+        if y:
+            d, pos = _read_code(bits, pos, delta_of)
+            lo += d
+            d, pos = _read_code(bits, pos, delta_of)
+            hi += d
+            if hi < lo:
+                if hi != lo - 1:
+                    raise ValueError("行端无效")
+                continue
+        a, b = lo - off, hi - off
+        if a < start or b >= row_end:
+            raise ValueError("格点越界")
+        parts.append("0" * (a - done))
+        if b > a:
+            parts.append("1")
+            parts.append(bits[pos:pos + b - a - 1])
+            pos += b - a - 1
+        parts.append("1")
+        done = b + 1
+    parts.append("0" * (geom.size - done))
+    occupied = "".join(parts)
+    # 颜色：先拼出各原子的颜色字符（黑为 "a"），再嵌回各原子所在的编号
+    n = occupied.count("1")
+    flags = bits[pos:pos + n]
+    pos += n
+    k = flags.count("1")
+    if k:
+        planes = [bits[pos + j * k:pos + (j + 1) * k] for j in range(_COLOR_BITS)]
+        pos += _COLOR_BITS * k
+        digits = sum(int(p, 16) << j for j, p in enumerate(planes)) | 1 << 4 * k
+        chars = [""] * (2 * k + 1)
+        chars[::2] = flags.split("1")
+        chars[1::2] = format(digits, "x")[1:].translate(_DIGIT_CODES)
+        atoms = "".join(chars).replace("0", "a")
+    else:
+        atoms = "a" * n
+    if pos > end:
+        raise ValueError("编码数据不完整")
+    chars = [""] * (2 * n + 1)
+    chars[::2] = occupied.split("1")
+    chars[1::2] = atoms
+    cell.load_codes("".join(chars).encode().translate(_TO_CODES))
+    return pos
+
+
+def decode_state(data: Buffer, config: Optional[GameConfig] = None) -> GameState:
+    """
+    由 encode_state 的输出重建局面（新对象，与 data 无共享）。data 可为 bytes 或 memoryview，
+    读取时不复制；config 须与编码时的局面一致（默认配置）。数据损坏或版本不符抛 ValueError。
+    """
+    buf = memoryview(data)
+    rd = _Reader(buf)
+    version = rd.byte()
+    if version != FORMAT_VERSION:
+        raise ValueError(f"不支持的编码版本：{version}")
+    flags = rd.byte()
+    state = _read_rng(rd, config)
+    state.current_player = flags & 1
+    state.phase = flags >> 1 & 3
+    state.is_first_turn = bool(flags >> 3 & 1)
+    state.phase_0_choice = _CHOICES[flags >> 4 & 3]
+    (
+        state.turn_number, state.turn_draw_count, state.turn_place_limit,
+        state.turn_attack_limit, state.turn_placed_count, state.turn_attack_used,
+    ) = (rd.varint() for _ in range(6))
+    state.hp = [_unzigzag(rd.varint()) for _ in range(2)]
+    for p in (0, 1):
+        used = rd.varint()
+        if used >> NUM_COLORS:
+            raise ValueError(f"原子池颜色位图无效：{used}")
+        pool = state.pools[p] = AtomPool()
+        for k in iter_bits(used):
+            pool.add_at(k, rd.varint())
+    if flags >> 6 & 1:
+        state.base_draw_count = rd.varint()
+        state.base_place_limit = rd.varint()
+        state.draw_weights = [rd.varint() for _ in range(rd.varint())]
+    if flags >> 7 & 1:
+        for p in (0, 1):
+            state.blue_protection_until_turn[p] = _unzigzag(rd.varint())
+            for ci, cell in enumerate(state.cells[p]):
+                bit_of = cell.grid.geometry.bit_of
+                m = 0
+                for _ in range(rd.varint()):
+                    i = rd.varint()
+                    if i >= len(bit_of):
+                        raise ValueError(f"格点编号越界：{i}")
+                    m |= 1 << bit_of[i]
+                state.blue_protected[p][ci] = m
+    end = (len(buf) - rd.pos) * 8
+    bits = bin(int.from_bytes(buf[rd.pos:], "little") | 1 << end)[:2:-1]
+    pos = 0
+    for cells in state.cells:
+        for cell in cells:
+            pos = _decode_cell(cell, bits, pos, end)
+    return state
@@ -2,25 +2,38 @@
 攻击力/防御力计算，破坏与连通分量结算，直接攻击，红/蓝/绿效果。
 """
 from __future__ import annotations
-from typing import Set, List, Optional, TYPE_CHECKING
+import random
+from dataclasses import dataclass
+from typing import Set, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from src.game.state import GameState
 
-from src.grid.cell import Cell, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
-from src.grid.triangle import vertical_distance_units, horizontal_distance_units, GridPoint
+from src.grid.cell import Cell, Color, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
+from src.grid.triangle import GridPoint
+from src.game.state import PHASE_ACTION
 
 
 def attack_power(cell: Cell) -> float:
     """进攻格攻击力：最高与最低黑原子的竖向距离（单位：三角形高 √3/2）。"""
-    blacks = cell.black_points()
-    return vertical_distance_units(blacks)
+    return float(cell.black_row_span())
 
 
 def defense_power(cell: Cell) -> float:
     """防守格防御力：最左与最右黑原子的横向距离（单位：边长 1）。"""
-    blacks = cell.black_points()
-    return horizontal_distance_units(blacks)
+    return float(cell.black_x_span())
+
+
+def powers_after_place(cell: Cell, r: int, c: int, color: Color) -> Tuple[float, float]:
+    """假设在 (r,c) 放置 color 后该格的 (攻击力, 防御力)，不修改格子。"""
+    rows, xs = cell.spans_after_place(r, c, color)
+    return float(rows), float(xs)
+
+
+def powers_after_remove(cell: Cell, r: int, c: int) -> Tuple[float, float]:
+    """假设移除 (r,c) 上的原子后该格的 (攻击力, 防御力)，不修改格子。"""
+    rows, xs = cell.spans_after_remove(r, c)
+    return float(rows), float(xs)
 
 
 def attack_beats_defense(attacker: Cell, defender: Cell) -> bool:
@@ -61,18 +74,21 @@ def destroy_one_black_and_get_components(
 
 def remove_components_except(cell: Cell, to_keep: Set[GridPoint]) -> None:
     """保留 to_keep 所在连通分量，移除其余分量上的所有原子。"""
-    components = cell.connected_components()
-    for comp in components:
-        if to_keep & comp:
-            continue
-        for (r, c) in comp:
-            cell.remove(r, c)
+    keep = cell.mask_of(to_keep)
+    cell.remove_components(cell.occupied_mask() & ~cell.components_touching(keep))
 
 
 def remove_component(cell: Cell, component: Set[GridPoint]) -> None:
-    """移除该连通分量上的所有原子（红效果选到无黑子集时整块破坏）。"""
-    for (r, c) in component:
-        cell.remove(r, c)
+    """
+    移除该连通分量上的所有原子（红效果选到无黑子集时整块破坏）。
+    component 恰为若干完整分量之并时整块删除；否则逐个移除，分量表随之拆分。
+    """
+    m = cell.mask_of(component) & cell.occupied_mask()
+    if cell.components_touching(m) == m:
+        cell.remove_components(m)
+        return
+    for i in cell.grid.geometry.ids_of(m):
+        cell.remove_at(i)
 
 
 def remove_black_atoms_except(cell: Cell, to_keep: Set[GridPoint]) -> None:
@@ -86,8 +102,7 @@ def remove_black_atoms_except(cell: Cell, to_keep: Set[GridPoint]) -> None:
 def clear_cell_if_no_black(cell: Cell) -> None:
     """若格子内无黑原子则清空整格（攻击/红效果结算后调用）。"""
     if not cell.has_black() and not cell.is_empty():
-        for p in list(cell.all_atoms().keys()):
-            cell.remove(p[0], p[1])
+        cell.clear()
 
 
 def remove_components_without_black_and_return_rest(cell: Cell) -> List[Set[GridPoint]]:
@@ -97,16 +112,38 @@ def remove_components_without_black_and_return_rest(cell: Cell) -> List[Set[Grid
     """
     if cell.is_empty():
         return []
-    components = cell.connected_components()
-    blacks = cell.black_points()
-    remaining: List[Set[GridPoint]] = []
-    for comp in components:
-        if comp & blacks:
-            remaining.append(comp)
-        else:
-            for (r, c) in comp:
-                cell.remove(r, c)
-    return remaining
+    with_black = cell.components_touching(cell.color_mask(ATOM_BLACK))
+    cell.remove_components(cell.occupied_mask() & ~with_black)
+    return cell.connected_components()
+
+
+def loss_if_destroyed(cell: Cell, pt: GridPoint) -> int:
+    """
+    破坏 pt 上的黑原子并结算后，该格共损失的原子数：无黑分量整块移除，
+    剩余多个含黑分量时按防守方保留最大的一个计；无黑则整格清空。不修改本格。
+    """
+    i = cell.grid.geometry.point_id(pt[0], pt[1])
+    if i < 0 or cell.code_at(i) != ATOM_BLACK:
+        return 0
+    b = 1 << cell.grid.geometry.bit_of[i]
+    blacks = cell.color_mask(ATOM_BLACK) & ~b
+    kept = max((m.bit_count() for m in cell.components_after_remove_at(i) if m & blacks), default=0)
+    return cell.occupied_mask().bit_count() - kept
+
+
+def best_black_to_destroy(
+    cell: Cell,
+    exclude: Optional[Set[GridPoint]] = None,
+) -> Optional[GridPoint]:
+    """该格中破坏后损失最大（loss_if_destroyed）的黑原子；exclude 中的格点（如受保护的）不考虑。"""
+    best, best_loss = None, -1
+    for pt in sorted(cell.black_points()):
+        if exclude and pt in exclude:
+            continue
+        loss = loss_if_destroyed(cell, pt)
+        if loss > best_loss:
+            best, best_loss = pt, loss
+    return best
 
 
 def resolve_direct_attack(cell: Cell) -> int:
@@ -155,6 +192,148 @@ def apply_effect_red(
     return True
 
 
+@dataclass(frozen=True)
+class StrikeResult:
+    """一次自动结算（进攻或红效果）的结果。"""
+    damage: int                                   # 对被攻击方造成的伤害
+    destroyed: Tuple[Tuple[int, GridPoint], ...]  # 被点名破坏的原子 (格子下标, 格点)，按破坏顺序
+    removed: int                                  # 连通性结算时连带移除的原子数
+    remaining: Tuple[Tuple[int, int], ...]        # 受影响格子结算后剩余原子的位掩码 (格子下标, 掩码)，至多一个分量
+
+
+def unprotected_black_ids(state: GameState, player: int, cell_i: int) -> List[int]:
+    """该玩家该格中未受蓝效果保护的黑原子编号。"""
+    cell = state.cells[player][cell_i]
+    m = cell.color_mask(ATOM_BLACK) & ~state.blue_protected[player][cell_i]
+    return cell.grid.geometry.ids_of(m)
+
+
+def strike_random(
+    state: GameState,
+    attacker_cell: Cell,
+    defender: int,
+    cell_i: int,
+    rng: Optional[random.Random] = None,
+) -> List[GridPoint]:
+    """
+    随机破坏对方该格 1 个未受保护的黑原子，再随机破坏 extra_destroys 个原子（受保护的黑原子除外）。
+    不结算连通性；返回被破坏的格点（无可破坏黑原子时为空）。rng 默认为该局的 state.rng。
+    """
+    rng = rng or state.rng
+    cell = state.cells[defender][cell_i]
+    blacks = unprotected_black_ids(state, defender, cell_i)
+    if not blacks:
+        return []
+    geom = cell.grid.geometry
+    first = rng.choice(blacks)
+    cell.remove_at(first)
+    hit = [first]
+    extra = extra_destroys(attacker_cell, cell)
+    if extra > 0:
+        pool = geom.ids_of(cell.occupied_mask() & ~state.blue_protected[defender][cell_i])
+        hit_extra = rng.sample(pool, min(extra, len(pool)))
+        for i in hit_extra:
+            cell.remove_at(i)
+        hit.extend(hit_extra)
+    return [geom.points[i] for i in hit]
+
+
+def settle_cell(cell: Cell) -> int:
+    """
+    破坏之后一次结算该格：无黑则清空；否则移除无黑分量，多个含黑分量时保留黑原子最多的一个（同数取原子多者），
+    其中黑原子不连通时只保留最大的黑连通子集，再移除因此脱离的原子。返回移除的原子数。
+    """
+    before = cell.occupied_mask().bit_count()
+    blacks = cell.color_mask(ATOM_BLACK)
+    if not blacks:
+        cell.clear()
+        return before
+    geom = cell.grid.geometry
+    keep = max(
+        (m for m in cell.component_masks() if m & blacks),
+        key=lambda m: ((m & blacks).bit_count(), m.bit_count()),
+    )
+    cell.remove_components(cell.occupied_mask() & ~keep)
+    black_parts = geom.components(blacks & keep)
+    if len(black_parts) > 1:
+        kept_blacks = max(black_parts, key=int.bit_count)
+        for i in geom.ids_of(blacks & keep & ~kept_blacks):
+            cell.remove_at(i)
+        cell.remove_components(cell.occupied_mask() & ~cell.components_touching(kept_blacks))
+    return before - cell.occupied_mask().bit_count()
+
+
+def resolve_attack_auto(
+    state: GameState,
+    attack_cell_i: int,
+    target_cell_i: int,
+    rng: Optional[random.Random] = None,
+) -> Optional[StrikeResult]:
+    """
+    当前玩家以 attack_cell_i 格进攻对方 target_cell_i 格并一次结算完毕：随机破坏（受蓝效果保护的黑原子除外）、
+    额外破坏、扣血、按 settle_cell 自动选择保留区域，计入本回合进攻次数。
+    不在动作阶段、本回合不能再进攻（次数用尽或首回合）、攻击力未大于防御力或目标为空时返回 None，不修改状态。
+    """
+    if state.phase != PHASE_ACTION or not state.can_attack_this_turn():
+        return None
+    attacker = state.current_player
+    defender = state.opponent(attacker)
+    atk_cell = state.cells[attacker][attack_cell_i]
+    cell = state.cells[defender][target_cell_i]
+    if cell.is_empty() or not attack_beats_defense(atk_cell, cell):
+        return None
+    # 黑原子全部受保护时不破坏原子，仍造成 1 点伤害
+    destroyed = strike_random(state, atk_cell, defender, target_cell_i, rng)
+    removed = settle_cell(cell) if destroyed else 0
+    state.hp[defender] = max(0, state.hp[defender] - 1)
+    state.turn_attack_used += 1
+    return StrikeResult(
+        damage=1,
+        destroyed=tuple((target_cell_i, pt) for pt in destroyed),
+        removed=removed,
+        remaining=((target_cell_i, cell.occupied_mask()),),
+    )
+
+
+def resolve_red_auto(
+    state: GameState,
+    attacker: int,
+    cell_index: int,
+    r: int,
+    c: int,
+    target_cell_i: int,
+    rng: Optional[random.Random] = None,
+) -> Optional[StrikeResult]:
+    """
+    发动红效果并一次结算完毕：在对方 target_cell_i 格随机破坏 min(y, 未受保护黑原子数) 个黑原子，
+    再按 settle_cell 自动结算该格。不在动作阶段、attacker 不是当前玩家、红原子无效或目标为空时返回 None，不修改状态。
+    """
+    if state.phase != PHASE_ACTION or attacker != state.current_player:
+        return None
+    cell = state.cells[attacker][cell_index]
+    if cell.get(r, c) != ATOM_RED:
+        return None
+    y = cell.count_black_neighbors(r, c)
+    defender = state.opponent(attacker)
+    target = state.cells[defender][target_cell_i]
+    if y <= 0 or target.is_empty():
+        return None
+    rng = rng or state.rng
+    blacks = unprotected_black_ids(state, defender, target_cell_i)
+    hit = rng.sample(blacks, min(y, len(blacks)))
+    cell.remove(r, c)
+    for i in hit:
+        target.remove_at(i)
+    removed = settle_cell(target) if hit else 0
+    points = target.grid.geometry.points
+    return StrikeResult(
+        damage=0,
+        destroyed=tuple((target_cell_i, points[i]) for i in hit),
+        removed=removed,
+        remaining=((target_cell_i, target.occupied_mask()),),
+    )
+
+
 def apply_effect_blue(state: GameState, player: int, cell_index: int, r: int, c: int) -> bool:
     """发动蓝效果：移除该蓝原子，与其相邻的黑原子在下一回合内不可被破坏。"""
     cells = state.cells[player]
@@ -166,7 +345,7 @@ def apply_effect_blue(state: GameState, player: int, cell_index: int, r: int, c:
     protected = cell.black_neighbors_of(r, c)
     cell.remove(r, c)
     for pt in protected:
-        state.blue_protected_points[player].add((cell_index, pt))
+        state.protect_black(player, cell_index, pt)
     state.blue_protection_until_turn[player] = state.turn_number + 1
     return True
 
@@ -186,11 +365,7 @@ def apply_effect_green(state: GameState, player: int, cell_index: int, r: int, c
 
 def apply_green_end_of_turn(state: GameState, player: int) -> int:
     """绿持续效果：回合结束时该玩家获得「己方所有绿原子邻接黑原子数」之和的黑原子。返回本次获得的数目。"""
-    total = 0
-    for cell in state.cells[player]:
-        for (r, c), color in list(cell.all_atoms().items()):
-            if color == ATOM_GREEN:
-                total += cell.count_black_neighbors(r, c)
+    total = sum(cell.green_y_sum for cell in state.cells[player])
     if total > 0:
         state.pools[player][ATOM_BLACK] = state.pools[player].get(ATOM_BLACK, 0) + total
     return total
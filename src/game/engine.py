@@ -0,0 +1,675 @@
+"""
+无界面的游戏引擎：持有 GameState 与动作阶段尚未完成的结算步骤，按动作对象（见 actions）推进整局。
+不依赖 pygame；main.py 只负责把点击翻译成动作，模拟、服务端与基准可直接驱动整局。
+"""
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from src.grid.cell import Cell, EMPTY, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
+from src.grid.triangle import GridPoint
+from src.game import combat
+from src.game.actions import (
+    Action,
+    Place,
+    BatchPlace,
+    UndoPlace,
+    EndPlace,
+    Attack,
+    Effect,
+    Pick,
+    ChooseComponent,
+    Cancel,
+    EndTurn,
+)
+from src.game.game_config import GameConfig
+from src.game.state import GameState, PHASE_CONFIRM, PHASE_PLACE, PHASE_ACTION
+from src.game.turn import (
+    start_turn_default,
+    validate_place,
+    apply_place,
+    batch_place_on_cell,
+    end_place_phase,
+    end_turn,
+)
+
+# 动作阶段待完成的结算步骤（与界面提示所用的名称一致）
+IDLE = "idle"
+ATTACK_CHOOSE_BLACK = "attack_choose_black"                      # 进攻方点选要破坏的黑原子
+ATTACK_CHOOSE_EXTRA = "attack_choose_extra"                      # 进攻方点选额外破坏的原子
+ATTACK_CHOOSE_COMPONENT = "attack_choose_component"              # 被攻击方选保留的连通区域
+ATTACK_CHOOSE_BLACK_COMPONENT = "attack_choose_black_component"  # 被攻击方选保留的黑原子连通子集
+RED_PICK = "effect_red_pick"                                     # 红效果：点选要破坏的黑原子
+RED_CHOOSE_COMPONENT = "effect_red_choose_component"
+RED_CHOOSE_BLACK_COMPONENT = "effect_red_choose_black_component"
+
+PICK_STEPS = (ATTACK_CHOOSE_BLACK, ATTACK_CHOOSE_EXTRA, RED_PICK)
+CHOOSE_STEPS = (
+    ATTACK_CHOOSE_COMPONENT,
+    ATTACK_CHOOSE_BLACK_COMPONENT,
+    RED_CHOOSE_COMPONENT,
+    RED_CHOOSE_BLACK_COMPONENT,
+)
+
+# 结果事件：界面据此播放音效
+EV_PLACE = "place"
+EV_UNDO = "undo"
+EV_ATTACK = "attack"
+EV_DESTROY = "destroy"
+EV_EFFECT = "effect"
+EV_TURN_END = "turn_end"
+
+
+# 可能改动随机源的动作（随机落点、随机破坏、红效果随机目标、回合结束后抽原子；撤回会倒回放置前的随机源）
+_RNG_ACTIONS = (Place, BatchPlace, UndoPlace, Attack, Effect, EndTurn)
+
+# 撤销时需恢复的 GameState 标量字段（列表字段以元组记录）
+_FIELDS = (
+    "current_player", "phase", "phase_0_choice",
+    "turn_draw_count", "turn_place_limit", "turn_attack_limit",
+    "turn_placed_count", "turn_attack_used", "turn_number", "is_first_turn",
+    "hp", "blue_protected", "blue_protection_until_turn",
+)
+
+
+def _fields_of(state: GameState) -> tuple:
+    return (
+        state.current_player, state.phase, state.phase_0_choice,
+        state.turn_draw_count, state.turn_place_limit, state.turn_attack_limit,
+        state.turn_placed_count, state.turn_attack_used, state.turn_number, state.is_first_turn,
+        tuple(state.hp), tuple(map(tuple, state.blue_protected)), tuple(state.blue_protection_until_turn),
+    )
+
+
+@dataclass(frozen=True)
+class UndoToken:
+    """
+    一次 apply() 的增量记录，交给 GameEngine.undo() 精确还原；须按与 apply 相反的顺序撤销。
+    只记录变化部分：原子增删、改动前的标量字段与池计数，以及改动前的结算步骤。
+    """
+    atoms: Tuple[Tuple[Cell, int, int, int], ...]  # (格子, 编号, 原编码, 新编码)，按发生顺序
+    fields: Tuple[Tuple[str, object], ...]         # (字段名, 原值)
+    pools: Tuple[Tuple[int, int, int], ...]        # (玩家, 池颜色编码, 原数量)
+    pending: Optional[tuple]                       # 改动前的结算步骤（见 GameEngine._pending）；空闲为 None
+    history: "List[UndoToken]"                     # 改动前的本阶段放置记录
+    rng: Optional[tuple] = None                    # 可能抽取随机数的动作：改动前的随机源状态
+
+
+@dataclass(frozen=True)
+class Outcome:
+    """一次动作的结果：是否被执行、给玩家的提示、发生的事件，以及撤销用的增量记录。"""
+    ok: bool
+    message: str = ""
+    events: Tuple[str, ...] = ()
+    token: Optional[UndoToken] = None
+
+
+class GameEngine:
+    """
+    一局游戏：state 为规则状态，step 为动作阶段当前待完成的结算步骤（IDLE 表示无）。
+    回合开始时自动按默认抽牌进入排布阶段。
+    """
+
+    def __init__(
+        self,
+        config: Optional[GameConfig] = None,
+        state: Optional[GameState] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.state = state if state is not None else GameState(config=config)
+        # 随机破坏、随机落点所用的随机源；None 时用该局自己的随机源（见 rng）
+        self._rng = rng
+        # 本排布阶段成功的放置（含批量）的撤销记录，供「撤回」与高亮；只整体替换、不原地修改
+        self.history: List[UndoToken] = []
+        self._handlers: Dict[type, Callable[..., Outcome]] = {
+            Place: self._place,
+            BatchPlace: self._batch_place,
+            UndoPlace: self._undo_place,
+            EndPlace: self._end_place,
+            Attack: self._attack,
+            Effect: self._effect,
+            Pick: self._pick,
+            ChooseComponent: self._choose_component,
+            Cancel: self._cancel,
+            EndTurn: self._end_turn,
+        }
+        self._reset_action()
+        self._start_turn_if_needed()
+
+    # ---- 对外 ----
+
+    def apply(self, action: Action) -> Outcome:
+        """
+        执行一个动作；不合法时返回 ok=False 与原因。结果带撤销记录 token，
+        undo(token) 可把局面（含结算步骤）精确还原到本次 apply 之前。
+        """
+        if self.state.winner() is not None:
+            return Outcome(False, "对局已结束")
+        handler = self._handlers.get(type(action))
+        if handler is None:
+            return Outcome(False, "未知动作")
+        state = self.state
+        fields = _fields_of(state)
+        pools = [pool.counts() for pool in state.pools]
+        pending = self._pending()
+        history = self.history
+        rng = self.rng.getstate() if isinstance(action, _RNG_ACTIONS) else None
+        journal: List[Tuple[Cell, int, int, int]] = []
+        for cells in state.cells:
+            for cell in cells:
+                cell.set_journal(journal)
+        try:
+            outcome = handler(action)
+        finally:
+            for cells in state.cells:
+                for cell in cells:
+                    cell.set_journal(None)
+        after = _fields_of(state)
+        token = UndoToken(
+            atoms=tuple(journal),
+            fields=tuple((name, old) for name, old, new in zip(_FIELDS, fields, after) if old != new),
+            pools=tuple(
+                (p, k, n)
+                for p, pool in enumerate(state.pools)
+                for k, n in enumerate(pools[p])
+                if pool.count_at(k) != n
+            ),
+            pending=pending,
+            history=history,
+            rng=rng,
+        )
+        if outcome.ok and state.phase == PHASE_PLACE and isinstance(action, (Place, BatchPlace)):
+            self.history = self.history + [token]
+        return Outcome(outcome.ok, outcome.message, outcome.events, token)
+
+    def undo(self, token: UndoToken) -> None:
+        """撤销 token 对应的那次 apply；其后的 apply 须已先撤销。"""
+        for cell, i, old, new in reversed(token.atoms):
+            if old == EMPTY:
+                cell.remove_at(i)
+            else:
+                cell.place_at(i, old)
+        state = self.state
+        for name, old in token.fields:
+            if name == "blue_protected":
+                old = [list(masks) for masks in old]
+            elif isinstance(old, tuple):
+                old = list(old)
+            setattr(state, name, old)
+        for p, k, n in token.pools:
+            pool = state.pools[p]
+            pool.add_at(k, n - pool.count_at(k))
+        self._restore_pending(token.pending)
+        self.history = token.history
+        if token.rng is not None:
+            self.rng.setstate(token.rng)
+
+    def placed_points(self) -> Dict[int, Set[GridPoint]]:
+        """本排布阶段仍可撤回的落点 {格子下标: {(r, c), ...}}，供高亮。"""
+        cells = self.state.cells[self.state.current_player]
+        out: Dict[int, Set[GridPoint]] = {}
+        for token in self.history:
+            for cell, i, old, new in token.atoms:
+                if old == EMPTY and cell.code_at(i) == new:
+                    ci = next(k for k, c in enumerate(cells) if c is cell)
+                    out.setdefault(ci, set()).add(cell.grid.geometry.points[i])
+        return out
+
+    def winner(self) -> Optional[int]:
+        return self.state.winner()
+
+    @property
+    def rng(self) -> random.Random:
+        """随机破坏、随机落点所用的随机源。"""
+        return self._rng or self.state.rng
+
+    @property
+    def defender(self) -> int:
+        """当前进攻/红效果的被攻击方（即当前玩家的对手）。"""
+        return self.state.opponent(self.state.current_player)
+
+    def red_picked(self) -> List[Tuple[int, int, GridPoint]]:
+        """红效果已点选的破坏目标 [(player, cell_i, (r, c)), ...]。"""
+        return list(self.red_pending[5]) if self.red_pending is not None else []
+
+    # ---- 内部状态 ----
+
+    def _reset_action(self) -> None:
+        self.step = IDLE
+        self.attack_cell: Optional[int] = None
+        self.attack_target: Optional[int] = None
+        self.attack_components: Optional[List[Set[GridPoint]]] = None
+        self.attack_extra: Optional[Tuple[int, List[GridPoint]]] = None
+        # (进攻方, 红原子所在格, r, c, y, 已选目标)
+        self.red_pending: Optional[Tuple[int, int, int, int, int, List[Tuple[int, int, GridPoint]]]] = None
+        self.red_target_cell: Optional[int] = None
+        # (被攻击方, [(格子下标, 连通分量列表), ...])：红效果后有多个分量、待选保留的格子
+        self.red_components_pending: Optional[Tuple[int, List[Tuple[int, List[Set[GridPoint]]]]]] = None
+        # (被攻击方, 格子下标, [黑原子连通子集, ...])
+        self.black_components_pending: Optional[Tuple[int, int, List[Set[GridPoint]]]] = None
+
+    def _pending(self) -> Optional[tuple]:
+        """当前结算步骤的快照（可变列表各复制一份）；空闲时为 None。"""
+        if self.step == IDLE:
+            return None
+        extra = self.attack_extra
+        red = self.red_pending
+        red_comps = self.red_components_pending
+        return (
+            self.step,
+            self.attack_cell,
+            self.attack_target,
+            self.attack_components,
+            extra and (extra[0], list(extra[1])),
+            red and red[:5] + (list(red[5]),),
+            self.red_target_cell,
+            red_comps and (red_comps[0], list(red_comps[1])),
+            self.black_components_pending,
+        )
+
+    def _restore_pending(self, pending: Optional[tuple]) -> None:
+        self._reset_action()
+        if pending is None:
+            return
+        (
+            self.step,
+            self.attack_cell,
+            self.attack_target,
+            self.attack_components,
+            extra,
+            red,
+            self.red_target_cell,
+            red_comps,
+            self.black_components_pending,
+        ) = pending
+        self.attack_extra = extra and (extra[0], list(extra[1]))
+        self.red_pending = red and red[:5] + (list(red[5]),)
+        self.red_components_pending = red_comps and (red_comps[0], list(red_comps[1]))
+
+    def _start_turn_if_needed(self) -> None:
+        # 取消回合开始三选一：直接按默认抽牌与放置进入排布阶段
+        if self.state.phase == PHASE_CONFIRM:
+            start_turn_default(self.state)
+
+    def _random_mode(self) -> bool:
+        return getattr(self.state.config, "random_destroy_on_attack", False)
+
+    def _clear_no_black(self, player: int) -> None:
+        for cell in self.state.cells[player]:
+            combat.clear_cell_if_no_black(cell)
+
+    # ---- 排布阶段 ----
+
+    def _place(self, a: Place) -> Outcome:
+        state = self.state
+        cells = state.player_cells(state.current_player)
+        r, c = a.r, a.c
+        if (
+            0 <= a.cell_index < len(cells)
+            and state.phase == PHASE_PLACE
+            and getattr(state.config, "random_place_black_on_neighbor", False)
+            and a.color == ATOM_BLACK
+            and not cells[a.cell_index].is_empty()
+        ):
+            pt = cells[a.cell_index].random_empty_neighbor(self.rng)
+            if pt is None:
+                return Outcome(False, "该格无空邻格可放黑原子")
+            r, c = pt
+        ok, msg = validate_place(state, a.cell_index, r, c, a.color)
+        if not ok:
+            return Outcome(False, msg)
+        apply_place(state, a.cell_index, r, c, a.color)
+        return Outcome(True, f"已放置，还可放 {state.turn_place_limit - state.turn_placed_count} 个", (EV_PLACE,))
+
+    def _batch_place(self, a: BatchPlace) -> Outcome:
+        ok, msg = batch_place_on_cell(self.state, a.cell_index, a.n)
+        return Outcome(ok, msg, (EV_PLACE,) if ok else ())
+
+    def _undo_place(self, a: UndoPlace) -> Outcome:
+        if self.state.phase != PHASE_PLACE or not self.history:
+            return Outcome(False, "没有可撤回的放置")
+        self.undo(self.history[-1])
+        return Outcome(True, "已撤回一步", (EV_UNDO,))
+
+    def _end_place(self, a: EndPlace) -> Outcome:
+        if self.state.phase != PHASE_PLACE:
+            return Outcome(False, "当前不是排布阶段")
+        end_place_phase(self.state)
+        self._reset_action()
+        self.history = []
+        return Outcome(True, "进入动作阶段；点「结束回合」结束")
+
+    # ---- 动作阶段 ----
+
+    def _require_idle(self) -> Optional[Outcome]:
+        if self.state.phase != PHASE_ACTION:
+            return Outcome(False, "当前不是动作阶段")
+        if self.step != IDLE:
+            return Outcome(False, "请先完成当前结算")
+        return None
+
+    def _end_turn(self, a: EndTurn) -> Outcome:
+        blocked = self._require_idle()
+        if blocked is not None:
+            return blocked
+        state = self.state
+        green_gain = combat.apply_green_end_of_turn(state, state.current_player)
+        end_turn(state)
+        self._reset_action()
+        self.history = []
+        self._start_turn_if_needed()
+        message = f"P{state.current_player} 回合，请点击下方按钮选择效果"
+        if green_gain > 0:
+            message = f"绿持续效果：获得 {green_gain} 黑 | " + message
+        return Outcome(True, message, (EV_TURN_END,))
+
+    def _cancel(self, a: Cancel) -> Outcome:
+        if self.state.phase != PHASE_ACTION:
+            return Outcome(False, "当前不是动作阶段")
+        self._reset_action()
+        return Outcome(True, "已取消")
+
+    def _attack(self, a: Attack) -> Outcome:
+        blocked = self._require_idle()
+        if blocked is not None:
+            return blocked
+        state = self.state
+        cur, opp = state.current_player, self.defender
+        if not 0 <= a.cell_index < 3 or state.cells[cur][a.cell_index].is_empty():
+            return Outcome(False, "请选择己方非空格子进攻")
+        if not state.can_attack_this_turn():
+            return Outcome(False, "本回合不能再进攻")
+        atk_cell = state.cells[cur][a.cell_index]
+        if a.target_cell is None:
+            # 仅当对方三格皆空时可直接攻击玩家
+            if not all(cell.is_empty() for cell in state.cells[opp]):
+                return Outcome(False, "对方仍有原子，不能直接攻击")
+            dmg = combat.resolve_direct_attack(atk_cell)
+            state.hp[opp] = max(0, state.hp[opp] - dmg)
+            state.turn_attack_used += 1
+            self._reset_action()
+            return Outcome(True, f"直接攻击，造成 {dmg} 点伤害", (EV_ATTACK,))
+        if not 0 <= a.target_cell < 3 or state.cells[opp][a.target_cell].is_empty():
+            return Outcome(False, "请点击对方有原子的格子")
+        cell_i = a.target_cell
+        defender_cell = state.cells[opp][cell_i]
+        if not combat.attack_beats_defense(atk_cell, defender_cell):
+            self._reset_action()
+            return Outcome(False, "攻击力未大于防御力，无效果")
+        self.attack_cell, self.attack_target = a.cell_index, cell_i
+        blacks = combat.unprotected_black_ids(state, opp, cell_i)
+        if not blacks and defender_cell.has_black():
+            # 攻>防但对方黑原子全部受保护：不破坏原子，仍造成 1 点伤害
+            state.hp[opp] = max(0, state.hp[opp] - 1)
+            state.turn_attack_used += 1
+            self._reset_action()
+            return Outcome(True, "攻击造成 1 点伤害（对方黑原子受保护，未破坏）", (EV_ATTACK,))
+        if not (self._random_mode() and blacks):
+            self.step = ATTACK_CHOOSE_BLACK
+            return Outcome(True, "请点击要破坏的黑原子")
+        # 随机破坏模式下，红原子造成的额外破坏也随机选择
+        combat.strike_random(state, atk_cell, opp, cell_i, self.rng)
+        state.hp[opp] = max(0, state.hp[opp] - 1)
+        self._clear_no_black(opp)
+        comps = combat.remove_components_without_black_and_return_rest(defender_cell)
+        message, events = self._settle_attack(defender_cell, comps, "进攻完成")
+        return Outcome(True, message, events + (EV_DESTROY,))
+
+    def _settle_attack(
+        self,
+        defender_cell: Cell,
+        comps: List[Set[GridPoint]],
+        done_message: str,
+    ) -> Tuple[str, Tuple[str, ...]]:
+        """破坏之后：多个分量则待被攻击方选保留区域，多个黑子集则待选保留子集，否则本次进攻结束。"""
+        if len(comps) > 1:
+            self.attack_components = comps
+            self.step = ATTACK_CHOOSE_COMPONENT
+            return "请选择要保留的连通区域", ()
+        return self._settle_black_components(defender_cell, done_message)
+
+    def _settle_black_components(self, defender_cell: Cell, done_message: str) -> Tuple[str, Tuple[str, ...]]:
+        black_comps = defender_cell.black_connected_components()
+        if len(black_comps) > 1:
+            self.black_components_pending = (self.defender, self.attack_target, black_comps)
+            self.step = ATTACK_CHOOSE_BLACK_COMPONENT
+            return "请选择要保留的黑原子连通子集（点击其中一格点）", ()
+        combat.remove_components_without_black_and_return_rest(defender_cell)
+        self.state.turn_attack_used += 1
+        self._reset_action()
+        return done_message, (EV_ATTACK,)
+
+    def _effect(self, a: Effect) -> Outcome:
+        blocked = self._require_idle()
+        if blocked is not None:
+            return blocked
+        state = self.state
+        cur = state.current_player
+        if not 0 <= a.cell_index < 3:
+            return Outcome(False, "无效格子")
+        cell = state.cells[cur][a.cell_index]
+        color = cell.get(a.r, a.c)
+        if color == ATOM_BLUE:
+            if not combat.apply_effect_blue(state, cur, a.cell_index, a.r, a.c):
+                return Outcome(False, "无法发动蓝效果")
+            return Outcome(True, "蓝效果：相邻黑原子下一回合内不可被破坏", (EV_EFFECT,))
+        if color == ATOM_GREEN:
+            if not combat.apply_effect_green(state, cur, a.cell_index, a.r, a.c):
+                return Outcome(False, "无法发动绿效果")
+            return Outcome(True, "绿效果：该格点变为黑原子", (EV_EFFECT,))
+        if color != ATOM_RED:
+            return Outcome(False, "该格点没有可发动效果的原子")
+        y = cell.count_black_neighbors(a.r, a.c)
+        if y <= 0:
+            return Outcome(False, "该红原子未与黑相邻，无法发动")
+        def_player = self.defender
+        t = a.target_cell
+        if t is None or not 0 <= t < 3 or state.cells[def_player][t].is_empty():
+            return Outcome(False, "该格子为空，请点击对方有原子的格子")
+        self.red_pending = (cur, a.cell_index, a.r, a.c, y, [])
+        self.red_target_cell = t
+        if not self._random_mode():
+            self.step = RED_PICK
+            return Outcome(True, f"请点击该格子内 {y} 个要破坏的黑原子")
+        points = state.cells[def_player][t].grid.geometry.points
+        blacks = combat.unprotected_black_ids(state, def_player, t)
+        picked = [(def_player, t, points[i]) for i in self.rng.sample(blacks, min(y, len(blacks)))]
+        combat.apply_effect_red(state, cur, a.cell_index, a.r, a.c, picked)
+        return Outcome(True, self._settle_red(def_player), (EV_EFFECT,))
+
+    def _settle_red(self, def_player: int) -> str:
+        """红效果破坏之后：有多个分量的格子依次待被攻击方选保留区域，否则清空无黑格子并结束。"""
+        cells = self.state.cells[def_player]
+        cells_with_components = [
+            (c_i, cells[c_i].connected_components())
+            for c_i in range(3)
+            if cells[c_i].component_count() > 1
+        ]
+        if cells_with_components:
+            self.red_components_pending = (def_player, cells_with_components)
+            self.step = RED_CHOOSE_COMPONENT
+            return "红效果：被攻击方请选择要保留的连通区域（点击格点）；选无黑子集则该子集也破坏"
+        self._clear_no_black(def_player)
+        self._reset_action()
+        return "红效果已结算"
+
+    # ---- 点选与选择 ----
+
+    def _pick(self, a: Pick) -> Outcome:
+        if self.step == ATTACK_CHOOSE_BLACK:
+            return self._pick_attack_black(a)
+        if self.step == ATTACK_CHOOSE_EXTRA:
+            return self._pick_attack_extra(a)
+        if self.step == RED_PICK:
+            return self._pick_red(a)
+        return Outcome(False, "当前无需点选原子")
+
+    def _pick_attack_black(self, a: Pick) -> Outcome:
+        state = self.state
+        opp = self.defender
+        pt = (a.r, a.c)
+        if a.cell_index != self.attack_target or state.cells[opp][a.cell_index].get(a.r, a.c) != ATOM_BLACK:
+            return Outcome(False, "请点击被攻击格内的一个黑原子")
+        if state.is_black_protected(opp, a.cell_index, pt):
+            return Outcome(False, "该黑原子受蓝效果保护，无法选择")
+        cell = state.cells[opp][a.cell_index]
+        atk_cell = state.cells[state.current_player][self.attack_cell]
+        extra = combat.extra_destroys(atk_cell, cell)
+        dmg, _ = combat.destroy_one_black_and_get_components(atk_cell, cell, pt)
+        state.hp[opp] = max(0, state.hp[opp] - dmg)
+        self._clear_no_black(opp)
+        comps = combat.remove_components_without_black_and_return_rest(cell)
+        if extra > 0 and not cell.is_empty():
+            self.attack_extra = (extra, [])
+            self.step = ATTACK_CHOOSE_EXTRA
+            return Outcome(True, f"请再点击对方格中要破坏的原子（还可选 {extra} 个）")
+        message, events = self._settle_attack(cell, comps, "进攻完成")
+        return Outcome(True, message, events)
+
+    def _pick_attack_extra(self, a: Pick) -> Outcome:
+        state = self.state
+        opp = self.defender
+        pt = (a.r, a.c)
+        if a.cell_index != self.attack_target:
+            return Outcome(False, "请点击被攻击的格子内的原子")
+        cell = state.cells[opp][a.cell_index]
+        color = cell.get(a.r, a.c)
+        if color is None:
+            return Outcome(False, "该格点无原子")
+        if color == ATOM_BLACK and state.is_black_protected(opp, a.cell_index, pt):
+            return Outcome(False, "该黑原子受蓝效果保护，无法选择")
+        extra_count, picked = self.attack_extra
+        cell.remove(a.r, a.c)
+        picked.append(pt)
+        if len(picked) < extra_count and not cell.is_empty():
+            return Outcome(True, f"已选 {len(picked)}/{extra_count} 个额外破坏，请继续点击", (EV_ATTACK,))
+        self._clear_no_black(opp)
+        comps = combat.remove_components_without_black_and_return_rest(cell)
+        self.attack_extra = None
+        message, _ = self._settle_attack(cell, comps, "进攻完成")
+        return Outcome(True, message, (EV_ATTACK,))
+
+    def _pick_red(self, a: Pick) -> Outcome:
+        state = self.state
+        att, ci, rr, cc, y, picked = self.red_pending
+        def_player = state.opponent(att)
+        pt = (a.r, a.c)
+        if a.cell_index != self.red_target_cell:
+            return Outcome(False, "请点击已选格子内的原子")
+        if state.is_black_protected(def_player, a.cell_index, pt):
+            return Outcome(False, "该黑原子受蓝效果保护，无法选择")
+        cell = state.cells[def_player][a.cell_index]
+        if cell.get(a.r, a.c) != ATOM_BLACK:
+            return Outcome(False, "请点击该格子内的黑原子")
+        target = (def_player, a.cell_index, pt)
+        if target in picked:
+            return Outcome(False, f"已选 {len(picked)}/{y} 个要破坏的黑原子")
+        picked.append(target)
+        # 该格未受保护的黑原子不足 y 个时，选完即结算（与随机模式取 min(y, 可选数) 一致）
+        chosen = {pt for (_, _, pt) in picked}
+        points = cell.grid.geometry.points
+        if len(picked) < y and any(
+            points[i] not in chosen for i in combat.unprotected_black_ids(state, def_player, a.cell_index)
+        ):
+            return Outcome(True, f"已选 {len(picked)}/{y} 个要破坏的黑原子")
+        if not combat.apply_effect_red(state, att, ci, rr, cc, picked):
+            picked.pop()
+            return Outcome(False, "无法发动红效果")
+        return Outcome(True, self._settle_red(def_player), (EV_EFFECT,))
+
+    def _choose_component(self, a: ChooseComponent) -> Outcome:
+        if self.step == ATTACK_CHOOSE_COMPONENT:
+            return self._choose_attack_component(a)
+        if self.step == ATTACK_CHOOSE_BLACK_COMPONENT:
+            return self._choose_attack_black_component(a)
+        if self.step == RED_CHOOSE_COMPONENT:
+            return self._choose_red_component(a)
+        if self.step == RED_CHOOSE_BLACK_COMPONENT:
+            return self._choose_red_black_component(a)
+        return Outcome(False, "当前无需选择连通区域")
+
+    def _choose_attack_component(self, a: ChooseComponent) -> Outcome:
+        if a.cell_index != self.attack_target:
+            return Outcome(False, "请点击被攻击的格子内的格点")
+        defender_cell = self.state.cells[self.defender][self.attack_target]
+        for comp in self.attack_components:
+            if (a.r, a.c) in comp:
+                combat.remove_components_except(defender_cell, comp)
+                message, _ = self._settle_black_components(defender_cell, "进攻结算完成")
+                return Outcome(True, message, (EV_ATTACK,))
+        return Outcome(False, "请点击要保留的连通区域内的格点")
+
+    def _choose_black_component(self, a: ChooseComponent, mismatch: str) -> Union[str, Tuple[Cell, Set[GridPoint]]]:
+        """在待选的黑原子连通子集中找到包含 (r, c) 的一个；返回 (格子, 子集) 或提示信息。"""
+        player, cell_i, black_comps = self.black_components_pending
+        if a.cell_index != cell_i:
+            return mismatch
+        cell = self.state.cells[player][cell_i]
+        if cell.get(a.r, a.c) != ATOM_BLACK:
+            return "请点击黑原子所在格点"
+        for comp in black_comps:
+            if (a.r, a.c) in comp:
+                return cell, comp
+        return "请点击要保留的黑原子连通子集内的格点"
+
+    def _choose_attack_black_component(self, a: ChooseComponent) -> Outcome:
+        found = self._choose_black_component(a, "请点击被攻击的格子内的格点")
+        if isinstance(found, str):
+            return Outcome(False, found)
+        cell, comp = found
+        combat.remove_black_atoms_except(cell, comp)
+        combat.remove_components_without_black_and_return_rest(cell)
+        self.state.turn_attack_used += 1
+        self._reset_action()
+        return Outcome(True, "进攻结算完成", (EV_ATTACK,))
+
+    def _choose_red_component(self, a: ChooseComponent) -> Outcome:
+        def_player, cell_comps_list = self.red_components_pending
+        cell = self.state.cells[def_player][a.cell_index] if 0 <= a.cell_index < 3 else None
+        pt = (a.r, a.c)
+        if cell is None or cell.get(a.r, a.c) is None:
+            return Outcome(False, "请点击有原子的格点")
+        for idx, (c_i, components) in enumerate(cell_comps_list):
+            if c_i != a.cell_index:
+                continue
+            comp = next((comp for comp in components if pt in comp), None)
+            if comp is None:
+                continue
+            if comp & cell.black_points():
+                combat.remove_components_except(cell, comp)
+            else:
+                combat.remove_component(cell, comp)
+            black_comps = cell.black_connected_components()
+            if len(black_comps) > 1:
+                self.black_components_pending = (def_player, c_i, black_comps)
+                cell_comps_list.pop(idx)
+                self.step = RED_CHOOSE_BLACK_COMPONENT
+                return Outcome(True, "红效果：请选择要保留的黑原子连通子集（点击其中一格点）")
+            combat.remove_components_without_black_and_return_rest(cell)
+            comps_after = cell.connected_components()
+            if len(comps_after) <= 1:
+                cell_comps_list.pop(idx)
+            else:
+                cell_comps_list[idx] = (c_i, comps_after)
+            if not cell_comps_list:
+                self._clear_no_black(def_player)
+                self._reset_action()
+                return Outcome(True, "红效果已结算")
+            return Outcome(True, "红效果：请继续选择要保留的连通区域（或选无黑子集则破坏该子集）")
+        return Outcome(False, "请点击当前需选择的格子内的格点")
+
+    def _choose_red_black_component(self, a: ChooseComponent) -> Outcome:
+        found = self._choose_black_component(a, "请点击当前需选择的格子内的格点")
+        if isinstance(found, str):
+            return Outcome(False, found)
+        cell, comp = found
+        combat.remove_black_atoms_except(cell, comp)
+        combat.remove_components_without_black_and_return_rest(cell)
+        def_player, cell_comps_list = self.red_components_pending
+        if not cell_comps_list:
+            self._clear_no_black(def_player)
+            self._reset_action()
+            return Outcome(True, "红效果已结算")
+        self.step = RED_CHOOSE_COMPONENT
+        self.black_components_pending = None
+        return Outcome(True, "红效果：请继续选择要保留的连通区域（或选无黑子集则破坏该子集）")
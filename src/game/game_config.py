@@ -2,26 +2,29 @@
 开局与抽牌配置：双方初始原子数、每回合基础抽牌数、各颜色抽牌权重。
 """
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_YELLOW
+from src.grid.colors import Color
 
 
 @dataclass
 class GameConfig:
     """一局游戏的规则参数。"""
     # 开局双方原子池（各一份，双方相同）
-    initial_pool: Dict[str, int]
+    initial_pool: Dict[Color, int]
     # 每回合基础抽牌数（阶段 0 选「多抽」时为 base_draw_count + x）
     base_draw_count: int
     # 每回合基础可排布原子数（阶段 0 选「多放置」时为 base_place_limit + x）
     base_place_limit: int
-    # 抽牌权重 [黑, 红, 蓝, 绿]，整数，按权重随机
+    # 抽牌权重，按颜色编码顺序 [黑, 红, 蓝, 绿, 黄, ...]（见 src.grid.colors.Color），整数，按权重随机
     draw_weights: List[int]
     # 进攻时被破坏的黑原子由系统随机选择；红效果破坏目标也随机
     random_destroy_on_attack: bool = False
     # 放置黑原子时由系统随机选在已有原子的邻格上
     random_place_black_on_neighbor: bool = False
+    # 每局随机源的种子；None 时每局另取一个（仍记在 GameState.seed 上，可据此重放）
+    seed: Optional[int] = None
 
 
 def default_config() -> GameConfig:
@@ -0,0 +1,215 @@
+"""
+合法动作生成：列出 GameEngine 当前可执行的动作，供 AI 搜索、模糊测试与对战协议使用。
+
+惰性生成，按需逐个产出；count_legal_actions 只计数，放置与效果按位棋盘 popcount，不逐个构造动作。
+  排布阶段：各己方格的合法落点 × 池中有的颜色（未达放置上限时），最后为 EndPlace；
+            「黑原子随机放邻格」规则下非空格的黑原子落点由系统选，每格只产出一个 Place（坐标取任一合法落点，
+            给出放置过滤时取第一个被接受的落点）；
+            格子被拆成多个分量时系统落点不一定接触每个分量，可能被拒，故此时不列出黑原子放置
+  动作阶段：攻击力大于防御力的 (己方格, 对方格) 进攻（对方三格皆空时为直接攻击），
+            红（与黑相邻，× 对方非空格）/蓝/绿原子的效果，最后为 EndTurn
+  结算中：  可点选的原子（Pick）或各待选区域（ChooseComponent，以区域内最小格点表示），最后为 Cancel
+撤回（UndoPlace）与批量放置（BatchPlace）只是界面上的便利操作，不列出。
+"""
+from typing import Callable, Iterator, List, Optional, Set
+
+from src.grid.cell import Cell, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
+from src.grid.colors import Color, COLORS
+from src.grid.triangle import GridPoint
+from src.game import combat
+from src.game.actions import Action, Place, EndPlace, Attack, Effect, Pick, ChooseComponent, Cancel, EndTurn
+from src.game.engine import (
+    GameEngine,
+    IDLE,
+    ATTACK_CHOOSE_BLACK,
+    ATTACK_CHOOSE_EXTRA,
+    ATTACK_CHOOSE_COMPONENT,
+    RED_PICK,
+    RED_CHOOSE_COMPONENT,
+)
+from src.game.state import GameState, PHASE_PLACE, PHASE_ACTION
+
+# 放置过滤：(格子, 落点编号, 颜色) -> 是否列出
+PlaceFilter = Callable[[Cell, int, Color], bool]
+
+
+def placement_mask(cell: Cell) -> int:
+    """该格可放一个原子并保持连通的空位位掩码：空格为全部格点，否则须接触现有的每个分量。"""
+    geom = cell.grid.geometry
+    m = geom.all_bits & ~cell.occupied_mask()
+    for comp in cell.component_masks():
+        m &= geom.dilate(comp)
+    return m
+
+
+def changes_power(cell: Cell, i: int, color: Color) -> bool:
+    """放置过滤：只保留会改变该格攻击力或防御力的放置（黑原子落在现有黑原子的行或横向范围之外）。"""
+    if color != ATOM_BLACK:
+        return False
+    r, c = cell.grid.geometry.points[i]
+    return cell.spans_after_place(r, c, color) != (cell.black_row_span(), cell.black_x_span())
+
+
+def _place_colors(state: GameState, cell: Cell) -> List[Color]:
+    pool = state.pool(state.current_player)
+    if not cell.has_black():
+        return [ATOM_BLACK] if pool.count_at(ATOM_BLACK) > 0 else []
+    return [color for color in COLORS if pool.count_at(color) > 0]
+
+
+def _random_black(state: GameState, cell: Cell) -> bool:
+    """该格的黑原子落点是否由系统随机选（规则选项，仅对非空格）。"""
+    return getattr(state.config, "random_place_black_on_neighbor", False) and not cell.is_empty()
+
+
+def _random_black_ok(cell: Cell) -> bool:
+    """系统随机选的黑原子落点必被接受：格子只有一个分量（拆分后随机落点可能不接触其余分量）。"""
+    return cell.component_count() <= 1
+
+
+def _placements(state: GameState, place_filter: Optional[PlaceFilter]) -> Iterator[Action]:
+    if state.turn_placed_count < state.turn_place_limit:
+        for ci, cell in enumerate(state.cells[state.current_player]):
+            m = placement_mask(cell)
+            if not m:
+                continue
+            geom = cell.grid.geometry
+            points = geom.points
+            for color in _place_colors(state, cell):
+                if color == ATOM_BLACK and _random_black(state, cell):
+                    if not _random_black_ok(cell):
+                        continue
+                    # 落点由系统选，过滤作用于整格：任一落点通过即列出，坐标取第一个通过的落点
+                    ids = geom.ids_of(m)
+                    if place_filter is not None:
+                        ids = (i for i in ids if place_filter(cell, i, color))
+                    i = next(iter(ids), None)
+                    if i is not None:
+                        yield Place(ci, *points[i], color)
+                    continue
+                for i in geom.ids_of(m):
+                    if place_filter is None or place_filter(cell, i, color):
+                        yield Place(ci, *points[i], color)
+    yield EndPlace()
+
+
+def _effect_atoms(cell: Cell) -> int:
+    """可发动效果的原子：蓝、绿，以及与黑相邻的红。"""
+    geom = cell.grid.geometry
+    reds = cell.color_mask(ATOM_RED) & geom.dilate(cell.color_mask(ATOM_BLACK))
+    return reds | cell.color_mask(ATOM_BLUE) | cell.color_mask(ATOM_GREEN)
+
+
+def _idle_actions(state: GameState) -> Iterator[Action]:
+    cur = state.current_player
+    mine = state.cells[cur]
+    theirs = state.cells[state.opponent(cur)]
+    targets = [t for t, cell in enumerate(theirs) if not cell.is_empty()]
+    if state.can_attack_this_turn():
+        for ci, cell in enumerate(mine):
+            if cell.is_empty():
+                continue
+            if not targets:
+                yield Attack(ci)
+            for t in targets:
+                if combat.attack_beats_defense(cell, theirs[t]):
+                    yield Attack(ci, t)
+    for ci, cell in enumerate(mine):
+        geom = cell.grid.geometry
+        for i in geom.ids_of(_effect_atoms(cell)):
+            r, c = geom.points[i]
+            if cell.code_at(i) != ATOM_RED:
+                yield Effect(ci, r, c)
+            else:
+                for t in targets:
+                    yield Effect(ci, r, c, t)
+    yield EndTurn()
+
+
+def _representatives(cell_index: int, comps: List[Set[GridPoint]]) -> Iterator[Action]:
+    for comp in comps:
+        yield ChooseComponent(cell_index, *min(comp))
+
+
+def _pending_actions(engine: GameEngine) -> Iterator[Action]:
+    state = engine.state
+    opp = engine.defender
+    step = engine.step
+    if step in (ATTACK_CHOOSE_BLACK, ATTACK_CHOOSE_EXTRA, RED_PICK):
+        ci = engine.red_target_cell if step == RED_PICK else engine.attack_target
+        cell = state.cells[opp][ci]
+        protected = state.blue_protected[opp][ci]
+        if step == ATTACK_CHOOSE_BLACK:
+            m = cell.color_mask(ATOM_BLACK) & ~protected
+        elif step == ATTACK_CHOOSE_EXTRA:
+            m = cell.occupied_mask() & ~(cell.color_mask(ATOM_BLACK) & protected)
+        else:
+            m = cell.color_mask(ATOM_BLACK) & ~protected
+        picked = {pt for (_, _, pt) in engine.red_picked()}
+        points = cell.grid.geometry.points
+        for i in cell.grid.geometry.ids_of(m):
+            if points[i] not in picked:
+                yield Pick(ci, *points[i])
+    elif step == ATTACK_CHOOSE_COMPONENT:
+        yield from _representatives(engine.attack_target, engine.attack_components)
+    elif step == RED_CHOOSE_COMPONENT:
+        for ci, comps in engine.red_components_pending[1]:
+            yield from _representatives(ci, comps)
+    else:
+        _, ci, comps = engine.black_components_pending
+        yield from _representatives(ci, comps)
+    yield Cancel()
+
+
+def legal_actions(engine: GameEngine, place_filter: Optional[PlaceFilter] = None) -> Iterator[Action]:
+    """
+    惰性产出当前局面下 engine.apply() 会接受的动作（顺序固定）。对局已结束时不产出任何动作。
+    place_filter 给出时只列出它接受的放置（如 changes_power），其余动作不受影响；
+    「黑原子随机放邻格」的格子落点由系统选，过滤按整格判断：该格任一合法落点被接受即列出其黑原子放置。
+    """
+    state = engine.state
+    if state.winner() is not None:
+        return
+    if state.phase == PHASE_PLACE:
+        yield from _placements(state, place_filter)
+    elif state.phase == PHASE_ACTION:
+        if engine.step == IDLE:
+            yield from _idle_actions(state)
+        else:
+            yield from _pending_actions(engine)
+
+
+def count_legal_actions(engine: GameEngine) -> int:
+    """legal_actions(engine) 产出的动作数；放置与效果按位掩码计数，不构造动作对象。"""
+    state = engine.state
+    if state.winner() is not None:
+        return 0
+    if state.phase == PHASE_PLACE:
+        n = 1
+        if state.turn_placed_count < state.turn_place_limit:
+            for cell in state.cells[state.current_player]:
+                m = placement_mask(cell)
+                if m:
+                    for color in _place_colors(state, cell):
+                        if color == ATOM_BLACK and _random_black(state, cell):
+                            n += _random_black_ok(cell)
+                        else:
+                            n += m.bit_count()
+        return n
+    if state.phase != PHASE_ACTION:
+        return 0
+    if engine.step != IDLE:
+        return sum(1 for _ in _pending_actions(engine))
+    cur = state.current_player
+    theirs = state.cells[state.opponent(cur)]
+    n_targets = sum(1 for cell in theirs if not cell.is_empty())
+    n = 1
+    for cell in state.cells[cur]:
+        if state.can_attack_this_turn() and not cell.is_empty():
+            if not n_targets:
+                n += 1
+            n += sum(1 for t in theirs if not t.is_empty() and combat.attack_beats_defense(cell, t))
+        effects = _effect_atoms(cell)
+        reds = effects & cell.color_mask(ATOM_RED)
+        n += (effects & ~reds).bit_count() + reds.bit_count() * n_targets
+    return n
@@ -0,0 +1,85 @@
+"""
+原子池：每种颜色一个计数，存放在按颜色编码（src.grid.colors.Color）下标的定长整数数组中。
+可按颜色像 dict 一样读写（pool[color]、pool.get(color, 0)）；颜色名只在 to_dict / from_dict 出现。
+"""
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+from src.grid.colors import Color, COLORS, COLOR_NAMES, NUM_COLORS
+
+
+class AtomPool(MutableMapping):
+    """一名玩家的原子池。非颜色编码读作 0；写入非颜色编码抛 KeyError。"""
+
+    __slots__ = ("_counts",)
+
+    def __init__(self, initial: Optional[Mapping[Color, int]] = None):
+        self._counts = array("i", [0]) * NUM_COLORS
+        if initial:
+            for color, n in initial.items():
+                self[color] = n
+
+    @classmethod
+    def from_dict(cls, counts: Mapping[str, int]) -> "AtomPool":
+        """由 {颜色名: 个数} 建池（to_dict 的逆）；未知颜色名抛 ValueError。"""
+        return cls({Color.from_key(name): n for name, n in counts.items()})
+
+    def copy(self) -> "AtomPool":
+        other = AtomPool.__new__(AtomPool)
+        other._counts = array("i", self._counts)
+        return other
+
+    def count_at(self, code: int) -> int:
+        return self._counts[code]
+
+    def add_at(self, code: int, n: int = 1) -> None:
+        self._counts[code] += n
+
+    def counts(self) -> Tuple[int, ...]:
+        """按颜色编码顺序的全部计数。"""
+        return tuple(self._counts)
+
+    # ---- dict 接口（键为颜色编码） ----
+
+    def __getitem__(self, color: Color) -> int:
+        if color not in self:
+            raise KeyError(color)
+        return self._counts[color]
+
+    def get(self, color: Color, default: int = 0) -> int:
+        return self._counts[color] if color in self else default
+
+    def __setitem__(self, color: Color, n: int) -> None:
+        if color not in self:
+            raise KeyError(color)
+        self._counts[color] = n
+
+    def __delitem__(self, color: Color) -> None:
+        self[color] = 0
+
+    def __iter__(self) -> Iterator[Color]:
+        return iter(COLORS)
+
+    def __len__(self) -> int:
+        return NUM_COLORS
+
+    def __contains__(self, color: object) -> bool:
+        return type(color) in (Color, int) and 0 <= color < NUM_COLORS
+
+    def total(self) -> int:
+        return sum(self._counts)
+
+    def to_dict(self) -> Dict[str, int]:
+        """非零计数的 {颜色名: 个数}（供序列化与显示）。"""
+        return {name: n for name, n in zip(COLOR_NAMES, self._counts) if n}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, AtomPool):
+            return self._counts == other._counts
+        if isinstance(other, Mapping):
+            return {c: n for c, n in zip(COLORS, self._counts) if n} == {k: v for k, v in other.items() if v}
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"AtomPool({self.to_dict()!r})"
@@ -0,0 +1,217 @@
+"""
+JSON 存档：与网页版（web/src/game）同一结构，局面可在 pygame 客户端、React 客户端与离线工具间互通。
+
+格子沿用网页版 Cell.toJSON()：{"r,c": 颜色名}；颜色名与编码（src.grid.colors.Color）只在此处互转；整局为网页版 createGameState() 的字段（驼峰命名），
+其中 blueProtectedPoints 为 {玩家: ["格号:r,c", ...]}，blueProtectionUntilTurn 为 {玩家: 回合号}
+（网页版在回合号达到该值时解除保护，比本地的「保护持续到该回合号」多 1）。
+网页版独有的字段（黄/灰效果、本回合已攻击格子等）读入时忽略；本地另写 seed（本局随机源的种子），
+网页版忽略它，缺省时读入方另取种子。
+
+多局批量导出为每行一局的 NDJSON（write_games / read_games），逐局写出与读入，不在内存中保存全部对局。
+"""
+import json
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+from src.grid.cell import Cell
+from src.grid.colors import COLORS, COLOR_NAMES, COLOR_BY_NAME
+from src.game.game_config import GameConfig
+from src.game.pool import AtomPool
+from src.game.state import GameState, PHASE_CONFIRM, PHASE_ACTION, CHOICE_EXTRA_DRAW, CHOICE_EXTRA_PLACE, CHOICE_EXTRA_ATTACK
+
+JsonObj = Dict[str, Any]
+
+_CHOICES = (None, CHOICE_EXTRA_DRAW, CHOICE_EXTRA_PLACE, CHOICE_EXTRA_ATTACK)
+
+
+def _point_key(r: int, c: int) -> str:
+    return f"{r},{c}"
+
+
+def _parse_key(key: str) -> tuple:
+    r, c = key.split(",")
+    return int(r), int(c)
+
+
+def cell_to_json(cell: Cell) -> Dict[str, str]:
+    """同网页版 Cell.toJSON()：{"r,c": 颜色名}。"""
+    return {_point_key(r, c): COLOR_NAMES[color] for (r, c), color in cell.all_atoms().items()}
+
+
+def cell_from_json(obj: Dict[str, str], cell: Cell, trusted: bool = False) -> None:
+    """
+    把 {"r,c": 颜色名} 放入空格子 cell。trusted 为 False 时校验格点（在网格内、不重复）与颜色，
+    不符抛 ValueError；为 True 时信任输入，逐个直接放置。
+    不要求连通或含黑：对局中蓝效果移除原子后格子可暂时不连通（同网页版 Cell.fromJSON）。
+    """
+    geom = cell.grid.geometry
+    if trusted:
+        index = geom.index
+        for key, color in obj.items():
+            cell.place_at(index[_parse_key(key)], COLOR_BY_NAME[color])
+        return
+    for key, color in obj.items():
+        try:
+            r, c = _parse_key(key)
+        except ValueError:
+            raise ValueError(f"无效格点：{key!r}") from None
+        code = COLOR_BY_NAME.get(color)
+        if code is None:
+            raise ValueError(f"无效颜色：{color!r}")
+        i = geom.point_id(r, c)
+        if i < 0 or not cell.place_at(i, code):
+            raise ValueError(f"格点越界或重复：{key!r}")
+
+
+def state_to_json(state: GameState) -> JsonObj:
+    """整局状态的 JSON 对象（字段同网页版 createGameState）。"""
+    return {
+        "pools": [pool.to_dict() for pool in state.pools],
+        "hp": list(state.hp),
+        "cells": [[cell_to_json(cell) for cell in cells] for cells in state.cells],
+        "currentPlayer": state.current_player,
+        "phase": state.phase,
+        "phase0Choice": state.phase_0_choice,
+        "baseDrawCount": state.base_draw_count,
+        "basePlaceLimit": state.base_place_limit,
+        "drawWeights": list(state.draw_weights),
+        "turnDrawCount": state.turn_draw_count,
+        "turnPlaceLimit": state.turn_place_limit,
+        "turnAttackLimit": state.turn_attack_limit,
+        "turnPlacedCount": state.turn_placed_count,
+        "turnAttackUsed": state.turn_attack_used,
+        "turnNumber": state.turn_number,
+        "isFirstTurn": state.is_first_turn,
+        "blueProtectedPoints": {
+            str(p): [
+                f"{ci}:{_point_key(r, c)}" for ci in range(3) for r, c in sorted(state.protected_points(p, ci))
+            ]
+            for p in (0, 1)
+        },
+        "blueProtectionUntilTurn": {
+            str(p): t + 1 for p, t in enumerate(state.blue_protection_until_turn) if t >= 0
+        },
+        "seed": state.seed,
+    }
+
+
+def _int(obj: JsonObj, key: str, default: int, lo: int = 0, hi: Optional[int] = None) -> int:
+    v = obj.get(key, default)
+    if isinstance(v, bool) or not isinstance(v, int) or v < lo or (hi is not None and v > hi):
+        raise ValueError(f"{key} 无效：{v!r}")
+    return v
+
+
+def _weights(values: List[int]) -> List[int]:
+    """各项为非负整数，至多颜色数项。"""
+    if len(values) > len(COLORS) or any(isinstance(w, bool) or not isinstance(w, int) or w < 0 for w in values):
+        raise ValueError(f"drawWeights 无效：{values!r}")
+    return list(values)
+
+
+def state_from_json(obj: JsonObj, config: Optional[GameConfig] = None, trusted: bool = False) -> GameState:
+    """
+    由 JSON 对象重建局面（config 给出网格与规则，默认配置）。缺省字段取开局值。
+    trusted 为 True 时跳过字段与格点、颜色校验，供读取本程序自己写出的大批存档；
+    否则输入不合法时抛 ValueError。
+    """
+    seed = obj.get("seed")
+    if not trusted and seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        raise ValueError(f"seed 无效：{seed!r}")
+    state = GameState(config, seed=seed)
+    if trusted:
+        state.pools = [AtomPool.from_dict(counts) for counts in obj["pools"]]
+        state.hp = list(obj["hp"])
+        state.current_player = obj["currentPlayer"]
+        state.phase = obj["phase"]
+        state.phase_0_choice = obj.get("phase0Choice")
+        state.base_draw_count = obj["baseDrawCount"]
+        state.base_place_limit = obj["basePlaceLimit"]
+        state.draw_weights = list(obj["drawWeights"])
+        state.turn_draw_count = obj["turnDrawCount"]
+        state.turn_place_limit = obj["turnPlaceLimit"]
+        state.turn_attack_limit = obj["turnAttackLimit"]
+        state.turn_placed_count = obj["turnPlacedCount"]
+        state.turn_attack_used = obj["turnAttackUsed"]
+        state.turn_number = obj["turnNumber"]
+        state.is_first_turn = obj["isFirstTurn"]
+    else:
+        pools = obj.get("pools", [p.to_dict() for p in state.pools])
+        if not isinstance(pools, list) or len(pools) != 2:
+            raise ValueError("pools 须为两名玩家的原子池")
+        for counts in pools:
+            if not isinstance(counts, dict):
+                raise ValueError(f"原子池无效：{counts!r}")
+            for color, n in counts.items():
+                if isinstance(n, bool) or not isinstance(n, int) or n < 0 or color not in COLOR_BY_NAME:
+                    raise ValueError(f"原子池无效：{color!r}: {n!r}")
+        state.pools = [AtomPool.from_dict(counts) for counts in pools]
+        hp = obj.get("hp", state.hp)
+        if not isinstance(hp, list) or len(hp) != 2 or not all(type(v) is int and v >= 0 for v in hp):
+            raise ValueError(f"hp 无效：{hp!r}")
+        state.hp = list(hp)
+        state.current_player = _int(obj, "currentPlayer", 0, 0, 1)
+        state.phase = _int(obj, "phase", PHASE_CONFIRM, PHASE_CONFIRM, PHASE_ACTION)
+        choice = obj.get("phase0Choice")
+        if choice not in _CHOICES:
+            raise ValueError(f"phase0Choice 无效：{choice!r}")
+        state.phase_0_choice = choice
+        state.base_draw_count = _int(obj, "baseDrawCount", state.base_draw_count)
+        state.base_place_limit = _int(obj, "basePlaceLimit", state.base_place_limit)
+        state.draw_weights = _weights(obj.get("drawWeights", state.draw_weights))
+        state.turn_draw_count = _int(obj, "turnDrawCount", state.turn_draw_count)
+        state.turn_place_limit = _int(obj, "turnPlaceLimit", state.turn_place_limit)
+        state.turn_attack_limit = _int(obj, "turnAttackLimit", state.turn_attack_limit)
+        state.turn_placed_count = _int(obj, "turnPlacedCount", 0)
+        state.turn_attack_used = _int(obj, "turnAttackUsed", 0)
+        state.turn_number = _int(obj, "turnNumber", 0)
+        state.is_first_turn = bool(obj.get("isFirstTurn", state.is_first_turn))
+    cells = obj.get("cells", [[], []])
+    if not trusted and (len(cells) != 2 or any(len(row) > 3 for row in cells)):
+        raise ValueError("cells 须为每名玩家至多 3 格")
+    for row, objs in zip(state.cells, cells):
+        for cell, cell_obj in zip(row, objs):
+            cell_from_json(cell_obj, cell, trusted)
+    for p, keys in obj.get("blueProtectedPoints", {}).items():
+        for key in keys:
+            try:
+                ci, pt = key.split(":")
+                state.protect_black(int(p), int(ci), _parse_key(pt))
+            except (ValueError, IndexError):
+                raise ValueError(f"blueProtectedPoints 无效：{key!r}") from None
+    for p, t in obj.get("blueProtectionUntilTurn", {}).items():
+        if p not in ("0", "1") or (t is not None and (isinstance(t, bool) or not isinstance(t, int))):
+            raise ValueError(f"blueProtectionUntilTurn 无效：{p!r}: {t!r}")
+        if t is not None:
+            state.blue_protection_until_turn[int(p)] = t - 1
+    return state
+
+
+def save_game(state: GameState, fp: IO[str]) -> None:
+    """把一局写入文本文件 fp（边编码边写出）。"""
+    json.dump(state_to_json(state), fp, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_game(fp: IO[str], config: Optional[GameConfig] = None, trusted: bool = False) -> GameState:
+    """从文本文件 fp 读取 save_game 或网页版写出的一局。"""
+    return state_from_json(json.load(fp), config, trusted)
+
+
+def write_games(states: Iterable[GameState], fp: IO[str]) -> int:
+    """逐局写出 NDJSON（每行一局），states 可为生成器；返回写出的局数。"""
+    n = 0
+    for state in states:
+        fp.write(json.dumps(state_to_json(state), ensure_ascii=False, separators=(",", ":")))
+        fp.write("\n")
+        n += 1
+    return n
+
+
+def read_games(fp: IO[str], config: Optional[GameConfig] = None, trusted: bool = False) -> Iterator[GameState]:
+    """逐行读取 NDJSON，每次产出一局（空行跳过）；出错时 ValueError 注明行号。"""
+    for line_no, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            yield state_from_json(json.loads(line), config, trusted)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"第 {line_no} 行：{e}") from e
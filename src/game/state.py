@@ -1,8 +1,11 @@
 """
 游戏状态：双方原子池、生命、场地（各 3 格）、当前玩家与回合阶段等。
 """
-from typing import Dict, List, Optional, Set, Tuple
-from src.grid.cell import Cell, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN, COLORS as ATOM_COLORS
+import hashlib
+import random
+from typing import Dict, List, Optional, Tuple
+from src.grid.cell import Cell, Color, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN, COLORS as ATOM_COLORS
+from src.game.pool import AtomPool
 
 GridPoint = Tuple[int, int]
 from src.game.game_config import GameConfig, default_config
@@ -19,13 +22,30 @@ CHOICE_EXTRA_PLACE = "b"  # 本回合最多放置 4+x 原子
 CHOICE_EXTRA_ATTACK = "c" # 本回合可进攻 x 次
 
 INITIAL_HP = 20
+
+_MASK64 = (1 << 64) - 1
 INITIAL_POOL = {ATOM_BLACK: 7, ATOM_RED: 1, ATOM_BLUE: 1, ATOM_GREEN: 1}
 
 
-def make_initial_pool() -> Dict[str, int]:
+def make_initial_pool() -> Dict[Color, int]:
     return dict(INITIAL_POOL)
 
 
+def derive_seed(seed: int, *keys: object) -> int:
+    """
+    由种子与若干键（如工作进程号、对局序号）派生 64 位子种子：各子种子的随机流互相独立、可复现。
+    例：第 i 个工作进程的第 j 局用 GameState(seed=derive_seed(seed, i, j))。
+    """
+    data = ":".join(map(str, (seed, *keys))).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _mix64(h: int, v: int) -> int:
+    """把整数 v 混入 64 位哈希 h（splitmix64 的乘法与移位）。"""
+    h = ((h ^ (v & _MASK64)) * 0xBF58476D1CE4E5B9) & _MASK64
+    return h ^ (h >> 31)
+
+
 def make_cells() -> List[Cell]:
     from src.config import (
         DEFAULT_GRID_ROWS,
@@ -47,14 +67,36 @@ def make_cells() -> List[Cell]:
 
 
 class GameState:
-    def __init__(self, config: Optional[GameConfig] = None):
+    __slots__ = (
+        "config", "pools", "hp", "cells",
+        "current_player", "phase", "phase_0_choice",
+        "base_draw_count", "base_place_limit", "draw_weights",
+        "turn_draw_count", "turn_place_limit", "turn_attack_limit",
+        "turn_placed_count", "turn_attack_used",
+        "turn_number", "is_first_turn",
+        "blue_protected", "blue_protection_until_turn",
+        "seed", "_rng", "_rng_shared",
+    )
+
+    def __init__(self, config: Optional[GameConfig] = None, seed: Optional[int] = None):
         cfg = config or default_config()
         self.config = cfg
-        # 玩家 0 与 1：原子池（按配置）、生命、3 个格子
-        pool_copy = dict(cfg.initial_pool)
-        self.pools = [dict(pool_copy), dict(pool_copy)]
+        # 本局随机源：抽牌、随机落点、随机破坏都经由它，各局互不干扰，种子 + 动作序列即可重放。
+        # 种子依次取参数、配置；都没有时另取一个并记下
+        if seed is None:
+            seed = cfg.seed if cfg.seed is not None else random.getrandbits(64)
+        self.seed: int = seed
+        self._rng = random.Random(seed)
+        # 写时复制：clone() 后与副本共用同一随机源对象，双方首次取用 rng 时各自复制当前状态
+        self._rng_shared = False
+        # 玩家 0 与 1：原子池（按配置，定长计数数组）、生命、3 个格子
+        self.pools: List[AtomPool] = [AtomPool(cfg.initial_pool), AtomPool(cfg.initial_pool)]
         self.hp: List[int] = [INITIAL_HP, INITIAL_HP]
         self.cells: List[List[Cell]] = [make_cells(), make_cells()]
+        # 每个 (玩家, 格号) 位置用各自的 Zobrist 键表，同一排布放在不同格子哈希不同
+        for p in (0, 1):
+            for ci, cell in enumerate(self.cells[p]):
+                cell.set_zobrist_slot(p * 3 + ci)
 
         self.current_player: int = 0
         self.phase: int = PHASE_CONFIRM
@@ -77,21 +119,100 @@ class GameState:
         self.turn_number: int = 0
         self.is_first_turn: bool = True
 
-        # 蓝效果：与该蓝相邻的黑原子在下一回合内不可被破坏。(player -> set of (cell_i, (r,c)))
-        self.blue_protected_points: Dict[int, Set[Tuple[int, GridPoint]]] = {0: set(), 1: set()}
-        self.blue_protection_until_turn: Dict[int, int] = {}  # player -> 保护持续到该回合号（不含）
+        # 蓝效果：与该蓝相邻的黑原子在下一回合内不可被破坏。
+        # blue_protected[player][cell_i] 为受保护格点的位掩码（位布局同该格 Cell）
+        self.blue_protected: List[List[int]] = [[0, 0, 0], [0, 0, 0]]
+        self.blue_protection_until_turn: List[int] = [-1, -1]  # 保护持续到该回合号（不含），-1 为无
+
+    def clone(self) -> "GameState":
+        """
+        复制整局状态供推演：配置与网格几何共享，格子写时复制（未改动的格子与原局共用缓冲区），
+        原子池、生命与蓝保护位掩码为小数组直接复制；随机源同样写时复制，副本从同一位置起独立抽取。
+        """
+        other = GameState.__new__(GameState)
+        other.config = self.config
+        other.seed = self.seed
+        other._rng = self._rng
+        self._rng_shared = other._rng_shared = True
+        other.pools = [pool.copy() for pool in self.pools]
+        other.hp = list(self.hp)
+        other.cells = [[cell.copy() for cell in cells] for cells in self.cells]
+        other.current_player = self.current_player
+        other.phase = self.phase
+        other.phase_0_choice = self.phase_0_choice
+        other.base_draw_count = self.base_draw_count
+        other.base_place_limit = self.base_place_limit
+        other.draw_weights = list(self.draw_weights)
+        other.turn_draw_count = self.turn_draw_count
+        other.turn_place_limit = self.turn_place_limit
+        other.turn_attack_limit = self.turn_attack_limit
+        other.turn_placed_count = self.turn_placed_count
+        other.turn_attack_used = self.turn_attack_used
+        other.turn_number = self.turn_number
+        other.is_first_turn = self.is_first_turn
+        other.blue_protected = [list(masks) for masks in self.blue_protected]
+        other.blue_protection_until_turn = list(self.blue_protection_until_turn)
+        return other
+
+    def zobrist(self) -> int:
+        """
+        整局 64 位哈希，供置换表与缓存判重：6 个格子的 Zobrist 哈希（随放置/移除增量维护）之异或，
+        再混入生命、原子池、阶段、当前玩家、本回合计数与蓝保护。后者是二十来个小整数，读取时现算。
+        """
+        h = 0
+        for cells in self.cells:
+            for cell in cells:
+                h ^= cell.zobrist
+        s = 0x9E3779B97F4A7C15
+        for v in (
+            *self.hp, *self.pools[0].counts(), *self.pools[1].counts(),
+            self.phase, self.current_player, self.is_first_turn,
+            self.turn_place_limit, self.turn_placed_count, self.turn_attack_limit, self.turn_attack_used,
+            *self.blue_protected[0], *self.blue_protected[1],
+            *(max(t - self.turn_number, 0) for t in self.blue_protection_until_turn),
+        ):
+            s = _mix64(s, hash(v))
+        return h ^ s
+
+    @property
+    def rng(self) -> random.Random:
+        """本局随机源。"""
+        if self._rng_shared:
+            rng = random.Random(0)
+            rng.setstate(self._rng.getstate())
+            self._rng = rng
+            self._rng_shared = False
+        return self._rng
+
+    def _point_bit(self, player: int, cell_i: int, pt: GridPoint) -> int:
+        geom = self.cells[player][cell_i].grid.geometry
+        i = geom.point_id(pt[0], pt[1])
+        return 0 if i < 0 else 1 << geom.bit_of[i]
+
+    def protect_black(self, player: int, cell_i: int, pt: GridPoint) -> None:
+        """将该玩家该格该格点标记为受蓝效果保护。"""
+        self.blue_protected[player][cell_i] |= self._point_bit(player, cell_i, pt)
+
+    def clear_blue_protection(self, player: int) -> None:
+        self.blue_protected[player] = [0, 0, 0]
 
     def is_black_protected(self, player: int, cell_i: int, pt: GridPoint) -> bool:
         """该玩家的该格该格点上的黑原子是否处于蓝效果保护中。"""
-        s = self.blue_protected_points.get(player)
-        if not s:
-            return False
-        return (cell_i, pt) in s
+        m = self.blue_protected[player][cell_i]
+        return bool(m) and bool(m & self._point_bit(player, cell_i, pt))
+
+    def protected_points(self, player: int, cell_i: int) -> List[GridPoint]:
+        """该玩家该格中受蓝效果保护的格点。"""
+        m = self.blue_protected[player][cell_i]
+        if not m:
+            return []
+        geom = self.cells[player][cell_i].grid.geometry
+        return [geom.points[i] for i in geom.ids_of(m)]
 
     def opponent(self, player: int) -> int:
         return 1 - player
 
-    def pool(self, player: int) -> Dict[str, int]:
+    def pool(self, player: int) -> AtomPool:
         return self.pools[player]
 
     def player_cells(self, player: int) -> List[Cell]:
@@ -1,10 +1,9 @@
 """
 回合流程：阶段 0/1/2/3 与阶段切换，先手第一回合禁止进攻。
 """
-import random
 from typing import Optional, Tuple, List
 
-from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
+from src.grid.cell import Cell, Color, IndexedSet, EMPTY, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
 
 from src.game.state import (
     GameState,
@@ -16,7 +15,7 @@ from src.game.state import (
     CHOICE_EXTRA_PLACE,
     CHOICE_EXTRA_ATTACK,
 )
-from src.atoms.draw import draw_atoms
+from src.atoms.draw import atom_sampler
 
 
 def apply_phase_0_choice(state: GameState, choice: str) -> bool:
@@ -49,10 +48,11 @@ def apply_phase_0_choice(state: GameState, choice: str) -> bool:
 def advance_to_phase_1(state: GameState) -> None:
     """阶段 0 结束后进入阶段 1 并执行抽原子。"""
     state.phase = PHASE_DRAW
-    drawn = draw_atoms(state.turn_draw_count, weights=state.draw_weights)
+    counts = atom_sampler(tuple(state.draw_weights)).counts(state.turn_draw_count, state.rng)
     pool = state.pool(state.current_player)
-    for color in drawn:
-        pool[color] = pool.get(color, 0) + 1
+    for code, n in enumerate(counts):
+        if n:
+            pool.add_at(code, n)
     state.phase = PHASE_PLACE
     state.turn_placed_count = 0
 
@@ -66,7 +66,7 @@ def start_turn_default(state: GameState) -> None:
     advance_to_phase_1(state)
 
 
-def validate_place(state: GameState, cell_index: int, r: int, c: int, color: str) -> tuple[bool, str]:
+def validate_place(state: GameState, cell_index: int, r: int, c: int, color: Color) -> tuple[bool, str]:
     """
     检查是否可以在指定格子的 (r,c) 放置 color。不修改状态。
     返回 (ok, message)。
@@ -82,20 +82,28 @@ def validate_place(state: GameState, cell_index: int, r: int, c: int, color: str
     if cell_index < 0 or cell_index >= len(cells):
         return False, "无效格子"
     cell = cells[cell_index]
-    if not cell.grid.in_bounds(r, c) or (r, c) in cell.all_atoms():
+    i = cell.grid.geometry.point_id(r, c)
+    if i < 0:
         return False, "该格点已有原子或越界"
-    cell.place(r, c, color)
-    if not cell.is_connected():
-        cell.remove(r, c)
-        return False, "放置后该格原子不连通"
-    if not cell.has_black():
-        cell.remove(r, c)
-        return False, "非空格至少需一个黑原子"
-    cell.remove(r, c)
-    return True, ""
+    message = cell.read_stable(lambda: _place_problem(cell, i, color))
+    return not message, message
+
+
+def _place_problem(cell: Cell, i: int, color: Color) -> str:
+    """
+    在空位 i 放 color 违反的规则（空串为可放），只读不改：
+    新原子须接触到现有的每个分量（空格或原本连通时即须接触任一原子），放后格内须有黑。
+    """
+    if cell.code_at(i) != EMPTY:
+        return "该格点已有原子或越界"
+    if not cell.connected_after_place_at(i):
+        return "放置后该格原子不连通"
+    if color != ATOM_BLACK and not cell.has_black():
+        return "非空格至少需一个黑原子"
+    return ""
 
 
-def apply_place(state: GameState, cell_index: int, r: int, c: int, color: str) -> bool:
+def apply_place(state: GameState, cell_index: int, r: int, c: int, color: Color) -> bool:
     """执行放置：放置原子、校验连通与至少一黑，失败则撤销并返回 False。"""
     ok, _ = validate_place(state, cell_index, r, c, color)
     if not ok:
@@ -125,77 +133,78 @@ def batch_place_on_cell(
         return False, "无效格子"
     cell = cells[cell_index]
     count = min(pool.get(ATOM_BLACK, 0), max(0, n))
-    to_place: List[str] = [ATOM_BLACK] * count
+    to_place: List[Color] = [ATOM_BLACK] * count
     if not to_place:
         return False, "数量为 0 或池中无黑原子"
     remaining = state.turn_place_limit - state.turn_placed_count
     if len(to_place) > remaining:
         return False, f"本回合最多还可放 {remaining} 个"
     # 空位；放置过程保证连通，且新增黑原子必须与现有某个黑原子相邻（无黑时第一个可作“种子”）
-    occupied = set(cell.all_atoms().keys())
-    black_points = set(cell.black_points())  # 已有黑原子；批量放置过程中会追加本批新放的黑
-    valid = set(cell.grid.all_points())
-    empty = {p for p in valid if p not in occupied}
-    if not empty:
+    geom = cell.grid.geometry
+    if cell.occupied_mask() == geom.all_bits:
         return False, "该格已无空位"
-    placed_this_batch: List[Tuple[int, int, str]] = []
-
-    def empty_neighbors_of(pts: set) -> List[Tuple[int, int]]:
-        """与 pts 中任一点相邻、在 valid 内且当前为空的格点。"""
-        out = set()
-        for (r, c) in pts:
-            for nr, nc in cell.grid.neighbors_of(r, c):
-                if (nr, nc) in valid and (nr, nc) not in occupied:
-                    out.add((nr, nc))
-        return [p for p in out if p in empty]
-
-    def empty_neighbors_of_black() -> List[Tuple[int, int]]:
-        """与任意黑原子相邻且为空的格点（新增黑只能放这些位置）。"""
-        if not black_points:
-            return []
-        return empty_neighbors_of(black_points)
+    placed_this_batch: List[int] = []
+
+    def undo_batch() -> None:
+        for i in placed_this_batch:
+            cell.remove_at(i)
+            pool[ATOM_BLACK] += 1
+            state.turn_placed_count -= 1
 
     # 第一个黑原子：格子无原子则放中心；无黑但有其他颜色则放其邻格（种子）；已有黑则必须放在某黑原子邻格
-    center_pt = (cell.grid.center_r, cell.grid.center_c)
-    if not occupied and center_pt in empty:
-        r0, c0 = center_pt
-    elif black_points:
-        first_candidates = empty_neighbors_of_black()
-        if not first_candidates:
+    center = geom.point_id(cell.grid.center_r, cell.grid.center_c)
+    if cell.is_empty() and center >= 0:
+        first = center
+    elif cell.has_black():
+        first = cell.random_black_frontier_id(state.rng)
+        if first is None:
             return False, "该格无与现有黑原子相邻的空位"
-        r0, c0 = random.choice(first_candidates)
-    elif occupied:
-        first_candidates = empty_neighbors_of(occupied)
-        if not first_candidates:
+    elif not cell.is_empty():
+        first = cell.random_frontier_id(state.rng)
+        if first is None:
             return False, "该格无与现有原子相邻的空位，无法保持连通"
-        r0, c0 = random.choice(first_candidates)
     else:
-        r0, c0 = random.choice(tuple(empty))
-    cell.place(r0, c0, to_place[0])
-    pool[to_place[0]] -= 1
+        first = state.rng.choice(geom.ids_of(geom.all_bits))
+    cell.place_at(first, ATOM_BLACK)
+    pool[ATOM_BLACK] -= 1
     state.turn_placed_count += 1
-    placed_this_batch.append((r0, c0, to_place[0]))
-    occupied.add((r0, c0))
-    black_points.add((r0, c0))
-    empty.discard((r0, c0))
-    # 其余黑原子：仅从“与现有黑原子相邻的空邻格”中选位
-    for color in to_place[1:]:
-        candidates = empty_neighbors_of_black()
-        if not candidates:
-            for (r, c, col) in placed_this_batch:
-                cell.remove(r, c)
-                pool[col] = pool.get(col, 0) + 1
-                state.turn_placed_count -= 1
+    placed_this_batch.append(first)
+    # 其余黑原子：从黑落点边界中选「放下后新增空邻位最多」的格点，即它的空邻位中尚不挨黑的个数。
+    # 各候选的得分按得分分桶，每放一个只更新其周围两圈内受影响的候选
+    neighbor_ids = geom.neighbor_ids
+
+    def gain_of(i: int) -> int:
+        return sum(1 for j in neighbor_ids[i] if cell.code_at(j) == EMPTY and cell.black_neighbors_at(j) == 0)
+
+    gain = {}
+    buckets = [IndexedSet(geom.size) for _ in range(7)]
+    for i in cell.black_frontier_ids():  # 按编号升序，各桶的顺序与放置/撤销的历史无关
+        gain[i] = g = gain_of(i)
+        buckets[g].add(i)
+    for _ in to_place[1:]:
+        top = next((b for b in reversed(buckets) if b), None)
+        if top is None:
+            undo_batch()
             return False, "空位不足或无与黑原子相邻的空位"
-        pt = max(candidates, key=lambda p: len(empty_neighbors_of(black_points | {p})))
-        r, c = pt
-        cell.place(r, c, color)
-        pool[color] -= 1
+        p = top.sample(state.rng)
+        cell.place_at(p, ATOM_BLACK)
+        pool[ATOM_BLACK] -= 1
         state.turn_placed_count += 1
-        placed_this_batch.append((r, c, color))
-        occupied.add(pt)
-        black_points.add(pt)
-        empty.discard(pt)
+        placed_this_batch.append(p)
+        top.discard(p)
+        del gain[p]
+        # p 的空邻位中刚开始挨黑的，成为新候选，且不再算作其相邻候选的新增空位
+        opened = [q for q in neighbor_ids[p] if cell.code_at(q) == EMPTY and cell.black_neighbors_at(q) == 1]
+        for q in opened:
+            for s in neighbor_ids[q]:
+                g = gain.get(s)
+                if g is not None:
+                    buckets[g].discard(s)
+                    gain[s] = g - 1
+                    buckets[g - 1].add(s)
+        for q in opened:
+            gain[q] = g = gain_of(q)
+            buckets[g].add(q)
     return True, f"已在格子 {cell_index + 1} 放置 {len(to_place)} 个黑原子"
 
 
@@ -221,5 +230,5 @@ def end_turn(state: GameState) -> None:
     state.turn_number += 1
     state.is_first_turn = False
     for p in (0, 1):
-        if state.turn_number > state.blue_protection_until_turn.get(p, -1):
-            state.blue_protected_points[p] = set()
+        if state.turn_number > state.blue_protection_until_turn[p]:
+            state.clear_blue_protection(p)
@@ -1,10 +1,24 @@
-from src.grid.triangle import TriangleGrid, neighbors, vertical_distance_units, horizontal_distance_units
+from src.grid.triangle import (
+    TriangleGrid,
+    GridGeometry,
+    grid_geometry,
+    shared_grid,
+    neighbors,
+    vertical_distance_units,
+    horizontal_distance_units,
+)
 from src.grid.cell import Cell
+from src.grid.colors import Color, COLORS
 
 __all__ = [
     "TriangleGrid",
+    "GridGeometry",
+    "grid_geometry",
+    "shared_grid",
     "neighbors",
     "vertical_distance_units",
     "horizontal_distance_units",
     "Cell",
+    "Color",
+    "COLORS",
 ]
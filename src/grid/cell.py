@@ -1,25 +1,226 @@
 """
 单格状态：格点 -> 原子颜色，放置/移除，连通性检查。
+格内按格点编号（0..N-1，见 GridGeometry）存储，每个格点 1 字节颜色编码；
+(r, c) 接口只是编号的一层转换。另按颜色维护位棋盘（每色一个 int 位掩码），
+计数、是否有黑、邻格与连通等查询都化为少量大整数位运算。
 """
 import random
-from typing import Dict, Set, List, Optional
-from collections import deque
+import time
+from array import array
+from bisect import bisect_left, insort
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Mapping, Set, List, Optional, Tuple, TypeVar
 
-from src.grid.triangle import GridPoint, TriangleGrid, neighbors
+from src.grid.triangle import GridGeometry, GridPoint, TriangleGrid, shared_grid
+from src.grid import shape
+from src.grid.colors import Color, COLORS, NUM_COLORS
 
 
-# 原子颜色
-ATOM_BLACK = "black"
-ATOM_RED = "red"
-ATOM_BLUE = "blue"
-ATOM_GREEN = "green"
-ATOM_YELLOW = "yellow"
-COLORS = (ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN)
+# 原子颜色（颜色即编码，见 src.grid.colors）；EMPTY 表示空位
+ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN, ATOM_YELLOW, ATOM_PURPLE, ATOM_WHITE, ATOM_GRAY = COLORS
+EMPTY = -1
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(size: int, slot: int) -> Tuple[int, ...]:
+    """
+    第 slot 个格子位置的 Zobrist 键表：下标 i * NUM_COLORS + code 对应「编号 i 上放颜色 code」的 64 位键。
+    由固定种子生成，跨进程一致，哈希可作缓存键长期保存。
+    """
+    rng = random.Random(f"zobrist:{size}:{slot}")
+    return tuple(rng.getrandbits(64) for _ in range(size * NUM_COLORS))
+
+
+class _Extent:
+    """整数值的多重集合：按值计数并缓存最小/最大值，增删与取极值均摊 O(1)。"""
+
+    __slots__ = ("_counts", "_base", "n", "lo", "hi")
+
+    def __init__(self, value_range: Tuple[int, int]):
+        self._base = value_range[0]
+        self._counts = array("H", [0]) * (value_range[1] - value_range[0] + 1)
+        self.n = 0
+        self.lo = 0
+        self.hi = 0
+
+    def copy(self) -> "_Extent":
+        other = _Extent.__new__(_Extent)
+        other._base = self._base
+        other._counts = array("H", self._counts)
+        other.n, other.lo, other.hi = self.n, self.lo, self.hi
+        return other
+
+    def add(self, v: int) -> None:
+        self._counts[v - self._base] += 1
+        if self.n == 0:
+            self.lo = self.hi = v
+        elif v < self.lo:
+            self.lo = v
+        elif v > self.hi:
+            self.hi = v
+        self.n += 1
+
+    def remove(self, v: int) -> None:
+        self._counts[v - self._base] -= 1
+        self.n -= 1
+        if self.n == 0:
+            self.lo = self.hi = 0
+            return
+        self.lo, self.hi = self._bounds_without(v, 0)
+
+    def _bounds_without(self, v: int, k: int) -> Tuple[int, int]:
+        """
+        假设 v 再少 k 个时的 (最小值, 最大值)；集合中须仍有其他值。
+        仅在 v 恰为极值且被删光时才向内扫描到下一个非零计数。
+        """
+        counts, base = self._counts, self._base
+        lo, hi = self.lo, self.hi
+        if counts[v - base] <= k:
+            if v == lo:
+                lo += 1
+                while counts[lo - base] == 0:
+                    lo += 1
+            if v == hi:
+                hi -= 1
+                while counts[hi - base] == 0:
+                    hi -= 1
+        return lo, hi
+
+    def span(self) -> int:
+        return self.hi - self.lo if self.n else 0
+
+    def span_with(self, v: int) -> int:
+        """再加入一个 v 后的跨度（不修改）。"""
+        if self.n == 0:
+            return 0
+        return max(self.hi, v) - min(self.lo, v)
+
+    def span_without(self, v: int) -> int:
+        """去掉一个 v 后的跨度（不修改；v 须在集合中）。"""
+        if self.n <= 1:
+            return 0
+        lo, hi = self._bounds_without(v, 1)
+        return hi - lo
+
+
+class IndexedSet:
+    """格点编号的集合：列表存元素、定长数组记各元素在列表中的下标，增删与均匀抽样均为 O(1)。"""
+
+    __slots__ = ("items", "_pos")
+
+    def __init__(self, size: int):
+        self.items: List[int] = []
+        self._pos = array("i", [-1]) * size
+
+    def copy(self) -> "IndexedSet":
+        other = IndexedSet.__new__(IndexedSet)
+        other.items = list(self.items)
+        other._pos = array("i", self._pos)
+        return other
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self.items) and self._pos[i] >= 0
+
+    def add(self, i: int) -> None:
+        if self._pos[i] < 0:
+            self._pos[i] = len(self.items)
+            self.items.append(i)
+
+    def discard(self, i: int) -> None:
+        k = self._pos[i]
+        if k >= 0:
+            last = self.items.pop()
+            if last != i:
+                self.items[k] = last
+                self._pos[last] = k
+            self._pos[i] = -1
+
+    def sample(self, rng: random.Random) -> Optional[int]:
+        items = self.items
+        return items[int(rng.random() * len(items))] if items else None
+
+
+class SortedIdSet:
+    """
+    格点编号的有序集合：列表按编号升序存元素、定长字节数组记成员。均匀抽样 O(1)，
+    增删为一次二分查找加一次列表内存搬移；元素顺序只取决于集合内容，抽样结果与增删（含撤销）的历史无关。
+    """
+
+    __slots__ = ("items", "_has")
+
+    def __init__(self, size: int):
+        self.items: List[int] = []
+        self._has = bytearray(size)
+
+    @classmethod
+    def of(cls, size: int, ids: Iterable[int]) -> "SortedIdSet":
+        """由一组互不相同的编号一次建成。"""
+        out = cls(size)
+        out.items = sorted(ids)
+        has = out._has
+        for i in out.items:
+            has[i] = 1
+        return out
+
+    def copy(self) -> "SortedIdSet":
+        other = SortedIdSet.__new__(SortedIdSet)
+        other.items = list(self.items)
+        other._has = bytearray(self._has)
+        return other
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self.items) and bool(self._has[i])
+
+    def add(self, i: int) -> None:
+        if not self._has[i]:
+            self._has[i] = 1
+            insort(self.items, i)
+
+    def discard(self, i: int) -> None:
+        if self._has[i]:
+            self._has[i] = 0
+            items = self.items
+            del items[bisect_left(items, i)]
+
+    def sample(self, rng: random.Random) -> Optional[int]:
+        items = self.items
+        return items[int(rng.random() * len(items))] if items else None
+
+
+def _blank_colors(geom: GridGeometry) -> array:
+    """本格自有的全空颜色数组（按字节整块复制共享的只读数组，比逐项构造快得多）。"""
+    colors = array("b")
+    colors.frombytes(geom.blank_codes)
+    return colors
+
+
+# color_codes 的字节：有原子为 b"1"、空位为 b"0"；_VALID_CODES 为全部有效字节
+_OCCUPIED = bytes.maketrans(bytes(range(256)), b"1" * 255 + b"0")
+_VALID_CODES = bytes(range(NUM_COLORS)) + bytes((EMPTY & 0xFF,))
+
+# 空格子共享的空边界集合（只读，首次放置时才为本格分配自己的集合）
+_NO_POINTS = SortedIdSet(0)
 
 
 class Cell:
     """一个格子：正三角形网格上的原子排布。支持正六边形区域（hex_radius）。"""
 
+    __slots__ = (
+        "grid", "_geom", "_colors", "_count", "_masks", "_occ", "_comps",
+        "_black_rows", "_black_x2", "_black_nb", "_y_sums", "_frontier", "_black_frontier",
+        "_version", "_snapshot", "_snapshot_version", "_cuts", "_cuts_version", "_shared",
+        "_journal", "_zkeys", "_zhash", "_shape_w", "_shape",
+    )
+
     def __init__(
         self,
         rows: int,
@@ -28,137 +229,716 @@ class Cell:
         center_c: Optional[int] = None,
         hex_radius: Optional[int] = None,
     ):
-        self.grid = TriangleGrid(
-            rows, cols,
-            center_r=center_r,
-            center_c=center_c,
-            hex_radius=hex_radius,
-        )
-        # 格点 -> 颜色
-        self._atoms: Dict[GridPoint, str] = {}
-
-    def get(self, r: int, c: int) -> Optional[str]:
-        return self._atoms.get((r, c))
-
-    def place(self, r: int, c: int, color: str) -> bool:
-        """放置原子。若格点已有原子或越界则返回 False。"""
-        if not self.grid.in_bounds(r, c) or (r, c) in self._atoms:
-            return False
-        if color not in COLORS:
+        # 同形状的格子共享同一个网格对象与几何
+        self.grid: TriangleGrid = shared_grid(rows, cols, center_r, center_c, hex_radius)
+        self._geom = self.grid.geometry
+        # 格点编号 -> 颜色编码（EMPTY 为空）；首次放置前共享几何中的只读空数组
+        self._colors = self._geom.blank_codes
+        self._count = 0
+        # 位棋盘：每种颜色一个位掩码，_occ 为全部原子（位布局见 GridGeometry.bit_of）
+        self._masks: List[int] = [0] * NUM_COLORS
+        self._occ = 0
+        # 连通分量：每个分量一个位掩码，随放置/移除增量维护（放置时合并，移除时局部复查）
+        self._comps: List[int] = []
+        # 黑原子的行号 r 与横坐标两倍 2c + r 的计数与极值：攻击力/防御力 O(1) 读取
+        self._black_rows = _Extent(self._geom.row_range)
+        self._black_x2 = _Extent(self._geom.x2_range)
+        # 每个格点相邻的黑原子数（不论该点是否有原子），及各颜色原子的 y 值之和；同上先共享
+        self._black_nb = self._geom.blank_counts
+        self._y_sums: List[int] = [0] * NUM_COLORS
+        # 落点边界：与任一原子相邻的空位、与任一黑原子相邻的空位（随放置/移除增量维护）
+        self._frontier = _NO_POINTS
+        self._black_frontier = _NO_POINTS
+        # 版本号（顺序锁）：每次放置/移除在开始与结束时各加 1，写入进行中为奇数；
+        # all_atoms() 的只读快照与割点索引按版本号失效，read_stable() 据此检测并发写入
+        self._version = 0
+        self._snapshot: Optional[Mapping[GridPoint, Color]] = None
+        self._snapshot_version = -1
+        # 割点索引（见 _cut_index），同样按版本号失效
+        self._cuts: Dict[int, Tuple[int, ...]] = {}
+        self._cuts_version = -1
+        # 写时复制：为 True 时上述可变缓冲区可能与另一格子共用，首次写入前先复制（见 _own）
+        self._shared = False
+        # 增删日志（见 set_journal）；None 表示不记录
+        self._journal: Optional[List[Tuple["Cell", int, int, int]]] = None
+        # Zobrist 哈希：全部原子键的异或，随放置/移除增量维护（键表见 set_zobrist_slot）
+        self._zkeys = zobrist_keys(self._geom.size, 0)
+        self._zhash = 0
+        # 形状多项式和：4 个朝向打包在一个整数里，随放置/移除增量维护（见 src.grid.shape）
+        self._shape_w = shape.shape_tables(self._geom).weights
+        self._shape = 0
+
+    def copy(self) -> "Cell":
+        """复制本格：与本格共用全部缓冲区，双方各自在首次写入前复制（写时复制），未改动的副本几乎不占内存。"""
+        other = Cell.__new__(Cell)
+        other.grid = self.grid
+        other._geom = self._geom
+        other._colors = self._colors
+        other._count = self._count
+        other._masks = self._masks
+        other._occ = self._occ
+        other._comps = self._comps
+        other._black_rows = self._black_rows
+        other._black_x2 = self._black_x2
+        other._black_nb = self._black_nb
+        other._y_sums = self._y_sums
+        other._frontier = self._frontier
+        other._black_frontier = self._black_frontier
+        other._version = self._version
+        other._snapshot = self._snapshot
+        other._snapshot_version = self._snapshot_version
+        other._cuts = self._cuts
+        other._cuts_version = self._cuts_version
+        other._journal = None
+        other._zkeys = self._zkeys
+        other._zhash = self._zhash
+        other._shape_w = self._shape_w
+        other._shape = self._shape
+        self._shared = other._shared = True
+        return other
+
+    def set_journal(self, journal: Optional[List[Tuple["Cell", int, int, int]]]) -> None:
+        """此后每次原子增删向 journal 追加 (本格, 编号, 原编码, 新编码)，供撤销；None 停止记录。"""
+        self._journal = journal
+
+    def set_zobrist_slot(self, slot: int) -> None:
+        """改用第 slot 个格子位置的键表（GameState 按 玩家 * 3 + 格号 设定），并重算哈希。"""
+        keys = self._zkeys = zobrist_keys(self._geom.size, slot)
+        colors = self._colors
+        h = 0
+        for i in self._geom.ids_of(self._occ):
+            h ^= keys[i * NUM_COLORS + colors[i]]
+        self._zhash = h
+
+    @property
+    def zobrist(self) -> int:
+        """本格原子排布的 64 位 Zobrist 哈希（空格为 0），O(1) 读取。"""
+        return self._zhash
+
+    @property
+    def canonical_hash(self) -> int:
+        """
+        本格排布在平移与水平/竖直翻转下的 64 位规范哈希（空格为 0），O(1) 读取。
+        形状相同的格子（不论在哪一格、哪一局）哈希相同，可作攻击力/防御力、割点、AI 评分等的缓存键。
+        """
+        return shape.canonical_hash(self._geom, self._occ, self._shape)
+
+    def canonical_form(self) -> Tuple[Tuple[int, int, int], ...]:
+        """本格排布的规范形：(dr, dx2, 颜色编码) 元组（见 shape.canonical_form），O(n log n)。"""
+        points = self._geom.points
+        colors = self._colors
+        return shape.canonical_form([(*points[i], colors[i]) for i in self.atom_ids()])
+
+    def _own(self) -> None:
+        """写入前调用：若缓冲区与其他格子共用则复制一份（共享的空数组仍共享）。"""
+        if not self._shared:
+            return
+        geom = self._geom
+        if self._colors is not geom.blank_codes:
+            self._colors = array("b", self._colors)
+            self._black_nb = bytearray(self._black_nb)
+        if self._frontier is not _NO_POINTS:
+            self._frontier = self._frontier.copy()
+            self._black_frontier = self._black_frontier.copy()
+        self._masks = list(self._masks)
+        self._comps = list(self._comps)
+        self._black_rows = self._black_rows.copy()
+        self._black_x2 = self._black_x2.copy()
+        self._y_sums = list(self._y_sums)
+        self._shared = False
+
+    # ---- 按格点编号的接口 ----
+
+    def code_at(self, i: int) -> int:
+        """编号 i 上的颜色编码；空位为 EMPTY。"""
+        return self._colors[i]
+
+    def color_codes(self) -> bytes:
+        """按编号排列的各格点颜色编码，每项一个有符号字节（空位 EMPTY 即 0xff）。"""
+        return self._colors.tobytes()
+
+    def black_neighbors_at(self, i: int) -> int:
+        """编号 i 相邻的黑原子数（不论 i 上是否有原子）。"""
+        return self._black_nb[i]
+
+    def place_at(self, i: int, code: int) -> bool:
+        """在编号 i 放置颜色编码 code 的原子。已有原子或编码无效时返回 False。"""
+        if self._colors[i] != EMPTY or not 0 <= code < NUM_COLORS:
             return False
-        self._atoms[(r, c)] = color
+        self._own()
+        self._version += 1
+        geom = self._geom
+        if self._count == 0 and self._colors is geom.blank_codes:
+            self._colors = _blank_colors(geom)
+            self._black_nb = bytearray(self._black_nb)
+            self._frontier = SortedIdSet(geom.size)
+            self._black_frontier = SortedIdSet(geom.size)
+        colors = self._colors
+        colors[i] = code
+        k = i * NUM_COLORS + code
+        self._zhash ^= self._zkeys[k]
+        self._shape += self._shape_w[k]
+        if self._journal is not None:
+            self._journal.append((self, i, EMPTY, code))
+        self._count += 1
+        b = 1 << geom.bit_of[i]
+        self._masks[code] |= b
+        self._occ |= b
+        frontier = self._frontier
+        frontier.discard(i)
+        self._black_frontier.discard(i)
+        for j in geom.neighbor_ids[i]:
+            if colors[j] == EMPTY:
+                frontier.add(j)
+        # 新原子与它接触到的所有分量合并为一个
+        nb = self._geom.neighbor_bits[i]
+        merged = b
+        comps = []
+        for m in self._comps:
+            if m & nb:
+                merged |= m
+            else:
+                comps.append(m)
+        comps.append(merged)
+        self._comps = comps
+        if code == ATOM_BLACK:
+            r, c = self._geom.points[i]
+            self._black_rows.add(r)
+            self._black_x2.add(2 * c + r)
+            self._add_black_neighbor(i, 1)
+        else:
+            self._y_sums[code] += self._black_nb[i]
+        self._version += 1
         return True
 
-    def remove(self, r: int, c: int) -> Optional[str]:
+    def load_codes(self, codes: bytes) -> None:
+        """
+        按编号的颜色编码（同 color_codes，空位为 EMPTY）一次装入全部原子，格子须为空；供解码等批量构造使用。
+        结果同逐个 place_at，但分量、边界与各统计量只各算一遍。长度不符、编码无效或格子非空时抛 ValueError。
+        """
+        geom = self._geom
+        if self._count or len(codes) != geom.size or codes.translate(None, _VALID_CODES):
+            raise ValueError("颜色编码无效或格子非空")
+        occupied = codes.translate(_OCCUPIED)
+        i = occupied.find(b"1")
+        if i < 0:
+            return
+        self._own()
+        self._version += 1
+        colors = self._colors = array("b")
+        colors.frombytes(codes)
+        bit_of = geom.bit_of
+        keys = self._zkeys
+        weights = self._shape_w
+        journal = self._journal
+        masks = [0] * NUM_COLORS
+        ids = []
+        h = s = 0
+        while i >= 0:
+            ids.append(i)
+            code = codes[i]
+            masks[code] |= 1 << bit_of[i]
+            k = i * NUM_COLORS + code
+            h ^= keys[k]
+            s += weights[k]
+            if journal is not None:
+                journal.append((self, i, EMPTY, code))
+            i = occupied.find(b"1", i + 1)
+        black_nb = self._black_nb = bytearray(geom.size)
+        points = geom.points
+        neighbor_ids = geom.neighbor_ids
+        y_sums = [0] * NUM_COLORS
+        others = []
+        for i in ids:
+            if codes[i] == ATOM_BLACK:
+                r, c = points[i]
+                self._black_rows.add(r)
+                self._black_x2.add(2 * c + r)
+                for j in neighbor_ids[i]:
+                    black_nb[j] += 1
+            else:
+                others.append(i)
+        for i in others:
+            y_sums[codes[i]] += black_nb[i]
+        occ = 0
+        for m in masks:
+            occ |= m
+        self._y_sums = y_sums
+        self._masks = masks
+        self._occ = occ
+        self._count = len(ids)
+        self._comps = geom.components(occ)
+        self._frontier = SortedIdSet.of(geom.size, geom.ids_of(geom.dilate(occ) & ~occ))
+        self._black_frontier = SortedIdSet.of(geom.size, geom.ids_of(geom.dilate(masks[ATOM_BLACK]) & ~occ))
+        self._zhash = h
+        self._shape = s
+        self._version += 1
+
+    def remove_at(self, i: int) -> int:
+        """移除编号 i 上的原子，返回原颜色编码；若无则返回 EMPTY。"""
+        code = self._colors[i]
+        if code != EMPTY:
+            # 割点索引若仍对应当前版本，可直接给出拆分结果
+            cuts = self._cuts if self._cuts_version == self._version else None
+            self._own()
+            self._version += 1
+            self._vacate(i, code)
+            self._detach(i, 1 << self._geom.bit_of[i], cuts)
+            self._version += 1
+        return code
+
+    def _vacate(self, i: int, code: int) -> None:
+        """清空编号 i（原颜色编码 code）：更新颜色、位掩码、黑原子统计与落点边界，不动分量表。"""
+        geom = self._geom
+        colors = self._colors
+        colors[i] = EMPTY
+        k = i * NUM_COLORS + code
+        self._zhash ^= self._zkeys[k]
+        self._shape -= self._shape_w[k]
+        if self._journal is not None:
+            self._journal.append((self, i, code, EMPTY))
+        self._count -= 1
+        b = 1 << geom.bit_of[i]
+        self._masks[code] &= ~b
+        occ = self._occ = self._occ & ~b
+        if code == ATOM_BLACK:
+            r, c = geom.points[i]
+            self._black_rows.remove(r)
+            self._black_x2.remove(2 * c + r)
+            self._add_black_neighbor(i, -1)
+        else:
+            self._y_sums[code] -= self._black_nb[i]
+        # i 成为空位：仍挨着原子/黑原子则进入相应边界；邻空位若已不挨任何原子则移出边界
+        neighbor_bits = geom.neighbor_bits
+        frontier = self._frontier
+        if neighbor_bits[i] & occ:
+            frontier.add(i)
+        if self._black_nb[i]:
+            self._black_frontier.add(i)
+        for j in geom.neighbor_ids[i]:
+            if colors[j] == EMPTY and not neighbor_bits[j] & occ:
+                frontier.discard(j)
+
+    def _add_black_neighbor(self, i: int, delta: int) -> None:
+        """编号 i 处黑原子增减（delta=±1）后，更新各邻点的黑邻居数与 y 值之和。"""
+        colors = self._colors
+        black_nb = self._black_nb
+        y_sums = self._y_sums
+        black_frontier = self._black_frontier
+        for j in self._geom.neighbor_ids[i]:
+            black_nb[j] += delta
+            cj = colors[j]
+            if cj > ATOM_BLACK:
+                y_sums[cj] += delta
+            elif cj == EMPTY:
+                if black_nb[j] == 0:
+                    black_frontier.discard(j)
+                elif delta > 0:
+                    black_frontier.add(j)
+
+    def _detach(self, i: int, b: int, cuts: Optional[Dict[int, Tuple[int, ...]]] = None) -> None:
+        """从所在分量中去掉位 b（编号 i），必要时把该分量拆开。cuts 为移除前有效的割点索引。"""
+        comps = self._comps
+        for k, m in enumerate(comps):
+            if m & b:
+                break
+        rest = m & ~b
+        if not rest:
+            comps.pop(k)
+            return
+        if cuts is not None:
+            comps[k:k + 1] = self._pieces(rest, cuts.get(i))
+            return
+        # 局部判断：绕 i 一周的已占邻居若只构成一段连续弧，则它们经彼此相连，分量不会断开
+        colors = self._colors
+        occupied = [j >= 0 and colors[j] != EMPTY for j in self._geom.rings[i]]
+        arcs = sum(1 for t in range(6) if occupied[t] and not occupied[t - 1])
+        if arcs <= 1:
+            comps[k] = rest
+            return
+        comps[k:k + 1] = self._split(rest, self._geom.neighbor_bits[i] & rest)
+
+    def _split(self, rest: int, nbs: int) -> List[int]:
+        """
+        rest 为去掉一个原子后的原分量，nbs 为该原子在 rest 中的邻居。
+        从一个邻居向外扩展，一旦与其余邻居汇合即停止（仍为一个分量）；
+        否则扩展到底得到一块，再对剩下的邻居重复。返回拆分后的分量列表。
+        """
+        dilate = self._geom.dilate
+        pieces = []
+        while True:
+            seed = nbs & -nbs
+            if nbs == seed:
+                pieces.append(rest)
+                return pieces
+            reached = frontier = seed
+            while frontier:
+                if reached & nbs == nbs:
+                    pieces.append(rest)
+                    return pieces
+                frontier = dilate(frontier) & rest & ~reached
+                reached |= frontier
+            pieces.append(reached)
+            rest &= ~reached
+            nbs &= ~reached
+
+    @staticmethod
+    def _pieces(rest: int, cut: Optional[Tuple[int, ...]]) -> List[int]:
+        """rest 为去掉一个原子后的原分量，cut 为该原子在割点索引中的分出块；返回拆分后的分量。"""
+        if cut is None:
+            return [rest]
+        for m in cut:
+            rest &= ~m
+        return list(cut) + [rest] if rest else list(cut)
+
+    def _cut_index(self) -> Dict[int, Tuple[int, ...]]:
+        """
+        割点索引：割点编号 -> 移除它后从所在分量分出的块（位掩码，不含仍连着 DFS 父节点的那一块）。
+        非割点不在表中。对各分量做一遍迭代式 Tarjan，结果按版本号缓存。
+        """
+        version = self._version
+        if self._cuts_version == version:
+            return self._cuts
+        geom = self._geom
+        colors = self._colors
+        neighbor_ids = geom.neighbor_ids
+        bit_of = geom.bit_of
+        disc: Dict[int, int] = {}
+        low: Dict[int, int] = {}
+        sub: Dict[int, int] = {}  # DFS 子树的位掩码
+        cuts: Dict[int, List[int]] = {}
+        for comp in self._comps:
+            root = geom.id_of_bit[(comp & -comp).bit_length() - 1]
+            disc[root] = low[root] = len(disc)
+            sub[root] = 1 << bit_of[root]
+            parent = {root: -1}
+            stack = [(root, iter(neighbor_ids[root]))]
+            while stack:
+                v, it = stack[-1]
+                for w in it:
+                    if colors[w] == EMPTY:
+                        continue
+                    if w not in disc:
+                        parent[w] = v
+                        disc[w] = low[w] = len(disc)
+                        sub[w] = 1 << bit_of[w]
+                        stack.append((w, iter(neighbor_ids[w])))
+                        break
+                    if w != parent[v] and disc[w] < low[v]:
+                        low[v] = disc[w]
+                else:
+                    stack.pop()
+                    if stack:
+                        u = stack[-1][0]
+                        sub[u] |= sub[v]
+                        if low[v] < low[u]:
+                            low[u] = low[v]
+                        if low[v] >= disc[u]:
+                            cuts.setdefault(u, []).append(sub[v])
+            # 根只有一个 DFS 子节点时不是割点
+            if len(cuts.get(root, ())) < 2:
+                cuts.pop(root, None)
+        result = {i: tuple(pieces) for i, pieces in cuts.items()}
+        # 期间若有写入，版本号已变，结果只用这一次、不缓存
+        if version & 1 == 0 and self._version == version:
+            self._cuts, self._cuts_version = result, version
+        return result
+
+    def articulation_ids(self) -> List[int]:
+        """割点编号：移除该原子会使所在分量断开。"""
+        return list(self._cut_index())
+
+    def articulation_points(self) -> Set[GridPoint]:
+        points = self._geom.points
+        return {points[i] for i in self._cut_index()}
+
+    def components_after_remove_at(self, i: int) -> List[int]:
+        """移除编号 i 上的原子后的全部分量（位掩码），由割点索引直接给出，不修改本格。"""
+        b = 1 << self._geom.bit_of[i]
+        if not self._occ & b:
+            return list(self._comps)
+        cut = self._cut_index().get(i)
+        out = []
+        for m in self._comps:
+            if m & b:
+                rest = m & ~b
+                if rest:
+                    out.extend(self._pieces(rest, cut))
+            else:
+                out.append(m)
+        return out
+
+    def components_after_remove(self, r: int, c: int) -> List[Set[GridPoint]]:
+        """移除 (r,c) 上的原子后的连通分量（不修改本格）。"""
+        i = self._geom.point_id(r, c)
+        if i < 0:
+            return self.connected_components()
+        return [self._mask_points(m) for m in self.components_after_remove_at(i)]
+
+    def remove_components(self, m: int) -> None:
+        """移除位掩码 m 上的全部原子；m 须为若干完整分量之并，分量表直接整块删除。"""
+        m &= self._occ
+        if not m:
+            return
+        self._own()
+        self._version += 1
+        colors = self._colors
+        for i in self._geom.ids_of(m):
+            self._vacate(i, colors[i])
+        self._comps = [k for k in self._comps if not k & m]
+        self._version += 1
+
+    def mask_of(self, points: Iterable[GridPoint]) -> int:
+        """格点集合对应的位掩码（忽略越界格点）。"""
+        geom = self._geom
+        m = 0
+        for r, c in points:
+            i = geom.point_id(r, c)
+            if i >= 0:
+                m |= 1 << geom.bit_of[i]
+        return m
+
+    def atom_ids(self) -> List[int]:
+        """所有有原子的格点编号。"""
+        return self._geom.ids_of(self._occ)
+
+    def color_mask(self, code: int) -> int:
+        """颜色编码 code 的原子位掩码。"""
+        return self._masks[code]
+
+    def occupied_mask(self) -> int:
+        """全部原子的位掩码。"""
+        return self._occ
+
+    def _mask_points(self, m: int) -> Set[GridPoint]:
+        points = self._geom.points
+        return {points[i] for i in self._geom.ids_of(m)}
+
+    # ---- (r, c) 接口 ----
+
+    def get(self, r: int, c: int) -> Optional[Color]:
+        i = self._geom.point_id(r, c)
+        if i < 0:
+            return None
+        code = self._colors[i]
+        return None if code == EMPTY else COLORS[code]
+
+    def place(self, r: int, c: int, color: Color) -> bool:
+        """放置原子。若格点已有原子或越界则返回 False。"""
+        i = self._geom.point_id(r, c)
+        if i < 0:
+            return False
+        return self.place_at(i, color)
+
+    def remove(self, r: int, c: int) -> Optional[Color]:
         """移除格点上的原子，返回原颜色；若无则返回 None。"""
-        return self._atoms.pop((r, c), None)
+        i = self._geom.point_id(r, c)
+        if i < 0:
+            return None
+        code = self.remove_at(i)
+        return None if code == EMPTY else COLORS[code]
+
+    @property
+    def version(self) -> int:
+        """格内容的版本号，每次放置/移除后递增；写入进行中为奇数。"""
+        return self._version
+
+    def all_atoms(self) -> Mapping[GridPoint, Color]:
+        """
+        格点 -> 颜色的只读视图。内容不变时重复调用返回同一快照，不再复制；
+        格子改变后旧快照保持原样（不会随之变化），下次调用生成新快照。
+        """
+        return self.read_stable(self._all_atoms)
+
+    def _all_atoms(self) -> Mapping[GridPoint, Color]:
+        version = self._version
+        if self._snapshot_version == version:
+            return self._snapshot
+        points = self._geom.points
+        colors = self._colors
+        snapshot = MappingProxyType({points[i]: COLORS[colors[i]] for i in self._geom.ids_of(self._occ)})
+        if self._version == version:
+            self._snapshot, self._snapshot_version = snapshot, version
+        return snapshot
 
-    def all_atoms(self) -> Dict[GridPoint, str]:
-        return dict(self._atoms)
+    def read_stable(self, read: Callable[[], T]) -> T:
+        """
+        无锁一致读：调用 read() 读取本格，若期间有写入（版本号为奇数或前后不同）则重读。
+        供后台线程（AI、悬停预览）在界面线程修改本格的同时安全查询。
+        """
+        while True:
+            version = self._version
+            if version & 1:
+                time.sleep(0)
+                continue
+            try:
+                result = read()
+            except Exception:
+                if self._version == version:
+                    raise
+                continue
+            if self._version == version:
+                return result
+
+    def clear(self) -> None:
+        """移除格内全部原子：直接回到共享的空数组，释放本格自有的缓冲区。"""
+        if self._count == 0:
+            return
+        self._version += 1
+        geom = self._geom
+        if self._journal is not None:
+            colors = self._colors
+            self._journal.extend((self, i, colors[i], EMPTY) for i in geom.ids_of(self._occ))
+        self._colors = geom.blank_codes
+        self._black_nb = geom.blank_counts
+        self._frontier = _NO_POINTS
+        self._black_frontier = _NO_POINTS
+        self._count = 0
+        self._masks = [0] * NUM_COLORS
+        self._occ = 0
+        self._comps = []
+        self._black_rows = _Extent(geom.row_range)
+        self._black_x2 = _Extent(geom.x2_range)
+        self._y_sums = [0] * NUM_COLORS
+        self._zhash = 0
+        self._shape = 0
+        self._shared = False
+        self._version += 1
 
     def black_points(self) -> Set[GridPoint]:
-        return {p for p, c in self._atoms.items() if c == ATOM_BLACK}
+        return self._mask_points(self._masks[ATOM_BLACK])
 
     def is_empty(self) -> bool:
-        return len(self._atoms) == 0
+        return self._count == 0
 
     def is_connected(self) -> bool:
         """同格内所有原子是否连通（仅考虑相邻格点都有原子的边）。"""
-        if not self._atoms:
-            return True
-        points = set(self._atoms.keys())
-        start = next(iter(points))
-        visited = {start}
-        q = deque([start])
-        while q:
-            r, c = q.popleft()
-            for nr, nc in self.grid.neighbors_of(r, c):
-                if (nr, nc) in points and (nr, nc) not in visited:
-                    visited.add((nr, nc))
-                    q.append((nr, nc))
-        return len(visited) == len(points)
+        return len(self._comps) <= 1
+
+    def component_count(self) -> int:
+        return len(self._comps)
+
+    def connected_after_place_at(self, i: int) -> bool:
+        """在空位 i 放一个原子后格内是否连通：新原子须接触到现有的每个分量。不修改本格。"""
+        nb = self._geom.neighbor_bits[i]
+        return all(m & nb for m in self._comps)
+
+    def connected_after_place(self, r: int, c: int) -> bool:
+        """在 (r,c) 放一个原子后格内是否连通（越界返回 False）。不修改本格。"""
+        i = self._geom.point_id(r, c)
+        return i >= 0 and self.connected_after_place_at(i)
 
     def has_black(self) -> bool:
-        return any(c == ATOM_BLACK for c in self._atoms.values())
+        return self._masks[ATOM_BLACK] != 0
 
-    def count_by_color(self) -> Dict[str, int]:
-        out = {c: 0 for c in COLORS}
-        for color in self._atoms.values():
-            out[color] = out.get(color, 0) + 1
-        return out
+    def count_by_color(self) -> Dict[Color, int]:
+        return {color: m.bit_count() for color, m in zip(COLORS, self._masks)}
 
     def connected_components(self) -> List[Set[GridPoint]]:
         """返回当前原子集合的连通分量列表（仅沿有原子的相邻边）。"""
-        points = set(self._atoms.keys())
-        if not points:
-            return []
-        components = []
-        remaining = set(points)
-        while remaining:
-            start = remaining.pop()
-            comp = {start}
-            q = deque([start])
-            while q:
-                r, c = q.popleft()
-                for nr, nc in self.grid.neighbors_of(r, c):
-                    p = (nr, nc)
-                    if p in remaining:
-                        remaining.discard(p)
-                        comp.add(p)
-                        q.append(p)
-            components.append(comp)
-        return components
+        return [self._mask_points(m) for m in self._comps]
+
+    def component_masks(self) -> List[int]:
+        """各连通分量的位掩码（增量维护的分量表副本）。"""
+        return list(self._comps)
+
+    def components_touching(self, m: int) -> int:
+        """与位掩码 m 有交集的各分量之并。"""
+        out = 0
+        for k in self._comps:
+            if k & m:
+                out |= k
+        return out
+
+    def empty_neighbors_mask(self, m: int) -> int:
+        """与位掩码 m 中任一格点相邻的空格点位掩码。"""
+        return self._geom.dilate(m) & ~self._occ
+
+    def black_row_span(self) -> int:
+        """最高与最低黑原子的行差（攻击力，单位：三角形高）。"""
+        return self._black_rows.span()
+
+    def black_x_span(self) -> float:
+        """最左与最右黑原子的横向距离（防御力，单位：边长 1）。"""
+        return self._black_x2.span() / 2
+
+    def spans_after_place(self, r: int, c: int, color: Color) -> Tuple[int, float]:
+        """在 (r,c) 放置 color 后的 (黑原子行差, 黑原子横向距离)，不修改本格。"""
+        if color != ATOM_BLACK:
+            return self.black_row_span(), self.black_x_span()
+        return self._black_rows.span_with(r), self._black_x2.span_with(2 * c + r) / 2
+
+    def spans_after_remove(self, r: int, c: int) -> Tuple[int, float]:
+        """移除 (r,c) 上的原子后的 (黑原子行差, 黑原子横向距离)，不修改本格。"""
+        if self.get(r, c) != ATOM_BLACK:
+            return self.black_row_span(), self.black_x_span()
+        return self._black_rows.span_without(r), self._black_x2.span_without(2 * c + r) / 2
 
     def count_black_neighbors(self, r: int, c: int) -> int:
         """格点 (r,c) 上原子与多少黑原子相邻。用于发动效果时的 y。"""
-        color = self._atoms.get((r, c))
-        if not color or color == ATOM_BLACK:
+        i = self._geom.point_id(r, c)
+        if i < 0:
+            return 0
+        code = self._colors[i]
+        if code == EMPTY or code == ATOM_BLACK:
             return 0
-        blacks = self.black_points()
-        n = 0
-        for nr, nc in self.grid.neighbors_of(r, c):
-            if (nr, nc) in blacks:
-                n += 1
-        return n
+        return self._black_nb[i]
+
+    def y_sum(self, color: Color) -> int:
+        """该格所有 color 原子的 y 值（相邻黑原子数）之和；黑原子恒为 0。"""
+        return self._y_sums[color]
+
+    @property
+    def red_y_sum(self) -> int:
+        return self._y_sums[ATOM_RED]
+
+    @property
+    def blue_y_sum(self) -> int:
+        return self._y_sums[ATOM_BLUE]
+
+    @property
+    def green_y_sum(self) -> int:
+        return self._y_sums[ATOM_GREEN]
 
     def black_neighbors_of(self, r: int, c: int) -> Set[GridPoint]:
         """与 (r,c) 相邻的黑原子格点集合。用于蓝效果保护。"""
-        blacks = self.black_points()
-        out: Set[GridPoint] = set()
-        for nr, nc in self.grid.neighbors_of(r, c):
-            if (nr, nc) in blacks:
-                out.add((nr, nc))
-        return out
+        colors = self._colors
+        return {p for p in self.grid.neighbors_of(r, c) if colors[self._geom.index[p]] == ATOM_BLACK}
 
     def black_connected_components(self) -> List[Set[GridPoint]]:
         """仅考虑黑原子、黑-黑相邻的连通分量。用于「选择保留哪一个黑原子连通子集」。"""
-        blacks = self.black_points()
-        if not blacks:
-            return []
-        components: List[Set[GridPoint]] = []
-        remaining = set(blacks)
-        while remaining:
-            start = remaining.pop()
-            comp = {start}
-            q = deque([start])
-            while q:
-                r, c = q.popleft()
-                for nr, nc in self.grid.neighbors_of(r, c):
-                    p = (nr, nc)
-                    if p in remaining:
-                        remaining.discard(p)
-                        comp.add(p)
-                        q.append(p)
-            components.append(comp)
-        return components
-
-    def random_empty_neighbor(self) -> Optional[GridPoint]:
-        """规则选项「黑原子随机放邻格」：在已有原子的邻格中随机选一个空位，若无则返回 None。"""
-        candidates: List[GridPoint] = []
-        for (r, c) in self._atoms:
-            for nr, nc in self.grid.neighbors_of(r, c):
-                if self.grid.in_bounds(nr, nc) and (nr, nc) not in self._atoms:
-                    candidates.append((nr, nc))
-        if not candidates:
-            return None
-        return random.choice(candidates)
+        return [self._mask_points(m) for m in self._geom.components(self._masks[ATOM_BLACK])]
+
+    # ---- 落点边界 ----
+
+    def frontier_ids(self) -> Tuple[int, ...]:
+        """与任一原子相邻的空位编号，升序（格内连通时即全部可保持连通的落点）。"""
+        return tuple(self._frontier.items)
+
+    def black_frontier_ids(self) -> Tuple[int, ...]:
+        """与任一黑原子相邻的空位编号，升序。"""
+        return tuple(self._black_frontier.items)
+
+    def frontier_points(self) -> List[GridPoint]:
+        points = self._geom.points
+        return [points[i] for i in self._frontier.items]
+
+    def black_frontier_points(self) -> List[GridPoint]:
+        points = self._geom.points
+        return [points[i] for i in self._black_frontier.items]
+
+    def in_frontier_at(self, i: int) -> bool:
+        return i in self._frontier
+
+    def random_frontier_id(self, rng: Optional[random.Random] = None) -> Optional[int]:
+        """均匀随机取一个与原子相邻的空位编号，O(1)；无则返回 None。"""
+        return self._frontier.sample(rng or random)
+
+    def random_black_frontier_id(self, rng: Optional[random.Random] = None) -> Optional[int]:
+        """均匀随机取一个与黑原子相邻的空位编号，O(1)；无则返回 None。"""
+        return self._black_frontier.sample(rng or random)
+
+    def random_empty_neighbor(self, rng: Optional[random.Random] = None) -> Optional[GridPoint]:
+        """规则选项「黑原子随机放邻格」：在已有原子的邻格中均匀随机选一个空位，若无则返回 None。"""
+        i = self.random_frontier_id(rng)
+        return None if i is None else self._geom.points[i]
@@ -0,0 +1,42 @@
+"""
+原子颜色表：每种颜色是一个从 0 起连续的小整数编码（IntEnum），格子、原子池、抽取权重与编码都按它下标。
+顺序同网页版 config.js 的 COLORS；颜色名（"black" 等）只在界面与存档处与编码互转。
+"""
+from enum import IntEnum
+from typing import Dict, Tuple
+
+
+class Color(IntEnum):
+    """原子颜色；值即颜色编码，可直接作数组下标。"""
+
+    BLACK = 0
+    RED = 1
+    BLUE = 2
+    GREEN = 3
+    YELLOW = 4
+    PURPLE = 5
+    WHITE = 6
+    GRAY = 7
+
+    def __bool__(self) -> bool:
+        # 颜色恒为真（黑的值为 0），`if cell.get(r, c)` 等「有无原子」判断照旧成立
+        return True
+
+    @property
+    def key(self) -> str:
+        """颜色名（同网页版，小写英文）。"""
+        return COLOR_NAMES[self]
+
+    @classmethod
+    def from_key(cls, key: str) -> "Color":
+        """由颜色名取颜色；未知颜色名抛 ValueError。"""
+        color = COLOR_BY_NAME.get(key) if isinstance(key, str) else None
+        if color is None:
+            raise ValueError(f"未知颜色：{key!r}")
+        return color
+
+
+COLORS: Tuple[Color, ...] = tuple(Color)
+NUM_COLORS = len(COLORS)
+COLOR_NAMES: Tuple[str, ...] = tuple(color.name.lower() for color in COLORS)
+COLOR_BY_NAME: Dict[str, Color] = dict(zip(COLOR_NAMES, COLORS))
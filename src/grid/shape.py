@@ -0,0 +1,116 @@
+"""
+格内原子排布的规范形：平移与水平/竖直翻转下等价的排布视为同一形状。
+攻击力、防御力、连通性、割点与效果 y 值都只与形状有关（边界除外），
+规范哈希可作跨格子、跨对局、跨进程的缓存键。
+
+坐标用 (r, x2)，x2 = 2c + r：6 个邻接方向为 (0, ±2)、(±1, ±1)，
+对 r -> -r 与 x2 -> -x2 都对称，故 4 种朝向（不翻转、左右翻、上下翻、都翻）都保持邻接。
+
+哈希：朝向 o 下位于 (ro, xo)、颜色 code 的原子权重为 K[code] * A^ro * B^xo (mod P)，
+排布的多项式值为各原子权重之和；平移 (dr, dx) 使其整体乘以 A^dr * B^dx，
+故除以「锚点」（该朝向下字典序最小的原子）的 A^ro * B^xo 即得平移不变值，4 个朝向取最小即规范哈希。
+4 个朝向的权重打包进一个大整数的 4 个 80 位段，放置/移除只做一次整数加减（见 Cell.place_at）。
+"""
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+
+from src.grid.colors import NUM_COLORS
+from src.grid.triangle import GridGeometry
+
+# 2^64 以下最大的素数
+P = (1 << 64) - 59
+# 打包的段宽：每段至多 N 个小于 P 的权重之和，N < 2^16 时不会进位到下一段
+LANE_BITS = 80
+LANE_MASK = (1 << LANE_BITS) - 1
+# 朝向：(r 的符号, x2 的符号)
+ORIENTATIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+_rng = random.Random("shape-hash")
+A = _rng.randrange(2, P - 1)
+B = _rng.randrange(2, P - 1)
+# 颜色键：每个颜色编码一个（见 src.grid.colors.Color）
+K = tuple(_rng.randrange(1, P) for _ in range(NUM_COLORS))
+
+
+@dataclass(frozen=True)
+class ShapeTables:
+    """某网格几何下的规范哈希表，按格点编号索引。"""
+    # weights[i * NUM_COLORS + code]：编号 i 上颜色 code 的 4 朝向权重打包值
+    weights: Tuple[int, ...]
+    # unanchor[o][i]：以编号 i 为朝向 o 的锚点时乘上的逆元
+    unanchor: Tuple[Tuple[int, ...], ...]
+    # row_bits[r - r0]：第 r 行全部格点的位掩码
+    row_bits: Tuple[int, ...]
+    r0: int
+
+
+def _term(r: int, x2: int, o: int) -> int:
+    sr, sx = ORIENTATIONS[o]
+    return pow(A, sr * r, P) * pow(B, sx * x2, P) % P
+
+
+@lru_cache(maxsize=None)
+def shape_tables(geom: GridGeometry) -> ShapeTables:
+    """该几何的规范哈希表（每种几何只建一次）。"""
+    weights: List[int] = []
+    unanchor: List[List[int]] = [[] for _ in ORIENTATIONS]
+    for r, c in geom.points:
+        x2 = 2 * c + r
+        terms = [_term(r, x2, o) for o in range(len(ORIENTATIONS))]
+        for k in K:
+            packed = 0
+            for o, t in enumerate(terms):
+                packed |= (k * t % P) << (LANE_BITS * o)
+            weights.append(packed)
+        for o, t in enumerate(terms):
+            unanchor[o].append(pow(t, -1, P))
+    r0, r1 = geom.row_range
+    row_bits = [0] * (r1 - r0 + 1)
+    for (r, _), b in zip(geom.points, geom.bit_of):
+        row_bits[r - r0] |= 1 << b
+    return ShapeTables(
+        weights=tuple(weights),
+        unanchor=tuple(map(tuple, unanchor)),
+        row_bits=tuple(row_bits),
+        r0=r0,
+    )
+
+
+def canonical_hash(geom: GridGeometry, occ: int, packed: int) -> int:
+    """
+    由占用位掩码 occ 与打包的多项式和 packed 算规范哈希（空排布为 0），O(1)。
+    位棋盘按行优先、行内 c 递增排列，各朝向的锚点都是最低/最高行里的最低/最高位。
+    """
+    if not occ:
+        return 0
+    t = shape_tables(geom)
+    id_of_bit = geom.id_of_bit
+    lo = (occ & -occ).bit_length() - 1
+    hi = occ.bit_length() - 1
+    top = occ & t.row_bits[geom.points[id_of_bit[lo]][0] - t.r0]
+    bottom = occ & t.row_bits[geom.points[id_of_bit[hi]][0] - t.r0]
+    # 朝向 0..3 的锚点：最低行最左、最低行最右、最高行最左、最高行最右
+    anchors = (lo, top.bit_length() - 1, (bottom & -bottom).bit_length() - 1, hi)
+    return min(
+        ((packed >> (LANE_BITS * o)) & LANE_MASK) % P * t.unanchor[o][id_of_bit[b]] % P
+        for o, b in enumerate(anchors)
+    )
+
+
+def canonical_form(atoms: List[Tuple[int, int, int]]) -> Tuple[Tuple[int, int, int], ...]:
+    """
+    (r, c, 颜色编码) 列表的规范形：4 个朝向各自平移到以字典序最小原子为原点，
+    取 (dr, dx2, 颜色编码) 排序后字典序最小的一个。两排布形状相同当且仅当规范形相等。
+    """
+    best: Tuple[Tuple[int, int, int], ...] = ()
+    for sr, sx in ORIENTATIONS:
+        pts = sorted((sr * r, sx * (2 * c + r), code) for r, c, code in atoms)
+        if not pts:
+            return ()
+        r0, x0 = pts[0][0], pts[0][1]
+        form = tuple((r - r0, x - x0, code) for r, x, code in pts)
+        if not best or form < best:
+            best = form
+    return best
@@ -4,7 +4,11 @@
 相邻定义：每个节点的邻居是与其最接近的六个节点（即几何距离为 1 的格点）。
 """
 import math
-from typing import Set, Tuple, List, Optional
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import FrozenSet, Iterator, Mapping, Set, Tuple, List, Optional, Sequence
 
 from src.config import TRI_HEIGHT, TRI_SIDE
 
@@ -123,12 +127,236 @@ def hexagon_corners_offset(
     return [_axial_to_offset(q, r_ax) for q, r_ax in corners_axial]
 
 
+# 6 个邻接方向，按绕格点一周的顺序排列：相邻两个方向上的邻居彼此也相邻
+_RING = ((-1, 0), (-1, 1), (0, 1), (1, 0), (1, -1), (0, -1))
+
+
+def iter_bits(m: int) -> Iterator[int]:
+    """非负整数 m 中为 1 的位的位置（从低到高）。"""
+    s = bin(m)[:1:-1]  # 去掉 "0b" 并反转，低位在前
+    i = s.find("1")
+    while i >= 0:
+        yield i
+        i = s.find("1", i + 1)
+
+
+@dataclass(frozen=True, eq=False)
+class GridGeometry:
+    """
+    不可变的网格几何：格点列表与集合、邻接表、越界掩码。
+    同一形状 (rows, cols, center_r, center_c, hex_radius) 全进程只建一次，
+    由 grid_geometry() 缓存，所有同形状的 TriangleGrid / Cell 共享。
+    """
+    rows: int
+    cols: int
+    center_r: int
+    center_c: int
+    hex_radius: Optional[int]
+    # 网格内格点（按行优先排序）
+    points: Tuple[GridPoint, ...]
+    point_set: FrozenSet[GridPoint]
+    # 格点 -> 网格内邻居（最多 6 个）
+    neighbors: Mapping[GridPoint, Tuple[GridPoint, ...]]
+    # 越界掩码：mask[r * cols + c] 为 1 表示 (r, c) 在网格内
+    mask: bytes
+    # 格点编号：网格内格点按 points 顺序编号 0..N-1
+    index: Mapping[GridPoint, int]
+    # 只读编号表：ids[r * cols + c] 为 (r, c) 的编号，网格外为 -1
+    ids: memoryview
+    # 编号 -> 邻居编号（与 neighbors 一致）
+    neighbor_ids: Tuple[Tuple[int, ...], ...]
+    # 位棋盘布局：格点 (r, c) 对应位 (r - r0) * stride + (c - c0)，每行末尾留一空位，
+    # 使 6 个邻接方向都成为固定位移。bit_of[i] 为编号 i 的位，id_of_bit 为其逆（空位为 -1）
+    bit_of: Tuple[int, ...]
+    id_of_bit: memoryview
+    # 网格内全部格点的位掩码
+    all_bits: int
+    # 6 个邻接方向：(位移, 该方向邻居在网格内的源格点掩码)
+    shifts: Tuple[Tuple[int, int], ...]
+    # 行距：相邻两行同列格点的位差，6 个位移为 ±1、±stride、±(stride - 1)
+    stride: int
+    # 格点行号 r 与横坐标两倍 2x = 2c + r 的取值范围（含端点），供按值计数的数组定长
+    row_range: Tuple[int, int]
+    x2_range: Tuple[int, int]
+    # 编号 -> 邻居位掩码
+    neighbor_bits: Tuple[int, ...]
+    # 编号 -> 绕该点一周的 6 个邻居编号（相邻两项互为邻居，网格外为 -1）
+    rings: Tuple[Tuple[int, ...], ...]
+    # 空格子的只读初始数组（颜色编码全为 -1、计数全为 0），供 Cell 在首次放置前共享
+    blank_codes: memoryview
+    blank_counts: memoryview
+
+    @property
+    def size(self) -> int:
+        """网格内格点数 N。"""
+        return len(self.points)
+
+    def in_bounds(self, r: int, c: int) -> bool:
+        return _mask_in_bounds(self.mask, self.rows, self.cols, r, c)
+
+    def dilate(self, m: int) -> int:
+        """
+        位掩码 m 中各格点的网格内邻居（不含 m 自身，除非互为邻居）。
+        行末空位使越过行端的位移都落在空位上，6 个方向整体平移后与 all_bits 相交即可，不必逐方向先取源格点。
+        """
+        inside = self.all_bits
+        m &= inside
+        u = m | m << 1
+        stride = self.stride
+        return (u << stride - 1 | u >> stride | m << 1 | m >> 1) & inside
+
+    def flood(self, seed: int, within: int) -> int:
+        """在 within 内从 seed 出发的连通闭包（seed 须为 within 的子集）。"""
+        reached = seed
+        frontier = seed
+        while frontier:
+            grown = self.dilate(frontier) & within & ~reached
+            reached |= grown
+            frontier = grown
+        return reached
+
+    def components(self, m: int) -> List[int]:
+        """位掩码 m 的连通分量（每个分量为一个位掩码）。"""
+        out = []
+        while m:
+            comp = self.flood(m & -m, m)
+            out.append(comp)
+            m &= ~comp
+        return out
+
+    def ids_of(self, m: int) -> List[int]:
+        """位掩码 m 中的格点编号（按位从低到高）。"""
+        id_of_bit = self.id_of_bit
+        return [id_of_bit[b] for b in iter_bits(m)]
+
+    def point_id(self, r: int, c: int) -> int:
+        """(r, c) 的格点编号；越界返回 -1。"""
+        if r < 0 or r >= self.rows or c < 0 or c >= self.cols:
+            return -1
+        return self.ids[r * self.cols + c]
+
+    def compute_neighbors(self, r: int, c: int) -> List[GridPoint]:
+        """按几何规则现算 (r,c) 的网格内邻居；仅用于网格外格点的查询。"""
+        return _neighbors_in_mask(self.mask, self.rows, self.cols, r, c)
+
+
+def _mask_in_bounds(mask: bytes, rows: int, cols: int, r: int, c: int) -> bool:
+    if r < 0 or r >= rows or c < 0 or c >= cols:
+        return False
+    return mask[r * cols + c] == 1
+
+
+def _neighbors_in_mask(mask: bytes, rows: int, cols: int, r: int, c: int) -> List[GridPoint]:
+    out = []
+    here = (r, c)
+    for nr, nc in neighbors(r, c):
+        if _mask_in_bounds(mask, rows, cols, nr, nc):
+            if abs(distance_between(here, (nr, nc)) - 1.0) < _DIST_ONE_TOL:
+                out.append((nr, nc))
+    return out
+
+
+@lru_cache(maxsize=None)
+def _build_geometry(
+    rows: int, cols: int, center_r: int, center_c: int, hex_radius: Optional[int]
+) -> GridGeometry:
+    mask = bytearray(rows * cols)
+    points: List[GridPoint] = []
+    # 六边形时只需扫描中心上下 hex_radius 行
+    if hex_radius is None:
+        row_range = range(rows)
+    else:
+        row_range = range(max(0, center_r - hex_radius), min(rows, center_r + hex_radius + 1))
+    for r in row_range:
+        for c in range(cols):
+            if hex_radius is None or in_hexagon(r, c, center_r, center_c, hex_radius):
+                points.append((r, c))
+                mask[r * cols + c] = 1
+    mask_b = bytes(mask)
+    table = {p: tuple(_neighbors_in_mask(mask_b, rows, cols, p[0], p[1])) for p in points}
+    index = {p: i for i, p in enumerate(points)}
+    ids = array("i", [-1]) * (rows * cols)
+    for (r, c), i in index.items():
+        ids[r * cols + c] = i
+    # 位棋盘布局
+    r0 = min((r for r, _ in points), default=0)
+    c0 = min((c for _, c in points), default=0)
+    stride = max((c for _, c in points), default=0) - c0 + 2
+    bit_of = tuple((r - r0) * stride + (c - c0) for r, c in points)
+    id_of_bit = array("i", [-1]) * (max(bit_of, default=-1) + 1)
+    for i, b in enumerate(bit_of):
+        id_of_bit[b] = i
+    all_bits = 0
+    for b in bit_of:
+        all_bits |= 1 << b
+    neighbor_bits = tuple(
+        sum(1 << bit_of[index[q]] for q in table[p]) for p in points
+    )
+    rings = tuple(
+        tuple(index.get((r + dr, c + dc), -1) for dr, dc in _RING)
+        for r, c in points
+    )
+    shifts = []
+    for dr, dc in _RING:
+        src = 0
+        for (r, c), b in zip(points, bit_of):
+            if (r + dr, c + dc) in index:
+                src |= 1 << b
+        shifts.append((dr * stride + dc, src))
+    return GridGeometry(
+        rows=rows,
+        cols=cols,
+        center_r=center_r,
+        center_c=center_c,
+        hex_radius=hex_radius,
+        points=tuple(points),
+        point_set=frozenset(points),
+        neighbors=MappingProxyType(table),
+        mask=mask_b,
+        index=MappingProxyType(index),
+        ids=memoryview(ids).toreadonly(),
+        neighbor_ids=tuple(tuple(index[q] for q in table[p]) for p in points),
+        bit_of=bit_of,
+        id_of_bit=memoryview(id_of_bit).toreadonly(),
+        all_bits=all_bits,
+        shifts=tuple(shifts),
+        stride=stride,
+        row_range=(r0, max((r for r, _ in points), default=0)),
+        x2_range=(
+            min((2 * c + r for r, c in points), default=0),
+            max((2 * c + r for r, c in points), default=0),
+        ),
+        neighbor_bits=neighbor_bits,
+        rings=rings,
+        blank_codes=memoryview(array("b", [-1]) * len(points)).toreadonly(),
+        blank_counts=memoryview(bytes(len(points))),
+    )
+
+
+def grid_geometry(
+    rows: int,
+    cols: int,
+    center_r: Optional[int] = None,
+    center_c: Optional[int] = None,
+    hex_radius: Optional[int] = None,
+) -> GridGeometry:
+    """取得该形状的共享几何（首次调用时构建并缓存）。"""
+    if center_r is None:
+        center_r = rows // 2
+    if center_c is None:
+        center_c = cols // 2
+    return _build_geometry(rows, cols, center_r, center_c, hex_radius)
+
+
 class TriangleGrid:
     """
     正三角形网格：格点、邻接、距离。
     可放置原子的格点形成正六边形（hex_radius 控制大小，仅六边形内格点可放置）。
+    格点与邻接表存放在共享的 GridGeometry 中，本对象只是其轻量包装。
     """
 
+    __slots__ = ("geometry", "rows", "cols", "center_r", "center_c", "hex_radius")
+
     def __init__(
         self,
         rows: int,
@@ -137,42 +365,44 @@ class TriangleGrid:
         center_c: Optional[int] = None,
         hex_radius: Optional[int] = None,
     ):
+        self.geometry = grid_geometry(rows, cols, center_r, center_c, hex_radius)
         self.rows = rows
         self.cols = cols
-        self.center_r = center_r if center_r is not None else rows // 2
-        self.center_c = center_c if center_c is not None else cols // 2
+        self.center_r = self.geometry.center_r
+        self.center_c = self.geometry.center_c
         self.hex_radius = hex_radius
-        self._points: List[GridPoint] = []
-        self._rebuild()
-
-    def _rebuild(self) -> None:
-        self._points = []
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if self.hex_radius is None or in_hexagon(
-                    r, c, self.center_r, self.center_c, self.hex_radius
-                ):
-                    self._points.append((r, c))
-
-    def all_points(self) -> List[GridPoint]:
-        return list(self._points)
-
-    def neighbors_of(self, r: int, c: int) -> List[GridPoint]:
+
+    def all_points(self) -> Tuple[GridPoint, ...]:
+        """网格内全部格点（共享的只读元组，不复制）。"""
+        return self.geometry.points
+
+    @property
+    def point_set(self) -> FrozenSet[GridPoint]:
+        """网格内全部格点的只读集合（共享，不复制）。"""
+        return self.geometry.point_set
+
+    def neighbors_of(self, r: int, c: int) -> Sequence[GridPoint]:
         """
         返回在网格范围内、与该节点几何距离为 1 的格点（即与其最接近的节点，最多 6 个）。
         仅返回也在 in_bounds 内的邻居（六边形时仅含六边形内）。
+        结果来自预先建好的邻接表（只读元组），调用方不应修改。
         """
-        out = []
-        here = (r, c)
-        for nr, nc in neighbors(r, c):
-            if self.in_bounds(nr, nc):
-                if abs(distance_between(here, (nr, nc)) - 1.0) < _DIST_ONE_TOL:
-                    out.append((nr, nc))
-        return out
+        nb = self.geometry.neighbors.get((r, c))
+        if nb is None:
+            return self.geometry.compute_neighbors(r, c)
+        return nb
 
     def in_bounds(self, r: int, c: int) -> bool:
-        if r < 0 or r >= self.rows or c < 0 or c >= self.cols:
-            return False
-        if self.hex_radius is None:
-            return True
-        return in_hexagon(r, c, self.center_r, self.center_c, self.hex_radius)
+        return self.geometry.in_bounds(r, c)
+
+
+@lru_cache(maxsize=None)
+def shared_grid(
+    rows: int,
+    cols: int,
+    center_r: Optional[int] = None,
+    center_c: Optional[int] = None,
+    hex_radius: Optional[int] = None,
+) -> TriangleGrid:
+    """同形状共享的 TriangleGrid：各 Cell 共用一个实例，调用方只读不改。"""
+    return TriangleGrid(rows, cols, center_r=center_r, center_c=center_c, hex_radius=hex_radius)
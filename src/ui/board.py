@@ -16,7 +16,7 @@ from src.config import (
     get_font,
 )
 from src.ui.grid_render import draw_cell_grid, screen_to_grid, hexagon_screen_polygon
-from src.grid.cell import Cell, ATOM_RED, ATOM_BLUE, ATOM_GREEN
+from src.grid.cell import Cell
 from src.grid.triangle import GridPoint
 from src.game import combat
 
@@ -104,7 +104,7 @@ def draw_board(
             hex_poly = hexagon_screen_polygon(rect, view_origin, pan_px, grid_scale_denom=grid_scale_denom)
             pygame.draw.polygon(screen, beige, [(int(px), int(py)) for px, py in hex_poly])
             cell = cells[player][cell_index]
-            valid_points = set[GridPoint](cell.grid.all_points())
+            valid_points = cell.grid.point_set
             atoms = cell.all_atoms()
             hp = None
             if current_player is not None and highlight_atoms_by_cell is not None and player == current_player:
@@ -133,15 +133,9 @@ def draw_board(
             # 格子下方显示 ATK/DEF 及红蓝绿效果
             atk = combat.attack_power(cell)
             def_ = combat.defense_power(cell)
-            red_y = blue_y = green_y = 0
-            for (r, c), color in cell.all_atoms().items():
-                y = cell.count_black_neighbors(r, c)
-                if color == ATOM_RED:
-                    red_y += y
-                elif color == ATOM_BLUE:
-                    blue_y += y
-                elif color == ATOM_GREEN:
-                    green_y += y
+            red_y = cell.red_y_sum
+            blue_y = cell.blue_y_sum
+            green_y = cell.green_y_sum
             font = get_font(14)
             text = font.render(f"ATK: {atk:.1f}  DEF: {def_:.1f}", True, COLORS["ui_text"])
             tx = rect[0] + (rect[2] - text.get_width()) // 2
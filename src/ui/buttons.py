@@ -1,21 +1,26 @@
 """
 按钮与可点击区域：阶段 0 三选一、阶段 2 原子池（拖动源）+ 结束排布、阶段 3 结束回合/取消、规则。
 """
-from typing import List, Tuple, Optional, Dict
+from typing import List, Mapping, Tuple, Optional, Dict, Union
 import pygame
 from src.config import COLORS, SCREEN_WIDTH, SCREEN_HEIGHT, get_font
+from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN, ATOM_YELLOW
+from src.grid.colors import Color
 
 # 原子颜色与 config 键、中文名
 ATOM_BUTTON_COLORS = {
-    "black": ("atom_black", "黑"),
-    "red": ("atom_red", "红"),
-    "blue": ("atom_blue", "蓝"),
-    "green": ("atom_green", "绿"),
+    ATOM_BLACK: ("atom_black", "黑"),
+    ATOM_RED: ("atom_red", "红"),
+    ATOM_BLUE: ("atom_blue", "蓝"),
+    ATOM_GREEN: ("atom_green", "绿"),
+    ATOM_YELLOW: ("atom_yellow", "黄"),
 }
 
 BTN_H = 44
 BTN_GAP = 16
 POOL_BOX_SIZE = 48
+# 原子池竖排的控件数：各颜色 + 撤回 + 结束排布
+_POOL_CONTROLS = len(ATOM_BUTTON_COLORS) + 2
 
 
 def _draw_button(screen: pygame.Surface, rect: pygame.Rect, text: str, font_size: int = 22) -> None:
@@ -69,21 +74,21 @@ def draw_phase0_buttons_vertical(screen: pygame.Surface) -> List[Tuple[pygame.Re
 
 def draw_atom_pool_and_end(
     screen: pygame.Surface,
-    pool: Dict[str, int],
+    pool: Mapping[Color, int],
     place_limit: int,
     placed: int,
     current_player: int,
-) -> List[Tuple[pygame.Rect, str]]:
+) -> List[Tuple[pygame.Rect, Union[Color, str]]]:
     """
     绘制当前玩家的原子池（可拖动）与「撤回」「结束排布」按钮。
-    竖排于屏幕左侧：黑/红/蓝/绿 → 撤回 → 结束排布。
-    返回 [(rect, "black"|"red"|"blue"|"green"|"undo"|"end_place"), ...]，仅包含数量>0的颜色。
+    竖排于屏幕左侧：黑/红/蓝/绿/黄 → 撤回 → 结束排布。
+    返回 [(rect, 颜色|"undo"|"end_place"), ...]，仅包含数量>0的颜色。
     """
     font = get_font(18)
     out = []
     left_x = 24
-    # 垂直居中：6 个控件，总高 6*(POOL_BOX_SIZE+BTN_GAP)-BTN_GAP
-    total_h = 6 * (POOL_BOX_SIZE + BTN_GAP) - BTN_GAP
+    # 垂直居中：各颜色 + 撤回 + 结束排布，总高 n*(POOL_BOX_SIZE+BTN_GAP)-BTN_GAP
+    total_h = _POOL_CONTROLS * (POOL_BOX_SIZE + BTN_GAP) - BTN_GAP
     y0 = (SCREEN_HEIGHT - total_h) // 2
     for color_key, (col_name, _) in ATOM_BUTTON_COLORS.items():
         count = pool.get(color_key, 0)
@@ -115,9 +120,9 @@ def draw_batch_place_button(screen: pygame.Surface) -> pygame.Rect:
     """
     left_x = 24
     end_btn_w = 160
-    total_h = 6 * (POOL_BOX_SIZE + BTN_GAP) - BTN_GAP
+    total_h = _POOL_CONTROLS * (POOL_BOX_SIZE + BTN_GAP) - BTN_GAP
     y0 = (SCREEN_HEIGHT - total_h) // 2
-    y0 += 5 * (POOL_BOX_SIZE + BTN_GAP)
+    y0 += (_POOL_CONTROLS - 1) * (POOL_BOX_SIZE + BTN_GAP)
     y0 += POOL_BOX_SIZE + BTN_GAP
     r = pygame.Rect(left_x, y0, end_btn_w, POOL_BOX_SIZE)
     _draw_button(screen, r, "批量放置", 18)
@@ -319,7 +324,7 @@ def grid_scale_value_from_track(track_rect: pygame.Rect, mouse_x: int) -> int:
     return int(round(GRID_SCALE_DENOM_MIN + t * (GRID_SCALE_DENOM_MAX - GRID_SCALE_DENOM_MIN)))
 
 
-def draw_dragging_ghost(screen: pygame.Surface, color: str, mouse_pos: Tuple[int, int]) -> None:
+def draw_dragging_ghost(screen: pygame.Surface, color: Color, mouse_pos: Tuple[int, int]) -> None:
     """拖动时在鼠标位置绘制半透明原子（无外框）。"""
     col_name = ATOM_BUTTON_COLORS.get(color, ("atom_black", ""))[0]
     rgb = COLORS.get(col_name, (80, 80, 80))
@@ -3,7 +3,7 @@
 支持大正六边形网格：三角形边长固定为格子边长的 1/4，仅绘制六边形内且位于可见窗口内的点。
 """
 import math
-from typing import Dict, Tuple, Optional, Set, List
+from typing import AbstractSet, Mapping, Tuple, Optional, Set, List
 
 import pygame
 
@@ -19,6 +19,7 @@ from src.config import (
     GRID_CENTER_C,
     HEX_RADIUS,
 )
+from src.grid.colors import Color, COLORS as ATOM_COLORS
 from src.grid.triangle import (
     point_to_xy,
     neighbors,
@@ -28,12 +29,7 @@ from src.grid.triangle import (
 )
 
 # 原子颜色到 config 键
-ATOM_COLOR_KEYS = {
-    "black": "atom_black",
-    "red": "atom_red",
-    "blue": "atom_blue",
-    "green": "atom_green",
-}
+ATOM_COLOR_KEYS = {color: f"atom_{color.key}" for color in ATOM_COLORS}
 
 
 def _grid_transform_view(
@@ -220,9 +216,9 @@ def screen_to_grid(
 def draw_cell_grid(
     screen: pygame.Surface,
     cell_rect: Tuple[int, int, int, int],
-    cell_atoms: Dict[GridPoint, str],
+    cell_atoms: Mapping[GridPoint, Color],
     view_origin: Tuple[int, int],
-    valid_points: Optional[Set[GridPoint]] = None,
+    valid_points: Optional[AbstractSet[GridPoint]] = None,
     highlight_points: Optional[Set[GridPoint]] = None,
     highlight_points_red: Optional[Set[GridPoint]] = None,
     highlight_points_blue: Optional[Set[GridPoint]] = None,
@@ -4,6 +4,7 @@ HUD：生命、原子池、当前阶段与操作提示、规则 overlay、攻防
 import pygame
 from typing import Optional, Tuple
 from src.config import COLORS, SCREEN_WIDTH, SCREEN_HEIGHT, get_font
+from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN, ATOM_YELLOW
 from src.ui.buttons import draw_phase0_buttons_at
 from src.game.state import (
     GameState,
@@ -44,10 +45,11 @@ RULES_OVERLAY_LINES = [
 
 # 原子颜色（与 config 一致）
 _POOL_COLORS = [
-    ("black", COLORS.get("atom_black", (40, 42, 48))),
-    ("red", COLORS.get("atom_red", (200, 70, 70))),
-    ("blue", COLORS.get("atom_blue", (70, 120, 200))),
-    ("green", COLORS.get("atom_green", (70, 160, 100))),
+    (ATOM_BLACK, COLORS.get("atom_black", (40, 42, 48))),
+    (ATOM_RED, COLORS.get("atom_red", (200, 70, 70))),
+    (ATOM_BLUE, COLORS.get("atom_blue", (70, 120, 200))),
+    (ATOM_GREEN, COLORS.get("atom_green", (70, 160, 100))),
+    (ATOM_YELLOW, COLORS.get("atom_yellow", (200, 168, 50))),
 ]
 _HP_BAR_W = 120
 _HP_BAR_H = 16
@@ -151,8 +153,8 @@ def _draw_player_panel(
     top_pad = 6
     content_x = x + _AVATAR_SIZE + _AVATAR_GAP
     bar_y = y + top_pad
-    # 宽度：头像 + 间距 + HP 条右侧留出数值位 + 4 个原子
-    content_w = _HP_BAR_W + 36 + 4 * (_ATOM_DOT_R * 2 + 6 + 20) + _PANEL_PAD * 2
+    # 宽度：头像 + 间距 + HP 条右侧留出数值位 + 各颜色原子
+    content_w = _HP_BAR_W + 36 + len(_POOL_COLORS) * (_ATOM_DOT_R * 2 + 6 + 20) + _PANEL_PAD * 2
     panel_w = _AVATAR_SIZE + _AVATAR_GAP + content_w
     panel_h = top_pad + _HP_BAR_H + _PANEL_PAD + 4
     panel = pygame.Rect(x, y, panel_w, panel_h)
@@ -1,6 +1,11 @@
 """抽原子：数量与颜色集合。"""
+import random
 import unittest
-from src.atoms.draw import draw_atoms, WEIGHTS, PROBS
+from src.atoms.draw import AtomSampler, atom_sampler, draw_atoms, WEIGHTS, PROBS
+from src.grid.colors import Color
+from src.game.game_config import default_config
+from src.game.state import GameState
+from src.game import turn
 
 
 class TestAtomsDraw(unittest.TestCase):
@@ -19,10 +24,55 @@ class TestAtomsDraw(unittest.TestCase):
 
     def test_black_half(self):
         out = draw_atoms(1000)
-        black_ratio = out.count("black") / 1000
+        black_ratio = out.count(Color.BLACK) / 1000
         self.assertGreater(black_ratio, 0.4)
         self.assertLess(black_ratio, 0.6)
 
+    def test_sampler_counts_follow_weights(self):
+        # 任意颜色数；权重为 0 的颜色抽不到；各色频率接近权重比例
+        rng = random.Random(4)
+        weights = default_config().draw_weights
+        sampler = atom_sampler(tuple(weights))
+        self.assertIs(atom_sampler(tuple(weights)), sampler)
+        totals = [0] * len(weights)
+        for _ in range(2000):
+            counts = sampler.counts(10, rng)
+            self.assertEqual(sum(counts), 10)
+            totals = [a + b for a, b in zip(totals, counts)]
+        self.assertEqual(totals[3], 0)
+        for t, p in zip(totals, sampler.probs):
+            self.assertAlmostEqual(t / 20000, p, delta=0.015)
+        self.assertEqual(AtomSampler([0, 0, 5]).counts(7, rng), [0, 0, 7])
+        for bad in ([], [0, 0], [1, -1, 3], [1] * 9):
+            with self.assertRaises(ValueError):
+                AtomSampler(bad)
+        self.assertEqual(atom_sampler((0, 0, 0, 0)).weights, (3, 1, 1, 1))
+
+    def test_turn_draw_uses_config_weights(self):
+        # 默认配置 5 项权重（含黄）按原样生效：绿权重为 0，黄可被抽到
+        state = GameState(seed=2)
+        before = state.pool(0).counts()
+        state.turn_draw_count = 400
+        turn.advance_to_phase_1(state)
+        gained = [b - a for a, b in zip(before, state.pool(0).counts())]
+        self.assertEqual(sum(gained), 400)
+        self.assertEqual(gained[3], 0)
+        self.assertGreater(gained[4], 0)
+
+    def test_counts_batch(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("未安装 numpy")
+        sampler = atom_sampler((3, 1, 1, 0, 1))
+        n = np.full(5000, 10)
+        out = sampler.counts_batch(n, rng=1)
+        self.assertEqual(out.shape, (5000, 5))
+        self.assertTrue((out.sum(axis=1) == 10).all())
+        self.assertEqual(int(out[:, 3].sum()), 0)
+        self.assertAlmostEqual(out[:, 0].mean() / 10, 0.5, delta=0.01)
+        self.assertTrue((sampler.counts_batch(n, rng=1) == out).all())
+
 
 if __name__ == "__main__":
     unittest.main()
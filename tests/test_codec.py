@@ -0,0 +1,120 @@
+"""局面二进制编码：往返一致、体积、损坏数据。"""
+import random
+import unittest
+from dataclasses import replace
+
+from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_GRAY, ATOM_PURPLE
+from src.game.codec import FORMAT_VERSION, encode_state, decode_state
+from src.game.engine import GameEngine, IDLE
+from src.game.game_config import default_config
+from src.game.state import GameState, CHOICE_EXTRA_PLACE
+from tests.test_engine import play_turn
+
+
+def snapshot(state: GameState) -> tuple:
+    return (
+        [[dict(c.all_atoms()) for c in cs] for cs in state.cells],
+        [pool.to_dict() for pool in state.pools],
+        list(state.hp), state.current_player, state.phase, state.phase_0_choice,
+        state.turn_number, state.is_first_turn, state.base_draw_count, state.base_place_limit,
+        list(state.draw_weights), state.turn_draw_count, state.turn_place_limit, state.turn_attack_limit,
+        state.turn_placed_count, state.turn_attack_used,
+        [list(m) for m in state.blue_protected], list(state.blue_protection_until_turn),
+        state.zobrist(), state.seed,
+    )
+
+
+class TestCodec(unittest.TestCase):
+    def assertRoundTrip(self, state: GameState) -> bytes:
+        data = encode_state(state)
+        decoded = decode_state(memoryview(data), state.config)
+        self.assertEqual(snapshot(decoded), snapshot(state))
+        self.assertEqual(encode_state(decoded), data)
+        return data
+
+    def test_empty_and_custom_fields(self):
+        state = GameState()
+        self.assertEqual(self.assertRoundTrip(state)[0], FORMAT_VERSION)
+        state.hp = [-3, 7]
+        state.phase_0_choice = CHOICE_EXTRA_PLACE
+        state.base_place_limit = 300
+        state.draw_weights = [1, 0, 5, 2, 0, 0, 0, 3]
+        state.pools[1][ATOM_RED] = 1000
+        state.pools[0][ATOM_GRAY] = 2
+        cell = state.cells[1][2]
+        cell.place(cell.grid.center_r, cell.grid.center_c, ATOM_BLACK)
+        cell.place(cell.grid.center_r, cell.grid.center_c + 1, ATOM_PURPLE)
+        cell.place(cell.grid.center_r, cell.grid.center_c - 1, ATOM_GRAY)
+        state.protect_black(1, 2, (cell.grid.center_r, cell.grid.center_c))
+        state.blue_protection_until_turn[1] = 4
+        self.assertRoundTrip(state)
+
+    def test_seed_optional(self):
+        # 种子与配置相同时不记；with_seed=False 时省去 8 字节，解码按配置取种子
+        state = GameState()
+        data = encode_state(state)
+        short = encode_state(state, with_seed=False)
+        self.assertEqual(len(data) - len(short), 8)
+        self.assertEqual(snapshot(decode_state(data)), snapshot(state))
+        config = replace(default_config(), seed=5)
+        state = GameState(config)
+        self.assertEqual(state.seed, 5)
+        self.assertEqual(len(encode_state(state)), len(short))
+        self.assertEqual(decode_state(short, config).seed, 5)
+
+    def test_games_round_trip(self):
+        # 整局每回合往返；结算中途格子可不连通
+        for seed, random_mode in ((1, True), (2, False)):
+            rng = random.Random(seed)
+            engine = GameEngine(config=replace(default_config(), random_destroy_on_attack=random_mode, seed=seed))
+            sizes = []
+            for _ in range(30):
+                if engine.winner() is not None:
+                    break
+                play_turn(engine, rng)
+                sizes.append(len(self.assertRoundTrip(engine.state)))
+            self.assertLess(max(sizes), 100)
+        engine = GameEngine(config=replace(default_config(), random_destroy_on_attack=False))
+        state = engine.state
+        cell = state.cells[0][0]
+        r, c = cell.grid.center_r, cell.grid.center_c
+        for dc in range(5):
+            cell.place(r, c + dc, ATOM_BLACK)
+        cell.remove(r, c + 2)
+        self.assertEqual(cell.component_count(), 2)
+        self.assertEqual(engine.step, IDLE)
+        self.assertRoundTrip(state)
+
+    def test_rng_state(self):
+        state = GameState(seed=-12)
+        state.rng.gauss(0, 1)
+        for _ in range(10):
+            state.rng.random()
+        data = encode_state(state, with_rng=True)
+        short = encode_state(state)
+        self.assertGreater(len(data), 2500)
+        for decoded in (decode_state(data), decode_state(data)):
+            self.assertEqual(snapshot(decoded), snapshot(state))
+            self.assertEqual(decoded.rng.getstate(), state.rng.getstate())
+        restarted = decode_state(short)
+        self.assertEqual(restarted.seed, -12)
+        self.assertEqual(restarted.rng.random(), GameState(seed=-12).rng.random())
+        for n in (len(data) - 3, 100):
+            with self.assertRaises(ValueError):
+                decode_state(data[:n])
+
+    def test_corrupt_data(self):
+        data = encode_state(GameState())
+        with self.assertRaises(ValueError):
+            decode_state(bytes([FORMAT_VERSION + 1]) + data[1:])
+        state = GameState()
+        cell = state.cells[0][1]
+        cell.place(cell.grid.center_r, cell.grid.center_c, ATOM_BLACK)
+        data = encode_state(state)
+        for n in range(len(data)):
+            with self.assertRaises(ValueError):
+                decode_state(data[:n])
+
+
+if __name__ == "__main__":
+    unittest.main()
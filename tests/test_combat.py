@@ -1,7 +1,10 @@
 """战斗：攻击力、防御力、破坏、直接攻击。"""
+import random
 import unittest
+from src.grid.triangle import vertical_distance_units, horizontal_distance_units
 from src.grid.cell import Cell, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN
 from src.game import combat
+from src.game.state import GameState, PHASE_PLACE, PHASE_ACTION
 
 
 class TestCombat(unittest.TestCase):
@@ -17,6 +20,28 @@ class TestCombat(unittest.TestCase):
         cell.place(0, 3, ATOM_BLACK)
         self.assertAlmostEqual(combat.defense_power(cell), 3.0, delta=1e-5)
 
+    def test_powers_track_place_and_remove(self):
+        # 增量维护的攻/防与按黑原子点集现算的结果一致；假设性查询不修改格子
+        rng = random.Random(3)
+        cell = Cell(12, 12)
+        points = cell.grid.all_points()
+        for _ in range(600):
+            r, c = rng.choice(points)
+            color = rng.choice([ATOM_BLACK, ATOM_BLACK, ATOM_RED])
+            before = cell.all_atoms()
+            if cell.get(r, c) is None:
+                predicted = combat.powers_after_place(cell, r, c, color)
+                self.assertEqual(cell.all_atoms(), before)
+                cell.place(r, c, color)
+            else:
+                predicted = combat.powers_after_remove(cell, r, c)
+                self.assertEqual(cell.all_atoms(), before)
+                cell.remove(r, c)
+            blacks = cell.black_points()
+            expected = (vertical_distance_units(blacks), horizontal_distance_units(blacks))
+            self.assertEqual((combat.attack_power(cell), combat.defense_power(cell)), expected)
+            self.assertEqual(predicted, expected)
+
     def test_attack_beats_defense(self):
         atk = Cell(5, 6)
         atk.place(0, 0, ATOM_BLACK)
@@ -67,6 +92,134 @@ class TestCombat(unittest.TestCase):
         self.assertIsNone(cell.get(0, 3))
         self.assertIsNotNone(cell.get(0, 0))
 
+    def test_loss_if_destroyed(self):
+        # 一行：黑 红 黑 黑 红；破坏中间的黑会切下右端红，破坏左端黑会使左侧无黑
+        cell = Cell(5, 8)
+        for c, color in enumerate([ATOM_BLACK, ATOM_RED, ATOM_BLACK, ATOM_BLACK, ATOM_RED]):
+            cell.place(2, c, color)
+        self.assertEqual(combat.loss_if_destroyed(cell, (2, 0)), 1)
+        self.assertEqual(combat.loss_if_destroyed(cell, (2, 2)), 3)
+        self.assertEqual(combat.loss_if_destroyed(cell, (2, 3)), 2)
+        self.assertEqual(combat.loss_if_destroyed(cell, (2, 1)), 0)
+        self.assertEqual(combat.best_black_to_destroy(cell), (2, 2))
+        self.assertEqual(combat.best_black_to_destroy(cell, exclude={(2, 2)}), (2, 3))
+        self.assertEqual(len(cell.all_atoms()), 5)
+        combat.destroy_one_black_and_get_components(cell, cell, (2, 2))
+        self.assertEqual(len(combat.remove_components_without_black_and_return_rest(cell)), 2)
+        combat.remove_components_except(cell, {(2, 3)})
+        self.assertEqual(sorted(cell.all_atoms()), [(2, 3), (2, 4)])
+
+    def test_blue_protection_and_green_pool(self):
+        state = GameState()
+        cell = state.cells[0][1]
+        r, c = cell.grid.center_r, cell.grid.center_c
+        cell.place(r, c, ATOM_BLUE)
+        cell.place(r, c + 1, ATOM_BLACK)
+        cell.place(r + 1, c, ATOM_GREEN)
+        self.assertTrue(combat.apply_effect_blue(state, 0, 1, r, c))
+        self.assertTrue(state.is_black_protected(0, 1, (r, c + 1)))
+        self.assertFalse(state.is_black_protected(0, 0, (r, c + 1)))
+        self.assertEqual(state.protected_points(0, 1), [(r, c + 1)])
+        before = state.pool(0)[ATOM_BLACK]
+        self.assertEqual(combat.apply_green_end_of_turn(state, 0), 1)
+        self.assertEqual(state.pool(0).get(ATOM_BLACK), before + 1)
+        self.assertEqual(state.pool(1).get("purple", 0), 0)
+
+    def test_remove_component(self):
+        cell = Cell(12, 12)
+        r, c = cell.grid.center_r, cell.grid.center_c
+        for dc in (-1, 0, 1):
+            cell.place(r, c + dc, ATOM_BLACK)
+        cell.place(r, c + 3, ATOM_RED)
+        # 只含分量的一部分：逐个移除，剩下的原子仍有正确的分量表
+        combat.remove_component(cell, {(r, c)})
+        self.assertEqual(len(cell.all_atoms()), 3)
+        self.assertEqual(sorted(cell.component_masks()), sorted(cell.grid.geometry.components(cell.occupied_mask())))
+        self.assertEqual(cell.component_count(), 3)
+        # 完整分量：整块删除
+        combat.remove_component(cell, {(r, c + 3)})
+        self.assertEqual(sorted(cell.all_atoms()), [(r, c - 1), (r, c + 1)])
+        self.assertEqual(cell.component_count(), 2)
+
+    def _strike_state(self):
+        # 进攻方 0 号格：两黑相距 5 行（攻击力 5）；被攻击方 0 号格一行：黑 红 黑 黑 黑（防御力 4）
+        state = GameState()
+        state.current_player = 0
+        state.phase = PHASE_ACTION
+        state.is_first_turn = False
+        atk = state.cells[0][0]
+        r, c = atk.grid.center_r, atk.grid.center_c
+        atk.place(r, c, ATOM_BLACK)
+        atk.place(r + 5, c, ATOM_BLACK)
+        cell = state.cells[1][0]
+        for dc, color in enumerate([ATOM_BLACK, ATOM_RED, ATOM_BLACK, ATOM_BLACK, ATOM_BLACK]):
+            cell.place(r, c + dc, color)
+        return state, cell, r, c
+
+    def test_resolve_attack_auto(self):
+        state, cell, r, c = self._strike_state()
+        for dc in (0, 3, 4):
+            state.protect_black(1, 0, (r, c + dc))
+        hp = state.hp[1]
+        res = combat.resolve_attack_auto(state, 0, 0, random.Random(0))
+        # 唯一可破坏的是 (r, c+2)；剩下两块中保留黑原子多的一块
+        self.assertEqual(res.destroyed, ((0, (r, c + 2)),))
+        self.assertEqual((res.damage, res.removed), (1, 2))
+        self.assertEqual(sorted(cell.all_atoms()), [(r, c + 3), (r, c + 4)])
+        self.assertEqual(res.remaining, ((0, cell.occupied_mask()),))
+        self.assertEqual((state.hp[1], state.turn_attack_used), (hp - 1, 1))
+        # 攻击力不足时不结算
+        self.assertIsNone(combat.resolve_attack_auto(state, 1, 0))
+
+    def test_resolve_attack_auto_not_allowed(self):
+        # 次数用尽、首回合或不在动作阶段时不结算，状态不变
+        for name, value in (("turn_attack_used", 1), ("is_first_turn", True), ("phase", PHASE_PLACE)):
+            state, cell, r, c = self._strike_state()
+            state.turn_attack_limit = 1
+            setattr(state, name, value)
+            before = (cell.occupied_mask(), state.hp[1], state.turn_attack_used)
+            self.assertIsNone(combat.resolve_attack_auto(state, 0, 0, random.Random(0)), name)
+            self.assertEqual((cell.occupied_mask(), state.hp[1], state.turn_attack_used), before)
+        # 连续进攻到上限后不再结算
+        state, cell, r, c = self._strike_state()
+        state.turn_attack_limit = 1
+        self.assertIsNotNone(combat.resolve_attack_auto(state, 0, 0, random.Random(0)))
+        hp = state.hp[1]
+        self.assertIsNone(combat.resolve_attack_auto(state, 0, 0, random.Random(0)))
+        self.assertEqual((state.hp[1], state.turn_attack_used), (hp, 1))
+
+    def test_resolve_red_auto_not_allowed(self):
+        # 不在动作阶段或发动方不是当前玩家时不结算，状态不变
+        for name, value in (("phase", PHASE_PLACE), ("current_player", 1)):
+            state, cell, r, c = self._strike_state()
+            atk = state.cells[0][0]
+            atk.place(r, c + 1, ATOM_RED)
+            setattr(state, name, value)
+            before = (atk.occupied_mask(), cell.occupied_mask())
+            self.assertIsNone(combat.resolve_red_auto(state, 0, 0, r, c + 1, 0, random.Random(0)), name)
+            self.assertEqual((atk.occupied_mask(), cell.occupied_mask()), before)
+            state.current_player, state.phase = 0, PHASE_ACTION
+            self.assertIsNotNone(combat.resolve_red_auto(state, 0, 0, r, c + 1, 0, random.Random(0)))
+
+    def test_resolve_auto_invariants(self):
+        for seed in range(30):
+            state, cell, r, c = self._strike_state()
+            atk = state.cells[0][0]
+            atk.place(r, c + 1, ATOM_RED)
+            atk.place(r + 1, c, ATOM_RED)
+            rng = random.Random(seed)
+            if seed % 2:
+                res = combat.resolve_attack_auto(state, 0, 0, rng)
+                self.assertEqual(len(res.destroyed), 3)  # 1 个黑 + 红 2 蓝 0 的 2 个额外
+            else:
+                y = atk.count_black_neighbors(r, c + 1)
+                res = combat.resolve_red_auto(state, 0, 0, r, c + 1, 0, rng)
+                self.assertEqual(len(res.destroyed), min(y, 4))
+                self.assertIsNone(atk.get(r, c + 1))
+            self.assertEqual(res.remaining, ((0, cell.occupied_mask()),))
+            self.assertEqual(len(res.destroyed) + res.removed, 5 - len(cell.all_atoms()))
+            self.assertTrue(cell.is_empty() or (cell.is_connected() and len(cell.black_connected_components()) == 1))
+
 
 if __name__ == "__main__":
     unittest.main()
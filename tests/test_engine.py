@@ -0,0 +1,300 @@
+"""无界面引擎：以动作对象驱动整局。"""
+import random
+import subprocess
+import sys
+import unittest
+from dataclasses import replace
+
+from src.grid.cell import ATOM_BLACK, ATOM_RED
+from src.game.actions import (
+    Place, BatchPlace, UndoPlace, EndPlace, Attack, Effect, Pick, ChooseComponent, Cancel, EndTurn,
+)
+from src.game.engine import GameEngine, IDLE, PICK_STEPS, ATTACK_CHOOSE_BLACK, RED_PICK, RED_CHOOSE_COMPONENT
+from src.game.game_config import default_config
+from src.game.codec import encode_state
+from src.game.state import GameState, PHASE_PLACE, PHASE_ACTION, derive_seed
+
+
+def play_turn(engine: GameEngine, rng: random.Random) -> None:
+    """一名随机玩家的一个回合：批量放黑（偶尔撤回一步）、放红，逐格进攻或发动红效果，结算中随机点选。"""
+    state = engine.state
+    cur = state.current_player
+    for ci in range(3):
+        engine.apply(BatchPlace(ci, rng.randint(0, 4)))
+    if rng.random() < 0.3:
+        engine.apply(UndoPlace())
+    if state.pool(cur).get(ATOM_RED, 0) > 0:
+        cell = state.cells[cur][rng.randrange(3)]
+        if cell.has_black():
+            pts = sorted(cell.black_frontier_points())
+            engine.apply(Place(state.cells[cur].index(cell), *rng.choice(pts), ATOM_RED))
+    engine.apply(EndPlace())
+    opp = state.opponent(cur)
+    for ci in range(3):
+        cell = state.cells[cur][ci]
+        reds = [pt for pt, color in cell.all_atoms().items() if color == ATOM_RED]
+        if reds and rng.random() < 0.5:
+            engine.apply(Effect(ci, *reds[0], target_cell=rng.randrange(3)))
+        else:
+            targets = [i for i in range(3) if not state.cells[opp][i].is_empty()]
+            engine.apply(Attack(ci, rng.choice(targets) if targets else None))
+        for _ in range(1000):
+            if engine.step == IDLE or engine.winner() is not None:
+                break
+            if engine.black_components_pending is not None:
+                targets = [engine.black_components_pending[1]]
+            elif engine.step == RED_CHOOSE_COMPONENT:
+                targets = [i for i, _ in engine.red_components_pending[1]]
+            elif engine.attack_target is not None:
+                targets = [engine.attack_target]
+            else:
+                targets = [engine.red_target_cell]
+            points = [(i, pt) for i in targets for pt in state.cells[engine.defender][i].all_atoms()]
+            i, (r, c) = rng.choice(points)
+            action = Pick if engine.step in PICK_STEPS else ChooseComponent
+            engine.apply(action(i, r, c))
+        else:
+            raise AssertionError(f"结算未结束：{engine.step}")
+        if engine.winner() is not None:
+            return
+    engine.apply(EndTurn())
+
+
+def fingerprint(engine: GameEngine) -> tuple:
+    state = engine.state
+    return (
+        [[sorted(c.all_atoms().items()) for c in cs] for cs in state.cells],
+        [[(c.component_count(), sorted(c.frontier_ids()), c.red_y_sum, c.black_x_span()) for c in cs]
+         for cs in state.cells],
+        [pool.to_dict() for pool in state.pools],
+        list(state.hp), state.current_player, state.phase, state.turn_number, state.is_first_turn,
+        state.turn_placed_count, state.turn_attack_used, state.turn_place_limit,
+        [list(m) for m in state.blue_protected], list(state.blue_protection_until_turn),
+        engine._pending(), len(engine.history), state.zobrist(), engine.rng.getstate(),
+    )
+
+
+class UndoingEngine(GameEngine):
+    """每个动作先执行、撤销并核对局面一致，再正式执行并核对与第一次执行结果相同（含随机源）。"""
+
+    def __init__(self, test: unittest.TestCase, **kw):
+        self.test = test
+        super().__init__(**kw)
+
+    def apply(self, action):
+        before = fingerprint(self)
+        self.undo(super().apply(action).token)
+        self.test.assertEqual(fingerprint(self), before, action)
+        outcome = super().apply(action)
+        after = fingerprint(self)
+        self.undo(outcome.token)
+        outcome = super().apply(action)
+        self.test.assertEqual(fingerprint(self), after, action)
+        return outcome
+
+
+class TestEngine(unittest.TestCase):
+    def test_no_pygame(self):
+        code = "import sys, src.game.engine; sys.exit('pygame' in sys.modules)"
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+    def test_place_undo_end_place(self):
+        engine = GameEngine(config=replace(default_config(), random_place_black_on_neighbor=False))
+        state = engine.state
+        self.assertEqual(state.phase, PHASE_PLACE)
+        r, c = state.cells[0][0].grid.center_r, state.cells[0][0].grid.center_c
+        black = state.pool(0)[ATOM_BLACK]
+        out = engine.apply(Place(0, r, c, ATOM_BLACK))
+        self.assertTrue(out.ok)
+        self.assertEqual(out.events, ("place",))
+        self.assertFalse(engine.apply(Place(0, r, c + 2, ATOM_BLACK)).ok)
+        self.assertEqual(engine.apply(UndoPlace()).message, "已撤回一步")
+        self.assertTrue(state.cells[0][0].is_empty())
+        self.assertEqual(state.pool(0)[ATOM_BLACK], black)
+        self.assertFalse(engine.apply(UndoPlace()).ok)
+        self.assertFalse(engine.apply(EndTurn()).ok)
+        self.assertTrue(engine.apply(EndPlace()).ok)
+        self.assertEqual(state.phase, PHASE_ACTION)
+        self.assertTrue(engine.apply(EndTurn()).ok)
+        self.assertEqual((state.current_player, state.phase), (1, PHASE_PLACE))
+
+    def test_attack_choose_black_and_cancel(self):
+        engine = GameEngine(config=replace(default_config(), random_destroy_on_attack=False, seed=1))
+        state = engine.state
+        for p in range(2):
+            state.pool(p)[ATOM_BLACK] = 20
+            state.turn_place_limit = 20
+            engine.apply(BatchPlace(0, 6 if p == 0 else 2))
+            engine.apply(EndPlace())
+            engine.apply(EndTurn())
+        engine.apply(EndPlace())
+        self.assertTrue(state.can_attack_this_turn())
+        self.assertEqual(engine.apply(Attack(0, 0)).message, "请点击要破坏的黑原子")
+        self.assertEqual(engine.step, ATTACK_CHOOSE_BLACK)
+        self.assertFalse(engine.apply(EndTurn()).ok)
+        self.assertFalse(engine.apply(Pick(1, 0, 0)).ok)
+        self.assertEqual(engine.apply(Cancel()).message, "已取消")
+        self.assertEqual(engine.step, IDLE)
+        engine.apply(Attack(0, 0))
+        r, c = sorted(state.cells[1][0].black_points())[0]
+        hp = state.hp[1]
+        self.assertTrue(engine.apply(Pick(0, r, c)).ok)
+        self.assertIsNone(state.cells[1][0].get(r, c))
+        self.assertLess(state.hp[1], hp)
+        self.assertFalse(engine.apply(Attack(0, 0)).ok)
+
+    def test_red_pick_unprotected_blacks(self):
+        # 红效果只能点选黑原子；未受保护的黑原子不足 y 个时选完即结算
+        engine = GameEngine(config=replace(default_config(), random_destroy_on_attack=False, seed=1))
+        state = engine.state
+        cur = state.current_player
+        opp = state.opponent(cur)
+        for c, color in ((49, ATOM_BLACK), (50, ATOM_RED), (51, ATOM_BLACK)):
+            state.cells[cur][0].place(50, c, color)
+        theirs = state.cells[opp][1]
+        for c, color in ((48, ATOM_BLACK), (49, ATOM_BLACK), (50, ATOM_RED), (51, ATOM_BLACK)):
+            theirs.place(50, c, color)
+        state.protect_black(opp, 1, (50, 48))
+        state.protect_black(opp, 1, (50, 51))
+        state.phase = PHASE_ACTION
+        self.assertEqual(engine.apply(Effect(0, 50, 50, 1)).message, "请点击该格子内 2 个要破坏的黑原子")
+        self.assertEqual(engine.apply(Pick(1, 50, 50)).message, "请点击该格子内的黑原子")
+        self.assertFalse(engine.apply(Pick(1, 50, 48)).ok)
+        self.assertEqual(engine.step, RED_PICK)
+        self.assertTrue(engine.apply(Pick(1, 50, 49)).ok)
+        self.assertNotEqual(engine.step, RED_PICK)
+        self.assertIsNone(theirs.get(50, 49))
+        self.assertIsNone(state.cells[cur][0].get(50, 50))
+
+    def test_clone_is_independent(self):
+        engine = GameEngine(config=replace(default_config(), seed=7))
+        rng = random.Random(7)
+        for _ in range(4):
+            play_turn(engine, rng)
+        state = engine.state
+        before = (
+            list(state.hp), state.pools[0].to_dict(), [[dict(c.all_atoms()) for c in cs] for cs in state.cells],
+            state._rng.getstate(),
+        )
+        branch = GameEngine(state=state.clone())
+        for _ in range(6):
+            if branch.winner() is None:
+                play_turn(branch, rng)
+        self.assertEqual(
+            (
+                list(state.hp), state.pools[0].to_dict(), [[dict(c.all_atoms()) for c in cs] for cs in state.cells],
+                state.rng.getstate(),
+            ),
+            before,
+        )
+        self.assertIsNot(state.rng, branch.state.rng)
+        self.assertIs(branch.state.config, state.config)
+        self.assertIs(branch.state.cells[0][0].grid, state.cells[0][0].grid)
+
+    def test_zobrist_transposition(self):
+        # 同一局面经不同放置顺序到达哈希相同；复制不改哈希；换到对方同号格子哈希不同
+        cfg = replace(default_config(), random_place_black_on_neighbor=False, seed=0)
+        engine = GameEngine(config=cfg)
+        state = engine.state
+        state.turn_place_limit = 20
+        h0 = state.zobrist()
+        r, c = state.cells[0][0].grid.center_r, state.cells[0][0].grid.center_c
+        engine.apply(Place(0, r, c, ATOM_BLACK))
+        engine.apply(Place(0, r, c + 1, ATOM_BLACK))
+        h = state.zobrist()
+        self.assertNotEqual(h, h0)
+        self.assertEqual(state.clone().zobrist(), h)
+        other = GameEngine(config=cfg)
+        other.state.turn_place_limit = 20
+        other.apply(Place(0, r, c + 1, ATOM_BLACK))
+        other.apply(Place(0, r, c, ATOM_BLACK))
+        self.assertEqual(other.state.zobrist(), h)
+        mirrored = GameEngine(config=cfg).state
+        mirrored.turn_place_limit = 20
+        mirrored.pools[0][ATOM_BLACK] -= 2
+        mirrored.turn_placed_count = 2
+        mirrored.cells[1][0].place(r, c, ATOM_BLACK)
+        mirrored.cells[1][0].place(r, c + 1, ATOM_BLACK)
+        self.assertNotEqual(mirrored.zobrist(), h)
+        mirrored.cells[0][0].place(r, c, ATOM_BLACK)
+        mirrored.cells[0][0].place(r, c + 1, ATOM_BLACK)
+        mirrored.cells[1][0].clear()
+        self.assertEqual(mirrored.zobrist(), h)
+
+    def test_undo_restores_every_action(self):
+        for seed, random_mode in ((4, True), (5, False)):
+            rng = random.Random(seed)
+            cfg = replace(default_config(), random_destroy_on_attack=random_mode, seed=seed)
+            engine = UndoingEngine(self, config=cfg)
+            for _ in range(40):
+                if engine.winner() is not None:
+                    break
+                play_turn(engine, rng)
+        # 回合结束会为下一名玩家抽原子：撤销后重做得到同一局面
+        engine = GameEngine(config=replace(default_config(), seed=7))
+        engine.apply(EndPlace())
+        token = engine.apply(EndTurn()).token
+        expected = fingerprint(engine)
+        for _ in range(5):
+            engine.undo(token)
+            token = engine.apply(EndTurn()).token
+            self.assertEqual(fingerprint(engine), expected)
+
+    def test_undo_place_button_uses_history(self):
+        engine = GameEngine(config=replace(default_config(), random_place_black_on_neighbor=False))
+        state = engine.state
+        state.turn_place_limit = 20
+        state.pool(0)[ATOM_BLACK] = 20
+        black = state.pool(0)[ATOM_BLACK]
+        engine.apply(BatchPlace(1, 5))
+        r, c = state.cells[0][0].grid.center_r, state.cells[0][0].grid.center_c
+        engine.apply(Place(0, r, c, ATOM_BLACK))
+        self.assertEqual(engine.placed_points()[0], {(r, c)})
+        self.assertEqual(len(engine.placed_points()[1]), 5)
+        undo = engine.apply(UndoPlace()).token
+        self.assertEqual(list(engine.placed_points()), [1])
+        engine.undo(undo)  # 撤销「撤回」即重做
+        self.assertEqual(state.cells[0][0].get(r, c), ATOM_BLACK)
+        engine.apply(UndoPlace())
+        engine.apply(UndoPlace())
+        self.assertEqual((state.pool(0)[ATOM_BLACK], state.turn_placed_count), (black, 0))
+        self.assertTrue(all(cell.is_empty() for cell in state.cells[0]))
+        self.assertFalse(engine.apply(UndoPlace()).ok)
+
+    def test_seeded_games_replay(self):
+        # 同一种子、同一动作序列得到同一局面；两局交替进行互不影响
+        def run(seed, interleave=None):
+            engine = GameEngine(config=replace(default_config(), seed=seed))
+            rng = random.Random(0)
+            for _ in range(8):
+                if engine.winner() is None:
+                    play_turn(engine, rng)
+                if interleave is not None and interleave.winner() is None:
+                    play_turn(interleave, random.Random(1))
+            return encode_state(engine.state)
+
+        self.assertEqual(run(3), run(3, interleave=GameEngine()))
+        self.assertNotEqual(run(3), run(derive_seed(3, 1)))
+        self.assertEqual(GameState(seed=5).seed, 5)
+        self.assertNotEqual(derive_seed(3, 0), derive_seed(3, 1))
+
+    def test_full_games(self):
+        for seed, random_mode in ((1, True), (2, False), (3, False)):
+            rng = random.Random(seed)
+            cfg = replace(default_config(), random_destroy_on_attack=random_mode, seed=seed)
+            engine = GameEngine(config=cfg)
+            for _ in range(200):
+                if engine.winner() is not None:
+                    break
+                play_turn(engine, rng)
+            for p, cells in enumerate(engine.state.cells):
+                if engine.step != IDLE and p == engine.defender:
+                    continue  # 致胜一击后不再结算
+                for cell in cells:
+                    self.assertTrue(cell.is_empty() or (cell.is_connected() and cell.has_black()))
+            self.assertIsNotNone(engine.winner())
+            self.assertFalse(engine.apply(EndTurn()).ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
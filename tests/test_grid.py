@@ -1,4 +1,6 @@
 """网格与格点：邻接、距离、Cell 连通性。"""
+import random
+import threading
 import unittest
 from src.grid.triangle import (
     point_to_xy,
@@ -7,8 +9,10 @@ from src.grid.triangle import (
     vertical_distance_units,
     horizontal_distance_units,
     TriangleGrid,
+    grid_geometry,
 )
-from src.grid.cell import Cell, ATOM_BLACK, ATOM_RED
+from src.grid.cell import Cell, IndexedSet, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN, EMPTY
+from src.grid.colors import Color, COLORS
 
 
 class TestTriangleGrid(unittest.TestCase):
@@ -44,6 +48,39 @@ class TestTriangleGrid(unittest.TestCase):
             self.assertTrue(g.in_bounds(nr, nc))
             self.assertAlmostEqual(distance_between((1, 1), (nr, nc)), 1.0, delta=1e-5)
 
+    def test_neighbor_table_matches_geometry(self):
+        # 邻接表与逐点几何判断一致，且邻接关系对称
+        g = TriangleGrid(20, 20, hex_radius=5)
+        for (r, c) in g.all_points():
+            expected = {
+                p for p in neighbors(r, c)
+                if g.in_bounds(*p) and abs(distance_between((r, c), p) - 1.0) < 1e-6
+            }
+            self.assertEqual(set(g.neighbors_of(r, c)), expected)
+            for p in g.neighbors_of(r, c):
+                self.assertIn((r, c), g.neighbors_of(*p))
+
+    def test_geometry_shared(self):
+        # 同形状网格共享同一份不可变几何
+        a = TriangleGrid(40, 40, hex_radius=6)
+        b = TriangleGrid(40, 40, center_r=20, center_c=20, hex_radius=6)
+        self.assertIs(a.geometry, b.geometry)
+        self.assertIs(a.geometry, grid_geometry(40, 40, hex_radius=6))
+        self.assertIsNot(a.geometry, TriangleGrid(40, 40, hex_radius=5).geometry)
+        self.assertEqual(len(a.geometry.points), len(a.geometry.point_set))
+        with self.assertRaises(AttributeError):
+            a.geometry.rows = 3
+        with self.assertRaises(TypeError):
+            a.geometry.neighbors[(0, 0)] = ()
+
+    def test_bitboard_dilate_matches_neighbor_table(self):
+        # 位棋盘的 6 方向位移与邻接表一致（含六边形边界与行尾）
+        g = TriangleGrid(30, 30, hex_radius=6).geometry
+        for i, p in enumerate(g.points):
+            m = 1 << g.bit_of[i]
+            self.assertEqual(sorted(g.ids_of(g.dilate(m))), sorted(g.neighbor_ids[i]))
+        self.assertEqual(g.flood(1 << g.bit_of[0], g.all_bits), g.all_bits)
+
 
 class TestCell(unittest.TestCase):
     def test_place_remove(self):
@@ -53,6 +90,23 @@ class TestCell(unittest.TestCase):
         self.assertEqual(cell.remove(0, 0), ATOM_BLACK)
         self.assertIsNone(cell.get(0, 0))
 
+    def test_all_colors_placeable(self):
+        # 颜色即编码：每种颜色都可放置，颜色名与编码互转，黑（编码 0）也为真
+        self.assertEqual([int(c) for c in COLORS], list(range(len(COLORS))))
+        self.assertEqual(Color.from_key("purple"), Color.PURPLE)
+        self.assertEqual(Color.GRAY.key, "gray")
+        with self.assertRaises(ValueError):
+            Color.from_key("orange")
+        self.assertTrue(ATOM_BLACK)
+        cell = Cell(3, 12)
+        for c, color in enumerate(COLORS):
+            self.assertTrue(cell.place(1, c, color))
+            self.assertIs(cell.get(1, c), color)
+        self.assertFalse(cell.place_at(0, len(COLORS)))
+        self.assertEqual(cell.count_by_color(), {color: 1 for color in COLORS})
+        self.assertEqual(list(cell.all_atoms().values()), list(COLORS))
+        self.assertTrue(cell.is_connected())
+
     def test_connected_single(self):
         cell = Cell(3, 4)
         cell.place(0, 0, ATOM_BLACK)
@@ -76,6 +130,329 @@ class TestCell(unittest.TestCase):
         cell.place(0, 1, ATOM_RED)
         self.assertEqual(cell.black_points(), {(0, 0)})
 
+    def test_index_api_matches_point_api(self):
+        # 编号接口与 (r,c) 接口是同一份存储；每格点占 1 字节
+        cell = Cell(20, 20, hex_radius=4)
+        geom = cell.grid.geometry
+        i = geom.point_id(10, 10)
+        j = geom.index[(10, 11)]
+        self.assertTrue(cell.place_at(i, ATOM_BLACK))
+        self.assertFalse(cell.place_at(i, ATOM_RED))
+        self.assertTrue(cell.place(10, 11, ATOM_RED))
+        self.assertEqual(cell.code_at(j), ATOM_RED)
+        self.assertEqual(cell.get(10, 10), ATOM_BLACK)
+        self.assertEqual(cell.atom_ids(), [i, j])
+        self.assertEqual(geom.point_id(0, 0), -1)
+        self.assertFalse(cell.place(0, 0, ATOM_BLACK))
+        self.assertEqual(cell.remove_at(j), ATOM_RED)
+        self.assertEqual(cell.remove_at(j), EMPTY)
+        self.assertEqual(cell._colors.itemsize * len(cell._colors), geom.size)
+
+    def test_bitboard_queries(self):
+        cell = Cell(20, 20, hex_radius=4)
+        self.assertFalse(cell.has_black())
+        cell.place(10, 10, ATOM_RED)
+        cell.place(10, 11, ATOM_BLACK)
+        cell.place(10, 13, ATOM_BLACK)
+        self.assertTrue(cell.has_black())
+        self.assertEqual(cell.count_by_color()[ATOM_BLACK], 2)
+        self.assertEqual(len(cell.connected_components()), 2)
+        self.assertEqual(len(cell.black_connected_components()), 2)
+        cell.place(10, 12, ATOM_BLACK)
+        self.assertTrue(cell.is_connected())
+        self.assertEqual(cell.black_connected_components(), [{(10, 11), (10, 12), (10, 13)}])
+        pt = cell.random_empty_neighbor()
+        self.assertIsNone(cell.get(*pt))
+        self.assertTrue(any(cell.get(*q) for q in cell.grid.neighbors_of(*pt)))
+        self.assertEqual(cell.remove(10, 12), ATOM_BLACK)
+        self.assertFalse(cell.is_connected())
+
+    def test_incremental_components_match_flood_fill(self):
+        # 随机放置/移除后，增量维护的分量与从头做洪泛的结果一致
+        rng = random.Random(7)
+        cell = Cell(30, 30, hex_radius=4)
+        geom = cell.grid.geometry
+        points = list(geom.points)
+        for _ in range(1500):
+            r, c = rng.choice(points)
+            if cell.get(r, c) is None:
+                expected = len(geom.components(cell.occupied_mask() | 1 << geom.bit_of[geom.index[(r, c)]])) <= 1
+                self.assertEqual(cell.connected_after_place(r, c), expected)
+                cell.place(r, c, rng.choice([ATOM_BLACK, ATOM_RED]))
+            else:
+                cell.remove(r, c)
+            self.assertEqual(
+                sorted(cell._comps),
+                sorted(geom.components(cell.occupied_mask())),
+            )
+
+    def test_articulation_index_matches_flood_fill(self):
+        # 割点索引给出的拆分与真实移除后从头洪泛的结果一致；索引有效时移除走缓存
+        rng = random.Random(9)
+        cell = Cell(30, 30, hex_radius=4)
+        geom = cell.grid.geometry
+        points = list(geom.points)
+        for step in range(600):
+            r, c = rng.choice(points)
+            if cell.get(r, c) is None:
+                cell.place(r, c, ATOM_BLACK)
+                continue
+            i = geom.index[(r, c)]
+            rest = cell.occupied_mask() & ~(1 << geom.bit_of[i])
+            expected = sorted(geom.components(rest))
+            self.assertEqual(sorted(cell.components_after_remove_at(i)), expected)
+            before = len(geom.components(cell.occupied_mask()))
+            self.assertEqual(i in cell.articulation_ids(), len(expected) > before)
+            if step % 2:
+                cell.remove(r, c)
+                self.assertEqual(sorted(cell._comps), expected)
+
+    def test_read_stable_under_concurrent_writes(self):
+        # 另一线程不停读取，分量之并须始终等于全部原子（读到的是某一完整版本）
+        cell = Cell(30, 30, hex_radius=4)
+        points = list(cell.grid.all_points())
+        torn = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                occ, comps = cell.read_stable(lambda: (cell.occupied_mask(), list(cell._comps)))
+                union = 0
+                for m in comps:
+                    union |= m
+                if union != occ:
+                    torn.append(occ)
+
+        t = threading.Thread(target=reader)
+        t.start()
+        rng = random.Random(5)
+        try:
+            for _ in range(3000):
+                r, c = rng.choice(points)
+                if cell.get(r, c) is None:
+                    cell.place(r, c, ATOM_BLACK)
+                else:
+                    cell.remove(r, c)
+        finally:
+            done.set()
+            t.join()
+        self.assertEqual(torn, [])
+        self.assertEqual(cell.version % 2, 0)
+
+    def test_frontier_sets_match_bitboards(self):
+        # 增量维护的落点边界与位棋盘现算的结果一致且按编号升序（含整块移除、清空与复制）
+        rng = random.Random(13)
+        cell = Cell(30, 30, hex_radius=4)
+        geom = cell.grid.geometry
+        points = list(geom.points)
+
+        def check(cell):
+            occ = cell.occupied_mask()
+            expect = geom.ids_of(geom.dilate(occ) & ~occ)
+            expect_black = geom.ids_of(geom.dilate(cell.color_mask(ATOM_BLACK)) & ~occ)
+            self.assertEqual(list(cell.frontier_ids()), expect)
+            self.assertEqual(list(cell.black_frontier_ids()), expect_black)
+
+        for step in range(1500):
+            r, c = rng.choice(points)
+            if cell.get(r, c) is None:
+                cell.place(r, c, rng.choice([ATOM_BLACK, ATOM_RED]))
+            else:
+                cell.remove(r, c)
+            if step % 300 == 299 and cell.component_count() > 1:
+                cell.remove_components(cell._comps[0])
+            check(cell)
+        other = cell.copy()
+        other.clear()
+        check(other)
+        self.assertIsNone(other.random_empty_neighbor())
+        check(cell)
+        seen = {cell.random_empty_neighbor(rng) for _ in range(2000)}
+        self.assertEqual(seen, set(cell.frontier_points()))
+
+    def test_load_codes_matches_place(self):
+        # 批量装入与逐个落子得到相同的格子状态
+        rng = random.Random(17)
+        cell = Cell(30, 30, hex_radius=4)
+        geom = cell.grid.geometry
+        for _ in range(40):
+            i = rng.randrange(geom.size)
+            if cell.code_at(i) == EMPTY:
+                cell.place_at(i, rng.choice([ATOM_BLACK, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN]))
+        loaded = Cell(30, 30, hex_radius=4)
+        loaded.load_codes(cell.color_codes())
+        self.assertEqual(loaded.all_atoms(), cell.all_atoms())
+        self.assertEqual(loaded.color_codes(), cell.color_codes())
+        self.assertEqual(sorted(loaded.component_masks()), sorted(cell.component_masks()))
+        self.assertEqual(list(loaded.frontier_ids()), list(cell.frontier_ids()))
+        self.assertEqual(list(loaded.black_frontier_ids()), list(cell.black_frontier_ids()))
+        self.assertEqual(
+            [loaded.black_neighbors_at(i) for i in range(geom.size)],
+            [cell.black_neighbors_at(i) for i in range(geom.size)],
+        )
+        self.assertEqual(
+            (loaded.red_y_sum, loaded.blue_y_sum, loaded.green_y_sum),
+            (cell.red_y_sum, cell.blue_y_sum, cell.green_y_sum),
+        )
+        self.assertEqual((loaded.black_row_span(), loaded.black_x_span()), (cell.black_row_span(), cell.black_x_span()))
+        self.assertEqual(loaded.zobrist, cell.zobrist)
+        self.assertEqual(loaded.canonical_hash, cell.canonical_hash)
+        with self.assertRaises(ValueError):
+            loaded.load_codes(cell.color_codes())
+        with self.assertRaises(ValueError):
+            Cell(30, 30, hex_radius=4).load_codes(bytes([200]) * geom.size)
+
+    def test_indexed_set_large_ids(self):
+        # 下标数组须容纳超过 32767 个格点
+        s = IndexedSet(40000)
+        for i in (39999, 5, 32768):
+            s.add(i)
+        s.discard(5)
+        self.assertEqual(sorted(s.items), [32768, 39999])
+        self.assertIn(39999, s)
+        self.assertNotIn(5, s)
+        self.assertEqual(sorted(s.copy().items), [32768, 39999])
+
+    def test_black_neighbor_counts_and_y_sums(self):
+        # 增量维护的 y 值与逐点现数一致
+        rng = random.Random(11)
+        cell = Cell(12, 12, hex_radius=4)
+        points = cell.grid.all_points()
+        colors = [ATOM_BLACK, ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_GREEN]
+        for _ in range(800):
+            r, c = rng.choice(points)
+            if cell.get(r, c) is None:
+                cell.place(r, c, rng.choice(colors))
+            else:
+                cell.remove(r, c)
+            sums = {ATOM_RED: 0, ATOM_BLUE: 0, ATOM_GREEN: 0}
+            for (pr, pc), color in cell.all_atoms().items():
+                y = sum(1 for q in cell.grid.neighbors_of(pr, pc) if cell.get(*q) == ATOM_BLACK)
+                if color != ATOM_BLACK:
+                    self.assertEqual(cell.count_black_neighbors(pr, pc), y)
+                    sums[color] += y
+            self.assertEqual(
+                (cell.red_y_sum, cell.blue_y_sum, cell.green_y_sum),
+                (sums[ATOM_RED], sums[ATOM_BLUE], sums[ATOM_GREEN]),
+            )
+
+    def test_all_atoms_is_readonly_snapshot(self):
+        cell = Cell(5, 6)
+        cell.place(0, 0, ATOM_BLACK)
+        view = cell.all_atoms()
+        self.assertIs(cell.all_atoms(), view)  # 未改变时不复制
+        with self.assertRaises(TypeError):
+            view[(0, 1)] = ATOM_RED
+        cell.place(0, 1, ATOM_RED)
+        self.assertEqual(view, {(0, 0): ATOM_BLACK})  # 旧快照不随之变化
+        self.assertEqual(cell.all_atoms(), {(0, 0): ATOM_BLACK, (0, 1): ATOM_RED})
+        self.assertIs(cell.grid.all_points(), cell.grid.all_points())
+        cell.clear()
+        self.assertTrue(cell.is_empty())
+        self.assertEqual(cell.all_atoms(), {})
+
+    def test_copy_is_independent(self):
+        cell = Cell(5, 6)
+        cell.place(0, 0, ATOM_BLACK)
+        other = cell.copy()
+        other.place(0, 1, ATOM_RED)
+        other.remove(0, 0)
+        self.assertEqual(cell.all_atoms(), {(0, 0): ATOM_BLACK})
+        self.assertEqual(other.all_atoms(), {(0, 1): ATOM_RED})
+
+    def test_copy_on_write_both_directions(self):
+        # 写时复制：父、子、孙谁先写都不影响其他副本，派生状态（分量、边界、y 值）各自独立
+        def summary(c):
+            return (dict(c.all_atoms()), c.component_count(), sorted(c.frontier_ids()), c.red_y_sum, c.black_row_span())
+
+        rng = random.Random(5)
+        cell = Cell(8, 8)
+        points = cell.grid.all_points()
+        for _ in range(30):
+            cell.place(*rng.choice(points), rng.choice([ATOM_BLACK, ATOM_RED]))
+        child = cell.copy()
+        self.assertIs(child._colors, cell._colors)
+        before = summary(cell)
+        grandchild = child.copy()
+        cell.remove(*next(iter(cell.all_atoms())))
+        cell.place(*rng.choice(cell.frontier_points()), ATOM_BLACK)
+        grandchild.remove_components(grandchild.occupied_mask())
+        self.assertEqual(summary(child), before)
+        self.assertTrue(grandchild.is_empty())
+        after = summary(cell)
+        child.clear()
+        self.assertEqual(summary(cell), after)
+
+    def test_zobrist_incremental(self):
+        # 增量维护的哈希与按当前排布重算的一致；只与排布有关，与放置顺序、经过的中间状态无关
+        rng = random.Random(9)
+        cell = Cell(8, 8)
+        points = cell.grid.all_points()
+        for _ in range(200):
+            pt = rng.choice(points)
+            if cell.get(*pt) is None:
+                cell.place(*pt, rng.choice([ATOM_BLACK, ATOM_RED, ATOM_BLUE]))
+            else:
+                cell.remove(*pt)
+        h = cell.zobrist
+        cell.set_zobrist_slot(0)
+        self.assertEqual(cell.zobrist, h)
+        other = Cell(8, 8)
+        for pt, color in reversed(list(cell.all_atoms().items())):
+            other.place(*pt, color)
+        self.assertEqual(other.zobrist, h)
+        copy = cell.copy()
+        copy.remove_components(copy.component_masks()[0])
+        self.assertNotEqual(copy.zobrist, h)
+        self.assertEqual(cell.zobrist, h)
+        other.set_zobrist_slot(1)
+        self.assertNotEqual(other.zobrist, h)
+        other.clear()
+        self.assertEqual(other.zobrist, 0)
+
+    def test_canonical_hash_translation_and_reflection(self):
+        rng = random.Random(11)
+        geom_cell = Cell(31, 31, hex_radius=15)
+        cr, cc = geom_cell.grid.center_r, geom_cell.grid.center_c
+
+        def pattern():
+            cell = Cell(31, 31, hex_radius=15)
+            cell.place(cr, cc, ATOM_BLACK)
+            for _ in range(12):
+                cell.place(*rng.choice(cell.frontier_points()), rng.choice([ATOM_BLACK, ATOM_BLACK, ATOM_RED, ATOM_BLUE]))
+            return cell
+
+        def moved(cell, sr, sx, dr, dx):
+            # (r, x2) -> (sr * r + dr, sx * x2 + dx)，以格子中心为原点；dx 与 dr 同奇偶
+            out = Cell(31, 31, hex_radius=15)
+            for (r, c), color in cell.all_atoms().items():
+                r1, x1 = sr * (r - cr) + dr, sx * (2 * (c - cc) + (r - cr)) + dx
+                self.assertTrue(out.place(cr + r1, cc + (x1 - r1) // 2, color))
+            return out
+
+        for _ in range(20):
+            cell = pattern()
+            h = cell.canonical_hash
+            self.assertNotEqual(h, 0)
+            for sr, sx in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                dr = rng.randint(-3, 3)
+                other = moved(cell, sr, sx, dr, dr + 2 * rng.randint(-2, 2))
+                self.assertEqual(other.canonical_hash, h)
+                self.assertEqual(other.canonical_form(), cell.canonical_form())
+                self.assertEqual((other.black_row_span(), other.black_x_span()), (cell.black_row_span(), cell.black_x_span()))
+                self.assertEqual(len(other.articulation_ids()), len(cell.articulation_ids()))
+            other = cell.copy()
+            other.remove_at(other.atom_ids()[-1])
+            self.assertNotEqual(other.canonical_hash, h)
+            self.assertNotEqual(other.canonical_form(), cell.canonical_form())
+            # 增量维护与重建一致
+            rebuilt = Cell(31, 31, hex_radius=15)
+            for pt, color in other.all_atoms().items():
+                rebuilt.place(*pt, color)
+            self.assertEqual(rebuilt.canonical_hash, other.canonical_hash)
+        cell.clear()
+        self.assertEqual((cell.canonical_hash, cell.canonical_form()), (0, ()))
+
     def test_count_black_neighbors(self):
         cell = Cell(3, 4)
         cell.place(0, 0, ATOM_BLACK)
@@ -0,0 +1,163 @@
+"""合法动作生成：产出的动作都被引擎接受、与逐个试探的结果一致、计数一致。"""
+import random
+import unittest
+from dataclasses import replace
+
+from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE
+from src.grid.colors import COLORS
+from src.game.actions import Place, EndPlace, Attack, Effect, Pick, Cancel, EndTurn
+from src.game.engine import GameEngine, IDLE, RED_PICK
+from src.game.game_config import default_config
+from src.game.legal import legal_actions, count_legal_actions, changes_power
+from src.game.state import PHASE_PLACE, PHASE_ACTION
+from tests.test_engine import play_turn
+
+
+def accepted(engine: GameEngine, action) -> bool:
+    outcome = engine.apply(action)
+    if outcome.token is not None:
+        engine.undo(outcome.token)
+    return outcome.ok
+
+
+def brute_force(engine: GameEngine) -> set:
+    """逐个试探的放置、进攻与效果中被引擎接受的（空闲时）。"""
+    state = engine.state
+    cur = state.current_player
+    candidates = []
+    if state.phase == PHASE_PLACE:
+        for ci, cell in enumerate(state.cells[cur]):
+            # 池中没有的颜色只试一种
+            colors = [color for color in COLORS if state.pool(cur)[color]] + [next(
+                color for color in COLORS if not state.pool(cur)[color]
+            )]
+            for r, c in cell.grid.geometry.points:
+                candidates += [Place(ci, r, c, color) for color in colors]
+    else:
+        candidates += [Attack(ci, t) for ci in range(3) for t in (None, 0, 1, 2)]
+        for ci, cell in enumerate(state.cells[cur]):
+            for (r, c), color in cell.all_atoms().items():
+                targets = (0, 1, 2) if color == ATOM_RED else (None,)
+                candidates += [Effect(ci, r, c, t) for t in targets]
+    return {a for a in candidates if accepted(engine, a)}
+
+
+class TestLegalActions(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        config = replace(default_config(), random_place_black_on_neighbor=False, seed=3)
+        engine = GameEngine(config=config)
+        engine.state.pool(0)[ATOM_RED] = 2
+        checked = 0
+        for _ in range(6):
+            if engine.winner() is not None:
+                break
+            for phase in (PHASE_PLACE, PHASE_ACTION):
+                if engine.state.phase == phase and engine.step == IDLE:
+                    legal = set(legal_actions(engine)) - {EndPlace(), EndTurn()}
+                    self.assertEqual(legal, brute_force(engine))
+                    checked += bool(legal)
+                    if phase == PHASE_PLACE:
+                        engine.apply(next(a for a in legal_actions(engine) if isinstance(a, Place)))
+                        engine.apply(EndPlace())
+            play_turn(engine, rng)
+        self.assertGreater(checked, 4)
+
+    def test_random_play_only_legal_moves(self):
+        # 只从合法动作中随机选，整局每一步都被引擎接受；计数与生成一致；过滤只留改变攻防的黑原子放置
+        for seed, random_mode in ((1, True), (2, False), (5, False)):
+            config = replace(
+                default_config(), random_destroy_on_attack=random_mode,
+                random_place_black_on_neighbor=random_mode, seed=seed,
+            )
+            engine = GameEngine(config=config)
+            rng = random.Random(seed)
+            steps = set()
+            for _ in range(3000):
+                if engine.winner() is not None:
+                    break
+                actions = list(legal_actions(engine))
+                self.assertEqual(len(actions), count_legal_actions(engine))
+                self.assertEqual(len(set(actions)), len(actions))
+                steps.add(engine.step)
+                if engine.state.phase == PHASE_PLACE:
+                    state = engine.state
+                    for a in legal_actions(engine, changes_power):
+                        cell = state.cells[state.current_player][a.cell_index] if isinstance(a, Place) else None
+                        if cell is not None:
+                            self.assertEqual(a.color, ATOM_BLACK)
+                            self.assertNotEqual(
+                                cell.spans_after_place(a.r, a.c, a.color), (cell.black_row_span(), cell.black_x_span())
+                            )
+                # 少选取消与提前结束，让对局推进
+                weights = [0.05 if isinstance(a, (Cancel, EndTurn, EndPlace)) else 1 for a in actions]
+                action = rng.choices(actions, weights)[0]
+                outcome = engine.apply(action)
+                self.assertTrue(outcome.ok, (action, outcome.message))
+            else:
+                self.fail("对局未结束")
+            self.assertEqual(list(legal_actions(engine)), [])
+            self.assertEqual(count_legal_actions(engine), 0)
+            if not random_mode:
+                self.assertGreater(len(steps), 2)
+
+
+    def test_split_cell_and_red_pick(self):
+        # 拆分的格子不列出系统随机落点的黑原子放置；红效果点选只列出对方未受保护的黑原子
+        config = replace(
+            default_config(), random_place_black_on_neighbor=True, random_destroy_on_attack=False, seed=3,
+        )
+        engine = GameEngine(config=config)
+        state = engine.state
+        cur = state.current_player
+        mine = state.cells[cur][0]
+        for c, color in ((49, ATOM_BLACK), (50, ATOM_BLUE), (51, ATOM_BLACK)):
+            mine.place(50, c, color)
+        mine.place(51, 50, ATOM_RED)
+        theirs = state.cells[state.opponent(cur)][1]
+        for c, color in ((49, ATOM_BLACK), (50, ATOM_RED), (51, ATOM_BLACK)):
+            theirs.place(50, c, color)
+        state.phase = PHASE_ACTION
+        self.assertTrue(engine.apply(Effect(0, 50, 50)).ok)
+        self.assertEqual(mine.component_count(), 2)
+        self.assertTrue(engine.apply(Effect(0, 51, 50, 1)).ok)
+        self.assertEqual(engine.step, RED_PICK)
+        picks = [a for a in legal_actions(engine) if isinstance(a, Pick)]
+        self.assertEqual(picks, [Pick(1, 50, 49), Pick(1, 50, 51)])
+        self.assertEqual(count_legal_actions(engine), 3)
+        engine.apply(Cancel())
+        engine.apply(EndTurn())
+        engine.apply(EndPlace())
+        engine.apply(EndTurn())
+        state.pool(cur)[ATOM_BLACK] = 1
+        self.assertEqual(state.phase, PHASE_PLACE)
+        actions = list(legal_actions(engine))
+        self.assertEqual(len(actions), count_legal_actions(engine))
+        self.assertFalse(any(isinstance(a, Place) and a.cell_index == 0 and a.color == ATOM_BLACK for a in actions))
+        self.assertTrue(any(isinstance(a, Place) and a.cell_index == 1 and a.color == ATOM_BLACK for a in actions))
+
+    def test_random_black_filter_whole_cell(self):
+        # 系统随机落点的黑原子放置按整格过滤：任一落点被接受即列出
+        config = replace(default_config(), random_place_black_on_neighbor=True, seed=3)
+        engine = GameEngine(config=config)
+        state = engine.state
+        cur = state.current_player
+        cell = state.cells[cur][0]
+        cell.place(50, 50, ATOM_BLACK)
+        state.pool(cur)[ATOM_BLACK] = 1
+        first, second = list(cell.frontier_ids())[:2]
+
+        def blacks(place_filter):
+            return [
+                a for a in legal_actions(engine, place_filter)
+                if isinstance(a, Place) and a.cell_index == 0 and a.color == ATOM_BLACK
+            ]
+
+        points = cell.grid.geometry.points
+        self.assertEqual(blacks(lambda c, i, color: i != first), [Place(0, *points[second], ATOM_BLACK)])
+        self.assertEqual(blacks(lambda c, i, color: False), [])
+        self.assertEqual(len(blacks(None)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
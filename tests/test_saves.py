@@ -0,0 +1,127 @@
+"""JSON 存档：与网页版结构互通、NDJSON 批量读写、校验。"""
+import io
+import json
+import random
+import unittest
+from dataclasses import replace
+
+from src.grid.cell import ATOM_BLACK, ATOM_RED, ATOM_BLUE, ATOM_PURPLE, ATOM_YELLOW
+from src.game.actions import Effect
+from src.game.engine import GameEngine
+from src.game.game_config import default_config
+from src.game.saves import (
+    cell_to_json, state_to_json, state_from_json, save_game, load_game, write_games, read_games,
+)
+from src.game.state import GameState, PHASE_ACTION
+from tests.test_codec import snapshot
+from tests.test_engine import play_turn
+
+
+def games(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    engine = GameEngine(config=replace(default_config(), seed=seed))
+    for _ in range(n):
+        if engine.winner() is not None:
+            return
+        play_turn(engine, rng)
+        yield engine.state
+
+
+class TestSaves(unittest.TestCase):
+    def test_round_trip(self):
+        for state in games(12):
+            buf = io.StringIO()
+            save_game(state, buf)
+            for trusted in (False, True):
+                buf.seek(0)
+                self.assertEqual(snapshot(load_game(buf, trusted=trusted)), snapshot(state))
+
+    def test_round_trip_split_cell(self):
+        # 蓝效果移除连接两段黑原子的蓝原子后格子不连通，存档仍须能读回
+        engine = GameEngine(config=replace(default_config(), seed=3))
+        state = engine.state
+        cell = state.cells[state.current_player][0]
+        for c, color in ((49, ATOM_BLACK), (50, ATOM_BLUE), (51, ATOM_BLACK)):
+            cell.place(50, c, color)
+        state.phase = PHASE_ACTION
+        self.assertTrue(engine.apply(Effect(0, 50, 50)).ok)
+        self.assertEqual(cell.component_count(), 2)
+        for trusted in (False, True):
+            self.assertEqual(snapshot(state_from_json(state_to_json(state), trusted=trusted)), snapshot(state))
+
+    def test_ndjson_streams(self):
+        buf = io.StringIO()
+        expected = []
+        n = write_games((expected.append(snapshot(s)) or s for s in games(10, seed=2)), buf)
+        self.assertEqual(n, len(expected))
+        self.assertEqual(buf.getvalue().count("\n"), n)
+        buf.seek(0)
+        loaded = read_games(buf, trusted=True)
+        self.assertEqual(snapshot(next(loaded)), expected[0])
+        self.assertEqual(buf.tell(), len(buf.getvalue().split("\n")[0]) + 1)  # 只读了第一行
+        self.assertEqual([snapshot(s) for s in loaded], expected[1:])
+
+    def test_web_format(self):
+        # 网页版 createGameState 的字段：8 色原子池与权重、多余字段、以「回合号达到即解除」计的保护期
+        obj = {
+            "config": {"gameMode": "normal"},
+            "pools": [{"black": 3, "red": 1, "purple": 0, "gray": 0}, {"yellow": 2, "white": 1}],
+            "hp": [18, 20],
+            "cells": [[{"50,50": "black", "50,51": "red"}, {}, {}], [{}, {"49,50": "black", "49,51": "purple"}, {}]],
+            "currentPlayer": 1,
+            "phase": PHASE_ACTION,
+            "phase0Choice": "c",
+            "drawWeights": [3, 1, 1, 0, 1, 0, 0, 0],
+            "turnNumber": 5,
+            "isFirstTurn": False,
+            "attackedCellsThisTurn": [],
+            "blueProtectedPoints": {"0": ["0:50,50"], "1": []},
+            "blueProtectionUntilTurn": {"0": 6},
+            "placementHistory": [],
+        }
+        state = state_from_json(obj)
+        self.assertEqual(state.cells[0][0].get(50, 51), ATOM_RED)
+        self.assertEqual(state.cells[1][1].get(49, 51), ATOM_PURPLE)
+        self.assertEqual(state.pools[1][ATOM_YELLOW], 2)
+        self.assertEqual(state.pools[1].to_dict(), {"yellow": 2, "white": 1})
+        self.assertEqual(state.draw_weights, obj["drawWeights"])
+        self.assertTrue(state.is_black_protected(0, 0, (50, 50)))
+        self.assertEqual(state.blue_protection_until_turn, [5, -1])
+        out = state_to_json(state)
+        self.assertEqual(out["cells"], [[c for c in row] for row in obj["cells"]])
+        self.assertEqual(out["blueProtectedPoints"], obj["blueProtectedPoints"])
+        self.assertEqual(out["blueProtectionUntilTurn"], obj["blueProtectionUntilTurn"])
+        self.assertEqual(json.loads(json.dumps(out)), out)
+
+    def test_rejects_invalid(self):
+        good = state_to_json(GameState())
+        for cells in (
+            [[{"0,0": "black"}], []],  # 六边形外
+            [[{"50,50": "black", "50, 50": "red"}], []],  # 重复
+            [[{"50,50": "orange"}], []],
+            [[{}, {}, {}, {}], []],
+        ):
+            with self.assertRaises(ValueError):
+                state_from_json(dict(good, cells=cells))
+        for key, value in (
+            ("phase", 7), ("currentPlayer", 2), ("pools", [{"orange": 1}, {}]), ("drawWeights", [1] * 9), ("hp", [1]),
+            ("pools", [["black"], {}]), ("pools", [None, {}]),
+            ("hp", [True, 5]), ("hp", [-1, 5]), ("hp", [5, 2.0]),
+            ("blueProtectionUntilTurn", {"2": 3}), ("blueProtectionUntilTurn", {"x": 3}),
+            ("blueProtectionUntilTurn", {"0": "3"}),
+        ):
+            with self.assertRaises(ValueError):
+                state_from_json(dict(good, **{key: value}))
+        for bad in (dict(good, phase=9), dict(good, blueProtectionUntilTurn={"2": 3})):
+            buf = io.StringIO(json.dumps(good) + "\n\n" + json.dumps(bad) + "\n")
+            loaded = read_games(buf)
+            next(loaded)
+            with self.assertRaisesRegex(ValueError, "第 3 行"):
+                next(loaded)
+        cell = GameState().cells[0][0]
+        cell.place(50, 50, ATOM_BLACK)
+        self.assertEqual(cell_to_json(cell), {"50,50": "black"})
+
+
+if __name__ == "__main__":
+    unittest.main()
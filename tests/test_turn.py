@@ -0,0 +1,69 @@
+"""回合流程：放置校验。"""
+import unittest
+from src.grid.cell import ATOM_BLACK, ATOM_RED
+from src.game.state import GameState, PHASE_PLACE
+from src.game import turn
+
+
+class TestValidatePlace(unittest.TestCase):
+    def setUp(self):
+        self.state = GameState()
+        self.state.phase = PHASE_PLACE
+        self.state.turn_place_limit = 10
+        self.state.pool(0)[ATOM_BLACK] = 5
+        self.state.pool(0)[ATOM_RED] = 5
+        self.cell = self.state.cells[0][0]
+        self.r, self.c = self.cell.grid.center_r, self.cell.grid.center_c
+
+    def test_rules_and_messages(self):
+        r, c = self.r, self.c
+        self.assertEqual(turn.validate_place(self.state, 0, r, c, ATOM_RED), (False, "非空格至少需一个黑原子"))
+        self.assertEqual(turn.validate_place(self.state, 0, r, c, ATOM_BLACK), (True, ""))
+        self.assertTrue(turn.apply_place(self.state, 0, r, c, ATOM_BLACK))
+        self.assertEqual(turn.validate_place(self.state, 0, r, c, ATOM_RED), (False, "该格点已有原子或越界"))
+        self.assertEqual(turn.validate_place(self.state, 0, -1, 0, ATOM_RED), (False, "该格点已有原子或越界"))
+        self.assertEqual(turn.validate_place(self.state, 0, r, c + 2, ATOM_RED), (False, "放置后该格原子不连通"))
+        self.assertEqual(turn.validate_place(self.state, 0, r, c + 1, ATOM_RED), (True, ""))
+
+    def test_does_not_mutate(self):
+        self.cell.place(self.r, self.c, ATOM_BLACK)
+        version = self.cell.version
+        atoms = self.cell.all_atoms()
+        for dc in range(-3, 4):
+            turn.validate_place(self.state, 0, self.r, self.c + dc, ATOM_RED)
+        self.assertEqual(self.cell.version, version)
+        self.assertIs(self.cell.all_atoms(), atoms)
+
+
+class TestBatchPlace(unittest.TestCase):
+    def test_batch_place_greedy(self):
+        state = GameState()
+        state.phase = PHASE_PLACE
+        state.turn_place_limit = 60
+        state.pool(0)[ATOM_BLACK] = 60
+        cell = state.cells[0][0]
+        geom = cell.grid.geometry
+        ok, _ = turn.batch_place_on_cell(state, 0, 50)
+        self.assertTrue(ok)
+        self.assertEqual(len(cell.all_atoms()), 50)
+        self.assertTrue(cell.is_connected())
+        self.assertEqual(state.pool(0)[ATOM_BLACK], 10)
+        self.assertEqual(state.turn_placed_count, 50)
+        # 贪心选位使空邻位尽量多：得到的黑落点边界不小于同样多原子排成的紧凑六边形块
+        self.assertGreaterEqual(len(cell.black_frontier_ids()), 24)
+        self.assertEqual(
+            sorted(cell.black_frontier_ids()),
+            geom.ids_of(geom.dilate(cell.occupied_mask()) & ~cell.occupied_mask()),
+        )
+
+    def test_batch_place_limit(self):
+        state = GameState()
+        state.phase = PHASE_PLACE
+        state.turn_place_limit = 3
+        state.pool(0)[ATOM_BLACK] = 10
+        self.assertEqual(turn.batch_place_on_cell(state, 0, 5), (False, "本回合最多还可放 3 个"))
+        self.assertTrue(state.cells[0][0].is_empty())
+
+
+if __name__ == "__main__":
+    unittest.main()